@@ -1,17 +1,20 @@
-import inspect
+import asyncio
 import importlib
+import json
 import logging
 import os
-import pkgutil
 import sys
 import uvicorn
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Literal, Tuple, Union
 
-from fastapi import FastAPI, HTTPException
+from contextlib import aclosing, asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 
 # 配置日志
 logging.basicConfig(
@@ -23,16 +26,34 @@ logger = logging.getLogger(__name__)
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from simulation.snapshot_engine import SnapshotEngine, categorize_buff
+from simulation.engine import SimEngine
+from simulation.snapshot_engine import categorize_buff
 from entities.dummy import DummyEnemy
-from entities.characters.base_actor import BaseActor
+from core.config_manager import get_config
 from core.operator_config import OperatorConfigManager
 from core.weapon_system import WeaponManager
-from core.weapon_effects import WeaponEffectHandler
 from core.equipment_system import EquipmentManager, EquipmentSetManager
-from core.equipment_effects import EquipmentEffectHandler
+from simulation.loadout import (
+    apply_custom_attrs, apply_stat_bonuses, discover_characters, resolve_equipments,
+)
+from simulation.job_store import JobRunner, JobStore
+from simulation.result_cache import ResultCache, cache_key
+from simulation.web_runner import (
+    init_worker, merge_stream_event, replay_stream, run_snapshot_simulation, stream_snapshot_simulation,
+)
+from simulation.worker_pool import PoolBusyError, PoolTimeoutError, TaskError, WorkerPool
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """启动时恢复并执行未完成的任务，关闭时停止任务执行与进程池"""
+    job_runner.start()
+    try:
+        yield
+    finally:
+        await job_runner.stop()
+        simulation_pool.close()
 
-app = FastAPI(title="Endfield Combat Simulator API")
+app = FastAPI(title="Endfield Combat Simulator API", lifespan=lifespan)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -68,60 +89,31 @@ equipment_set_manager = EquipmentSetManager()
 if len(equipment_set_manager.get_all()) == 0:
     equipment_set_manager.create_default_sets()
 
+# --- Simulation Result Cache ---
+# SIM_CACHE_DIR 非空时启用磁盘层
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("SIM_CACHE_ENTRIES", "64")),
+    disk_dir=os.environ.get("SIM_CACHE_DIR") or None,
+    disk_max_bytes=int(os.environ.get("SIM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+)
+
+# --- Simulation Worker Pool ---
+# 模拟在独立进程中运行，不阻塞事件循环；SIM_WORKERS=0 时在后台线程中运行（不支持超时取消）
+simulation_pool = WorkerPool(
+    workers=int(os.environ.get("SIM_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_queue=int(os.environ.get("SIM_QUEUE_LIMIT", "16")),
+    timeout=float(os.environ.get("SIM_TIMEOUT", "120")),
+    initializer=init_worker,
+)
+
+# --- Simulation Jobs ---
+# 长时间/批量模拟以任务形式提交，保存在 sqlite 中，重启后继续执行
+job_store = JobStore(os.environ.get("SIM_JOB_DB", "jobs.db"))
+JOB_MAX_ITEMS = int(os.environ.get("SIM_JOB_MAX_ITEMS", "10000"))
+
 def load_all_characters():
     global CHAR_MAP, CHAR_DEFAULT_SCRIPTS
-    CHAR_MAP = {}
-    CHAR_DEFAULT_SCRIPTS = {}
-    
-    char_pkg_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "entities", "characters")
-    
-    # Iterate over all modules in entities.characters
-    for _, name, _ in pkgutil.iter_modules([char_pkg_path]):
-        if name.endswith("_sim") and name != "base_actor":
-            try:
-                module = importlib.import_module(f"entities.characters.{name}")
-                # Find classes that inherit from BaseActor
-                for attr_name, obj in inspect.getmembers(module):
-                    if inspect.isclass(obj) and issubclass(obj, BaseActor) and obj != BaseActor:
-                        # Found a character class!
-                        # To get the Chinese name, we ideally need to instantiate it or check a class attribute.
-                        # Since instantiation requires an engine, let's try to inspect the __init__ source code 
-                        # or just instantiate with a dummy engine if possible.
-                        # But instantiating with None engine might crash if __init__ uses engine immediately.
-                        # Let's try to look for a specific class attribute if we added one, 
-                        # OR instantiate with a dummy engine.
-                        
-                        try:
-                            # Create a dummy engine that just eats logs/events
-                            class DummyEngineForInit:
-                                def __init__(self):
-                                    self.event_bus = type('obj', (object,), {'subscribe': lambda *args: None})()
-                                    self.log = lambda *args, **kwargs: None
-                            
-                            # Instantiate just to get the name
-                            temp_instance = obj(DummyEngineForInit(), None)
-                            char_name = temp_instance.name
-                            CHAR_MAP[char_name] = obj
-                            
-                            # Generate default script based on capabilities
-                            script_lines = []
-                            if hasattr(obj, 'create_skill'):
-                                script_lines.append("skill")
-                                script_lines.append("wait 2.0")
-                            if hasattr(obj, 'create_ult'):
-                                script_lines.append("ult")
-                            
-                            if not script_lines:
-                                script_lines = ["a1", "wait 1.0", "a2"]
-                                
-                            CHAR_DEFAULT_SCRIPTS[char_name] = "\n".join(script_lines)
-                            logger.info(f"Loaded character: {char_name} from {name}")
-
-                        except Exception as e:
-                            logger.error(f"Failed to load character from {name}: {e}", exc_info=True)
-
-            except Exception as e:
-                logger.error(f"Error importing module {name}: {e}", exc_info=True)
+    CHAR_MAP, CHAR_DEFAULT_SCRIPTS = discover_characters()
 
 # Load characters on startup
 load_all_characters()
@@ -210,11 +202,21 @@ class EnemyConfig(BaseModel):
 
 class SimulationRequest(BaseModel):
     duration: float = 20.0
+    seed: Optional[int] = None  # 随机种子，留空则随机生成（结果中返回实际使用的种子）
+    crit_mode: Optional[Literal["random", "expected"]] = None  # 留空读取配置
+    # full 逐帧完整快照；delta 增量编码（体积约为 1/50，用 snapshot_history.decode_history 或前端 decodeHistory 还原）；
+    # keyframes 只返回每10秒一帧完整快照
+    history_format: Literal["full", "delta", "keyframes"] = "full"
+    # 快照采样：每 snapshot_every 个tick一帧（帧内伤害为区间累计），或只在状态变化时输出一帧；
+    # snapshot_fields 选择输出的字段，留空为全部，未选字段不捕获
+    snapshot_every: int = Field(1, ge=1, le=600)
+    snapshot_on_change: bool = False
+    snapshot_fields: Optional[List[Literal["damage", "sp", "buffs", "actions", "extra", "qte"]]] = None
     enemy: EnemyConfig
     characters: List[CharacterConfig]
 
-def parse_script_input(text):
-    return [line.strip() for line in text.split('\n') if line.strip()]
+class JobCreate(BaseModel):
+    requests: List[SimulationRequest]
 
 @app.get("/characters")
 async def get_characters():
@@ -279,12 +281,10 @@ async def get_character_default_attrs(character_name: str):
         char_class = CHAR_MAP[character_name]
 
         # 创建临时实例来获取默认属性
-        class DummyEngineForAttrs:
-            def __init__(self):
-                self.event_bus = type('obj', (object,), {'subscribe': lambda *args: None})()
-                self.log = lambda *args, **kwargs: None
-
-        temp_instance = char_class(DummyEngineForAttrs(), None)
+        temp_engine = SimEngine()
+        temp_instance = char_class(temp_engine, None)
+        temp_engine.entities.append(temp_instance)
+        temp_engine.dispose()
 
         # 提取属性
         attrs_dict = {
@@ -329,7 +329,6 @@ async def calculate_panel(request: PanelCalculationRequest):
             raise HTTPException(status_code=404, detail=f"Character {request.character_name} not found")
 
         # 创建临时引擎和目标
-        from simulation.engine import SimEngine
         temp_engine = SimEngine()
         temp_target = DummyEnemy(temp_engine, "temp", defense=100)
 
@@ -338,49 +337,18 @@ async def calculate_panel(request: PanelCalculationRequest):
         obj = char_class(temp_engine, temp_target)
 
         # 应用自定义属性覆盖（如果有）
-        if request.custom_attrs:
-            if request.custom_attrs.get('level'):
-                obj.base_stats.level = request.custom_attrs['level']
-
-            if request.custom_attrs.get('attrs'):
-                for attr_name, attr_value in request.custom_attrs['attrs'].items():
-                    if hasattr(obj.attrs, attr_name):
-                        setattr(obj.attrs, attr_name, attr_value)
-
-            if request.custom_attrs.get('base_stats'):
-                for stat_name, stat_value in request.custom_attrs['base_stats'].items():
-                    if hasattr(obj.base_stats, stat_name):
-                        setattr(obj.base_stats, stat_name, stat_value)
+        apply_custom_attrs(obj, request.custom_attrs)
 
         # 应用武器（如果有）
         if request.weapon_id:
             weapon = weapon_manager.get(request.weapon_id)
             if weapon:
                 obj.base_stats.weapon_atk = weapon.weapon_atk
-
-                for stat_name, stat_value in weapon.stat_bonuses.items():
-                    if hasattr(obj.attrs, stat_name):
-                        current = getattr(obj.attrs, stat_name)
-                        setattr(obj.attrs, stat_name, current + int(stat_value))
-                    elif hasattr(obj.base_stats, stat_name):
-                        current = getattr(obj.base_stats, stat_name)
-                        setattr(obj.base_stats, stat_name, current + stat_value)
+                apply_stat_bonuses(obj, weapon.stat_bonuses)
 
         # 应用装备（如果有）
-        if request.equipment_ids:
-            for slot, equipment_id in request.equipment_ids.items():
-                if not equipment_id:
-                    continue
-
-                equipment = equipment_manager.get(equipment_id)
-                if equipment:
-                    for stat_name, stat_value in equipment.stat_bonuses.items():
-                        if hasattr(obj.attrs, stat_name):
-                            current = getattr(obj.attrs, stat_name)
-                            setattr(obj.attrs, stat_name, current + int(stat_value))
-                        elif hasattr(obj.base_stats, stat_name):
-                            current = getattr(obj.base_stats, stat_name)
-                            setattr(obj.base_stats, stat_name, current + stat_value)
+        for equipment in resolve_equipments(request.equipment_ids, equipment_manager):
+            apply_stat_bonuses(obj, equipment.stat_bonuses)
 
         # 获取计算后的面板
         panel = obj.get_current_panel()
@@ -392,6 +360,9 @@ async def calculate_panel(request: PanelCalculationRequest):
             panel['intelligence'] = obj.attrs.intelligence
             panel['willpower'] = obj.attrs.willpower
 
+        temp_engine.entities.extend([temp_target, obj])
+        temp_engine.dispose()
+
         # 返回面板数据
         return {
             "character_name": request.character_name,
@@ -499,12 +470,14 @@ async def update_weapon(weapon_id: str, data: WeaponUpdate):
     )
     if not weapon:
         raise HTTPException(status_code=404, detail="Weapon not found")
+    result_cache.invalidate(("weapon", weapon_id))
     return weapon.to_dict()
 
 @app.delete("/weapons/{weapon_id}")
 async def delete_weapon(weapon_id: str):
     """删除武器"""
     success = weapon_manager.delete(weapon_id)
+    result_cache.invalidate(("weapon", weapon_id))
     if not success:
         raise HTTPException(status_code=404, detail="Weapon not found")
     return {"success": True}
@@ -558,226 +531,257 @@ async def update_equipment(equipment_id: str, data: EquipmentUpdate):
     )
     if not equipment:
         raise HTTPException(status_code=404, detail="Equipment not found")
+    result_cache.invalidate(("equipment", equipment_id))
     return equipment.to_dict()
 
 @app.delete("/equipments/{equipment_id}")
 async def delete_equipment(equipment_id: str):
     """删除装备"""
     success = equipment_manager.delete(equipment_id)
+    result_cache.invalidate(("equipment", equipment_id))
     if not success:
         raise HTTPException(status_code=404, detail="Equipment not found")
     return {"success": True}
 
+def simulation_cache_entry(request: SimulationRequest) -> Tuple[Optional[str], List[Tuple[str, str]]]:
+    """
+    请求的缓存键与依赖
+    键包含请求本身、引用的武器/装备/套装的当前内容与全局配置；
+    未指定种子的请求每次都应重新抽样（期望值模式下仍有随机触发的效果），键为 None，不读写缓存
+    """
+    if request.seed is None:
+        return None, []
+    weapons, equipments, sets, deps = {}, {}, {}, set()
+    for c in request.characters:
+        if c.weapon_id:
+            deps.add(("weapon", c.weapon_id))
+            weapon = weapon_manager.get(c.weapon_id)
+            weapons[c.weapon_id] = weapon.to_dict() if weapon else None
+        for equipment_id in (c.equipment_ids or {}).values():
+            if not equipment_id:
+                continue
+            deps.add(("equipment", equipment_id))
+            equipment = equipment_manager.get(equipment_id)
+            equipments[equipment_id] = equipment.to_dict() if equipment else None
+            if equipment and equipment.set_id:
+                equipment_set = equipment_set_manager.get(equipment.set_id)
+                sets[equipment.set_id] = equipment_set.to_dict() if equipment_set else None
+
+    key = cache_key({
+        "request": request.model_dump(mode="json"),
+        "weapons": weapons,
+        "equipments": equipments,
+        "sets": sets,
+        "config": get_config().to_dict(),
+    })
+    return key, sorted(deps)
+
+def resolve_loadouts(request: SimulationRequest) -> List[Tuple[Any, List[Any]]]:
+    """按请求解析各角色的武器与装备（在主进程中读取最新的武器/装备库）"""
+    loadouts = []
+    for c in request.characters:
+        weapon = weapon_manager.get(c.weapon_id) if c.weapon_id else None
+        loadouts.append((weapon, resolve_equipments(c.equipment_ids, equipment_manager)))
+    return loadouts
+
 @app.post("/simulate")
 async def run_simulation(request: SimulationRequest):
-    try:
-        sim = SnapshotEngine()
-        
-        # Setup Enemy
-        from core.enums import Element
-        target = DummyEnemy(sim, "测试机甲",
-                            defense=request.enemy.defense,
-                            resistances={
-                                Element.PHYSICAL: 1.0 - request.enemy.dmg_taken_mult_physical,
-                                Element.HEAT: 1.0 - request.enemy.dmg_taken_mult_heat,
-                                Element.ELECTRIC: 1.0 - request.enemy.dmg_taken_mult_electric,
-                                Element.NATURE: 1.0 - request.enemy.dmg_taken_mult_nature,
-                                Element.FROST: 1.0 - request.enemy.dmg_taken_mult_frost
-                            })
-        sim.entities.append(target)
-        
-        # Setup Characters
-        char_names = []
-        for c in request.characters:
-            # Skip empty slots (name="无") but keep track of them if needed for indexing
-            # However, SimEngine usually just needs active entities.
-            if c.name == "无":
-                continue
+    key, deps = simulation_cache_entry(request)
+    cached = result_cache.get(key) if key is not None else None
+    if cached is not None:
+        return cached
 
-            if c.name not in CHAR_MAP:
-                continue
+    try:
+        result = await simulation_pool.submit(
+            run_snapshot_simulation, request.model_dump(), resolve_loadouts(request), equipment_set_manager
+        )
+    except (PoolBusyError, PoolTimeoutError, TaskError) as e:
+        raise simulation_error(e)
+
+    result = jsonable_encoder(result)
+    if key is not None:
+        result_cache.put(key, result, deps)
+    return result
+
+async def simulation_events(request: SimulationRequest, chunk_ticks: int):
+    """
+    /simulate 的流式版本，依次产出 start / chunk / done 事件（见 stream_snapshot_simulation）
+    缓存命中时直接拆分缓存结果；完整跑完后把拼接出的结果写入缓存
+    """
+    key, deps = simulation_cache_entry(request)
+    cached = result_cache.get(key) if key is not None else None
+    if cached is not None:
+        for event in replay_stream(cached, chunk_ticks):
+            yield event
+        return
+
+    result = {}
+    async with aclosing(simulation_pool.stream(
+        stream_snapshot_simulation, request.model_dump(), resolve_loadouts(request), equipment_set_manager,
+        chunk_ticks,
+    )) as events:
+        async for event in events:
+            event = jsonable_encoder(event)
+            merge_stream_event(result, event)
+            yield event
+    if key is not None:
+        result_cache.put(key, result, deps)
+
+def simulation_error(e: Exception) -> HTTPException:
+    """进程池异常对应的HTTP错误"""
+    if isinstance(e, PoolBusyError):
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    if isinstance(e, PoolTimeoutError):
+        # 排队超时说明服务繁忙；执行超时的任务已被取消
+        return HTTPException(status_code=503 if e.queued else 504, detail=str(e))
+    if isinstance(e, TaskError):
+        logger.error("模拟失败: %s\n%s", e, e.remote_traceback)
+    return HTTPException(status_code=500, detail=str(e))
+
+@app.post("/simulate/stream")
+async def stream_simulation(request: SimulationRequest, chunk_ticks: int = 50):
+    """
+    以 Server-Sent Events 分段推送模拟进度（event 为 start / chunk / done / error，data 为 JSON）
+    客户端断开连接即取消模拟；客户端读取慢时模拟随之暂停
+    """
+    chunk_ticks = max(1, min(chunk_ticks, 600))
+    events = simulation_events(request, chunk_ticks)
+    try:
+        # 先取首个事件，排队/启动阶段的错误仍以HTTP状态码返回
+        first = await events.__anext__()
+    except (PoolBusyError, PoolTimeoutError, TaskError) as e:
+        raise simulation_error(e)
 
-            char_class = CHAR_MAP[c.name]
-            obj = char_class(sim, target)
-
-            # 应用自定义属性覆盖（如果有）
-            if c.custom_attrs:
-                # 覆盖等级
-                if c.custom_attrs.get('level'):
-                    obj.base_stats.level = c.custom_attrs['level']
-
-                # 覆盖四维属性
-                if c.custom_attrs.get('attrs'):
-                    for attr_name, attr_value in c.custom_attrs['attrs'].items():
-                        if hasattr(obj.attrs, attr_name):
-                            setattr(obj.attrs, attr_name, attr_value)
-
-                # 覆盖基础面板
-                if c.custom_attrs.get('base_stats'):
-                    for stat_name, stat_value in c.custom_attrs['base_stats'].items():
-                        if hasattr(obj.base_stats, stat_name):
-                            setattr(obj.base_stats, stat_name, stat_value)
-
-            # 应用武器（如果有）
-            if c.weapon_id:
-                weapon = weapon_manager.get(c.weapon_id)
-                if weapon:
-                    # 应用武器攻击力
-                    obj.base_stats.weapon_atk = weapon.weapon_atk
-
-                    # 应用属性加成
-                    for stat_name, stat_value in weapon.stat_bonuses.items():
-                        # 四维属性
-                        if hasattr(obj.attrs, stat_name):
-                            current = getattr(obj.attrs, stat_name)
-                            setattr(obj.attrs, stat_name, current + int(stat_value))
-                        # 基础面板属性
-                        elif hasattr(obj.base_stats, stat_name):
-                            current = getattr(obj.base_stats, stat_name)
-                            setattr(obj.base_stats, stat_name, current + stat_value)
-
-                    # 应用武器特殊效果
-                    if weapon.effects:
-                        weapon_handler = WeaponEffectHandler(obj, weapon, sim)
-                        # 存储 handler 引用以便后续清理
-                        if not hasattr(obj, 'weapon_handlers'):
-                            obj.weapon_handlers = []
-                        obj.weapon_handlers.append(weapon_handler)
-
-            # 应用装备（如果有）
-            if c.equipment_ids:
-                if not hasattr(obj, 'equipment_handlers'):
-                    obj.equipment_handlers = []
-
-                # 收集所有装备
-                equipped_items = []
-                for slot, equipment_id in c.equipment_ids.items():
-                    if not equipment_id:
-                        continue
-
-                    equipment = equipment_manager.get(equipment_id)
-                    if equipment:
-                        equipped_items.append(equipment)
-                        # 应用装备属性加成
-                        for stat_name, stat_value in equipment.stat_bonuses.items():
-                            # 四维属性
-                            if hasattr(obj.attrs, stat_name):
-                                current = getattr(obj.attrs, stat_name)
-                                setattr(obj.attrs, stat_name, current + int(stat_value))
-                            # 基础面板属性
-                            elif hasattr(obj.base_stats, stat_name):
-                                current = getattr(obj.base_stats, stat_name)
-                                setattr(obj.base_stats, stat_name, current + stat_value)
-
-                        # 应用装备特殊效果
-                        if equipment.effects:
-                            equipment_handler = EquipmentEffectHandler(obj, equipment, sim)
-                            obj.equipment_handlers.append(equipment_handler)
-
-                # 检查并应用套装效果
-                if equipped_items:
-                    active_set_bonuses = equipment_set_manager.check_set_bonuses(equipped_items)
-                    for set_id, bonuses in active_set_bonuses.items():
-                        equipment_set = equipment_set_manager.get(set_id)
-                        for bonus in bonuses:
-                            # 应用套装属性加成
-                            for stat_name, stat_value in bonus.stat_bonuses.items():
-                                # 四维属性
-                                if hasattr(obj.attrs, stat_name):
-                                    current = getattr(obj.attrs, stat_name)
-                                    setattr(obj.attrs, stat_name, current + int(stat_value))
-                                # 基础面板属性
-                                elif hasattr(obj.base_stats, stat_name):
-                                    current = getattr(obj.base_stats, stat_name)
-                                    setattr(obj.base_stats, stat_name, current + stat_value)
-
-                            # 记录套装效果激活
-                            sim.log(f"[{obj.name}] 套装效果激活: {equipment_set.name} - {bonus.description}")
-
-                            # 应用套装特殊效果（如果有）
-                            if bonus.effects:
-                                for effect in bonus.effects:
-                                    # 创建一个临时装备对象来应用套装效果
-                                    from core.equipment_system import Equipment
-                                    temp_equipment = Equipment(
-                                        id=f"set_{set_id}",
-                                        name=f"{equipment_set.name}套装效果",
-                                        description=bonus.description,
-                                        slot="set",
-                                        stat_bonuses={},
-                                        effects=[effect]
-                                    )
-                                    equipment_handler = EquipmentEffectHandler(obj, temp_equipment, sim)
-                                    obj.equipment_handlers.append(equipment_handler)
-
-            if hasattr(obj, "molten_stacks"):
-                obj.molten_stacks = c.molten_stacks
-                
-            if c.timeline:
-                # Use timeline mode
-                # Filter out 'wait' actions and normalize commands
-                timeline_data = []
-                for t in c.timeline:
-                    cmd = t.name.lower().strip()
-                    # Skip explicit wait commands in timeline mode (handled by timestamps)
-                    if "wait" in cmd:
-                        continue
-                    
-                    # Normalize common Frontend issues
-                    if cmd == "attack": cmd = "a1"
-                    if cmd == "skill": cmd = "skill" # keep
-                    if cmd == "ult": cmd = "ult"     # keep
-                    if cmd == "qte": cmd = "qte"     # keep
-                    
-                    timeline_data.append((t.startTime, cmd))
-                
-                if hasattr(obj, "set_timeline"):
-                    obj.set_timeline(timeline_data)
-                else:
-                    # Fallback to script if set_timeline not available (should be added to BaseActor)
-                    obj.set_script(parse_script_input(c.script))
-            else:
-                obj.set_script(parse_script_input(c.script))
-                
-            sim.entities.append(obj)
-            char_names.append(obj.name)
-            
-        # Run
-        sim.run_with_snapshots(request.duration)
-        
-        # Prepare Result
-        # We need to serialize the statistics manually if it's not JSON serializable
-        stats_data = None
-        if hasattr(sim, 'statistics'):
-            stats_data = {}
-            for name, cs in sim.statistics.character_stats.items():
-                stats_data[name] = {
-                    "name": cs.name,
-                    "total_damage": cs.total_damage,
-                    "skill_counts": dict(cs.skill_count) # Convert Counter to dict explicitly
-                }
+    def encode(event):
+        return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
 
-        # Ensure logs are serializable
-        safe_logs = []
-        for log in sim.logs:
-            safe_logs.append({
-                "time": str(log.get("time", "")),
-                "message": str(log.get("message", "")),
-                "type": str(log.get("type", "info"))
-            })
+    async def body():
+        async with aclosing(events):
+            yield encode(first)
+            try:
+                async for event in events:
+                    yield encode(event)
+            except (PoolTimeoutError, TaskError) as e:
+                yield encode({"type": "error", "status": simulation_error(e).status_code, "detail": str(e)})
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.websocket("/simulate/ws")
+async def simulation_websocket(websocket: WebSocket, chunk_ticks: int = 50):
+    """
+    WebSocket 分段推送：客户端发送 SimulationRequest 的 JSON，服务端逐条发送 start / chunk / done 事件；
+    运行中客户端发送 {"type": "cancel"} 或断开连接即取消模拟
+    """
+    await websocket.accept()
+    try:
+        request = SimulationRequest(**await websocket.receive_json())
+    except (ValidationError, TypeError, ValueError) as e:
+        await websocket.send_json({"type": "error", "status": 422, "detail": str(e)})
+        await websocket.close()
+        return
+    except WebSocketDisconnect:
+        return
+
+    incoming = asyncio.ensure_future(websocket.receive_json())
+    cancelled = False
+    try:
+        async with aclosing(simulation_events(request, max(1, min(chunk_ticks, 600)))) as events:
+            async for event in events:
+                # 任何客户端消息（取消）或断开都会结束推送
+                if incoming.done():
+                    cancelled = True
+                    break
+                await websocket.send_json(event)
+        await websocket.send_json({"type": "cancelled"} if cancelled else {"type": "end"})
+        await websocket.close()
+    except (PoolBusyError, PoolTimeoutError, TaskError) as e:
+        error = simulation_error(e)
+        await websocket.send_json({"type": "error", "status": error.status_code, "detail": error.detail})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        incoming.cancel()
+
+async def run_job_item(request_data: Dict[str, Any]) -> Dict[str, Any]:
+    """执行任务中的一项（与 /simulate 共用缓存与进程池）"""
+    request = SimulationRequest(**request_data)
+    key, deps = simulation_cache_entry(request)
+    cached = result_cache.get(key) if key is not None else None
+    if cached is not None:
+        return cached
+    result = jsonable_encoder(await simulation_pool.submit(
+        run_snapshot_simulation, request.model_dump(), resolve_loadouts(request), equipment_set_manager
+    ))
+    if key is not None:
+        result_cache.put(key, result, deps)
+    return result
+
+# 默认留一个工作进程给交互式请求；进程池繁忙时该项稍后重试
+job_runner = JobRunner(
+    job_store, run_job_item,
+    concurrency=int(os.environ.get("SIM_JOB_CONCURRENCY", str(max(1, simulation_pool.workers - 1)))),
+    retry_on=(PoolBusyError,),
+    retry_delay=1.0,
+)
 
-        return {
-            "history": sim.history,
-            "logs": safe_logs, # sending flat logs list
-            "total_dmg": target.total_damage_taken,
-            "char_names": char_names,
-            "statistics": stats_data
-        }
+@app.post("/jobs", status_code=202)
+async def create_job(data: Union[JobCreate, SimulationRequest]):
+    """提交单条或批量模拟请求，立即返回任务ID；通过 /jobs/{id} 查询进度"""
+    requests = data.requests if isinstance(data, JobCreate) else [data]
+    if not requests:
+        raise HTTPException(status_code=422, detail="requests 不能为空")
+    if len(requests) > JOB_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"单个任务最多 {JOB_MAX_ITEMS} 条请求")
+    job_id = await job_runner.submit([r.model_dump(mode="json") for r in requests])
+    return await asyncio.to_thread(job_store.get, job_id)
+
+@app.get("/jobs")
+async def list_jobs(limit: int = 50):
+    return await asyncio.to_thread(job_store.list, max(1, min(limit, 500)))
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, offset: int = 0, limit: int = 50, summary: bool = False):
+    """
+    分页获取各项结果（按提交顺序）；未完成的项 result 为 null
+    summary=true 时只返回总伤害、角色、统计与种子，不含快照与日志
+    """
+    job = await asyncio.to_thread(job_store.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    offset = max(0, offset)
+    limit = max(1, min(limit, 1000 if summary else 100))
+    # 结果需解压与解码，在线程中执行
+    items = await asyncio.to_thread(job_store.results, job_id, offset, limit, summary)
+    next_offset = offset + len(items)
+    return {
+        "job": job,
+        "offset": offset,
+        "items": items,
+        "next_offset": next_offset if next_offset < job["total"] else None,
+    }
 
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    """取消任务：未开始的项不再执行，已完成的结果保留"""
+    if not await asyncio.to_thread(job_store.cancel, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return await asyncio.to_thread(job_store.get, job_id)
+
+@app.delete("/jobs/{job_id}")
+async def delete_job(job_id: str):
+    await asyncio.to_thread(job_store.cancel, job_id)
+    if not await asyncio.to_thread(job_store.delete, job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"success": True}
 
 # Mount static files for frontend
 web_dist_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "web", "dist")
@@ -133,7 +133,10 @@ class SnapshotEngine(SimEngine):
         self.damage_by_tick = defaultdict(int)
         self.logs = [] 
 
-    def log(self, message):
+    def wants_log(self, level="INFO", kind=None):
+        return True
+
+    def log(self, message, level="INFO", kind=None):
         # 记录日志
         timestamp = f"[{int(self.tick/10 // 60):02}:{self.tick/10 % 60:04.1f}]"
         
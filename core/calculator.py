@@ -1,10 +1,12 @@
+from .config_manager import get_config
 from .enums import Element, MoveType
 from .stats import StatKey
 
 class DamageEngine:
     @staticmethod
     def calculate(attacker_stats: dict, target_stats: dict, skill_mv: float,
-                  element: Element, move_type: MoveType = MoveType.OTHER, is_crit: bool = False):
+                  element: Element, move_type: MoveType = MoveType.OTHER, is_crit: bool = False,
+                  expected_crit: bool = False):
         """
         伤害计算公式（14个乘区）：
         基础伤害区 × 暴击区 × 伤害加成区 × 伤害减免区 × 易伤区 × 增幅区 × 庇护区 ×
@@ -17,6 +19,8 @@ class DamageEngine:
             element: 元素类型
             move_type: 招式类型
             is_crit: 是否暴击（True=暴击，False=不暴击）
+            expected_crit: 期望暴击模式，暴击区取 1 + 暴击率 × 暴击伤害，忽略 is_crit，
+                           返回未取整的期望伤害
         """
 
         # ============================================================
@@ -28,7 +32,11 @@ class DamageEngine:
         # ============================================================
         # 2. 暴击区
         # ============================================================
-        if is_crit:
+        if expected_crit:
+            # 期望暴击：按暴击率加权
+            c_dmg = attacker_stats.get(StatKey.CRIT_DMG, 0.5)
+            crit_mult = 1.0 + DamageEngine.effective_crit_rate(attacker_stats) * c_dmg
+        elif is_crit:
             # 真实暴击：应用暴击伤害加成
             c_dmg = attacker_stats.get(StatKey.CRIT_DMG, 0.5)
             crit_mult = 1.0 + c_dmg
@@ -180,4 +188,342 @@ class DamageEngine:
             special_mult                    # 14. 特殊加成区
         )
 
-        return int(final_dmg)
\ No newline at end of file
+        if expected_crit:
+            return final_dmg
+        return int(final_dmg)
+
+    @staticmethod
+    def calculate_batch(attacker, target, skill_mv, element, move_type, is_crit=False,
+                        expected_crit: bool = False):
+        """
+        14 乘区公式的 NumPy 批量版本，逐元素结果与 calculate 一致
+
+        Args:
+            attacker: 攻击方属性结构化数组（字段名同面板键，见 stats_array）
+            target: 目标属性结构化数组
+            skill_mv: 技能倍率数组
+            element: 元素编码数组（ELEMENT_ORDER 中的下标）
+            move_type: 招式类型编码数组（MOVE_TYPE_ORDER 中的下标）
+            is_crit: 是否暴击（布尔数组或标量）
+            expected_crit: 期望暴击模式
+
+        各参数按 NumPy 规则广播，例如 attacker[:, None] 与逐命中数组组合，
+        即可对一条命中序列在大量属性方案下批量重算。
+
+        Returns:
+            伤害数组：随机模式下为向零取整的 int64，期望模式下为 float64
+        """
+        import numpy as np
+
+        skill_mv = np.asarray(skill_mv, dtype=np.float64)
+        element = np.asarray(element, dtype=np.intp)
+        move_type = np.asarray(move_type, dtype=np.intp)
+        is_physical = element == _PHYSICAL_CODE
+        is_staggered = _field(target, 'is_staggered', False).astype(bool)
+
+        def per_element(stats, template):
+            return np.choose(element, [_field(stats, template.format(e.value), 0.0) for e in ELEMENT_ORDER])
+
+        # 1. 基础伤害区
+        base_dmg = _field(attacker, StatKey.FINAL_ATK, 0.0) * (skill_mv / 100.0)
+
+        # 2. 暴击区
+        c_dmg = _field(attacker, StatKey.CRIT_DMG, 0.5)
+        if expected_crit:
+            config = get_config()
+            crit_rate = np.minimum(config.crit_rate_cap,
+                                   np.maximum(config.crit_rate_floor, _field(attacker, StatKey.CRIT_RATE, 0.0)))
+            crit_mult = 1.0 + crit_rate * c_dmg
+        else:
+            crit_mult = np.where(is_crit, 1.0 + c_dmg, 1.0)
+
+        # 3. 伤害加成区
+        base_bonus = _field(attacker, StatKey.DMG_BONUS, 0.0)
+        type_bonus = np.where(is_physical, _field(attacker, StatKey.PHYSICAL_DMG_BONUS, 0.0),
+                              _field(attacker, StatKey.MAGIC_DMG_BONUS, 0.0))
+        move_bonus = np.choose(move_type, [
+            _field(attacker, _MOVE_BONUS_KEYS[m], 0.0) if m in _MOVE_BONUS_KEYS else 0.0
+            for m in MOVE_TYPE_ORDER
+        ])
+        move_bonus = np.where(move_type == _HEAVY_CODE,
+                              move_bonus + _field(attacker, 'heavy_dmg_bonus', 0.0), move_bonus)
+        elem_bonus = per_element(attacker, "{}_dmg_bonus")
+        stagger_bonus = np.where(is_staggered, _field(attacker, 'stagger_dmg_bonus', 0.0), 0.0)
+        bonus_mult = 1.0 + base_bonus + type_bonus + move_bonus + elem_bonus + stagger_bonus
+
+        # 4. 伤害减免区
+        dmg_reduction_mult = 1.0 - _field(target, 'dmg_reduction', 0.0)
+
+        # 5. 易伤区
+        vuln = _field(target, StatKey.VULNERABILITY, 0.0)
+        vuln = vuln + np.where(is_physical, _field(target, StatKey.PHYS_VULN, 0.0),
+                               _field(target, StatKey.MAGIC_VULN, 0.0))
+        vuln = vuln + per_element(target, "{}_vulnerability")
+        vuln_mult = 1.0 + vuln
+
+        # 6. 增幅区
+        base_amp = _field(attacker, StatKey.AMPLIFICATION, 0.0)
+        type_amp = np.where(is_physical, _field(attacker, 'physical_amplification', 0.0),
+                            _field(attacker, 'magic_amplification', 0.0))
+        amp_mult = 1.0 + base_amp + type_amp + per_element(attacker, "{}_amplification")
+
+        # 7. 庇护区
+        sanctuary_mult = 1.0 - _field(target, 'sanctuary', 0.0)
+
+        # 8. 脆弱区
+        fragility = _field(target, StatKey.FRAGILITY, 0.0) + per_element(target, "{}_fragility")
+        fragility_mult = 1.0 + fragility
+
+        # 9. 防御区
+        defense = np.maximum(0, _field(target, StatKey.DEFENSE, 0.0))
+        def_mult = 100.0 / (100.0 + defense)
+
+        # 10. 失衡易伤区
+        stagger_vuln_mult = np.where(is_staggered, 1.3, 1.0)
+
+        # 11. 减伤区
+        dmg_reduction_extra_mult = 1.0 - _field(target, 'dmg_reduction_extra', 0.0)
+
+        # 12. 抗性区
+        raw_res = per_element(target, "{}_res")
+        res_mult = 1.0 - np.maximum(0.0, raw_res - _field(attacker, StatKey.RES_PEN, 0.0))
+
+        # 13. 非主控减伤区
+        non_main_mult = _field(attacker, 'non_main_penalty', 1.0)
+
+        # 14. 特殊加成区
+        special_mult = 1.0 + _field(attacker, StatKey.SPECIAL_BONUS, 0.0)
+
+        final_dmg = (
+            base_dmg * crit_mult * bonus_mult * dmg_reduction_mult * vuln_mult * amp_mult *
+            sanctuary_mult * fragility_mult * def_mult * stagger_vuln_mult *
+            dmg_reduction_extra_mult * res_mult * non_main_mult * special_mult
+        )
+
+        if expected_crit:
+            return final_dmg
+        return np.trunc(final_dmg).astype(np.int64)
+
+    @staticmethod
+    def effective_crit_rate(attacker_stats: dict) -> float:
+        """受上下限约束的暴击率（与随机判定 random() < 暴击率 的实际概率一致）"""
+        config = get_config()
+        crit_rate = attacker_stats.get(StatKey.CRIT_RATE, 0.0)
+        return min(config.crit_rate_cap, max(config.crit_rate_floor, crit_rate))
+
+class DamageKernel:
+    """
+    带乘区缓存的伤害计算内核
+
+    同一攻击方面板、目标防御快照与 (元素, 招式类型) 下，除基础伤害区与暴击区外的
+    12 个乘区都是常数；首次命中时求出并缓存，后续命中只做乘法。
+    乘法顺序与 DamageEngine.calculate 完全一致，结果逐位相同。
+
+    面板/防御快照按对象身份识别：面板在Buff版本变化时重建为新对象，
+    因此调用方不得原地修改已返回的面板字典。
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        # (id(攻击方面板), id(目标属性), 元素, 招式类型) -> (攻击方面板, 目标属性, 乘区元组)
+        # 条目持有两个字典的引用，保证 id 在缓存期间不会被复用
+        self._zones = {}
+
+    def clear(self):
+        self._zones.clear()
+
+    def zone_factors(self, attacker_stats: dict, target_stats: dict,
+                     element: Element, move_type: MoveType) -> tuple:
+        """
+        Returns:
+            (最终攻击力, 暴击伤害, 期望暴击乘区, 伤害加成区, 伤害减免区, 易伤区, 增幅区, 庇护区,
+             脆弱区, 防御区, 失衡易伤区, 减伤区, 抗性区, 非主控减伤区, 特殊加成区)
+        """
+        key = (id(attacker_stats), id(target_stats), element, move_type)
+        entry = self._zones.get(key)
+        if entry is not None:
+            return entry[2]
+
+        if len(self._zones) >= self.max_entries:
+            self._zones.clear()
+        zones = _compute_zone_factors(attacker_stats, target_stats, element, move_type)
+        self._zones[key] = (attacker_stats, target_stats, zones)
+        return zones
+
+    def calculate(self, attacker_stats: dict, target_stats: dict, skill_mv: float,
+                  element: Element, move_type: MoveType = MoveType.OTHER, is_crit: bool = False,
+                  expected_crit: bool = False):
+        """参数与返回值同 DamageEngine.calculate"""
+        (atk, c_dmg, expected_crit_mult, bonus_mult, dmg_reduction_mult, vuln_mult, amp_mult,
+         sanctuary_mult, fragility_mult, def_mult, stagger_vuln_mult, dmg_reduction_extra_mult,
+         res_mult, non_main_mult, special_mult) = self.zone_factors(attacker_stats, target_stats, element, move_type)
+
+        base_dmg = atk * (skill_mv / 100.0)
+        if expected_crit:
+            crit_mult = expected_crit_mult
+        elif is_crit:
+            crit_mult = 1.0 + c_dmg
+        else:
+            crit_mult = 1.0
+
+        final_dmg = (
+            base_dmg * crit_mult * bonus_mult * dmg_reduction_mult * vuln_mult * amp_mult *
+            sanctuary_mult * fragility_mult * def_mult * stagger_vuln_mult *
+            dmg_reduction_extra_mult * res_mult * non_main_mult * special_mult
+        )
+
+        if expected_crit:
+            return final_dmg
+        return int(final_dmg)
+
+
+# 招式类型 -> 招式增伤属性（重击另加 heavy_dmg_bonus）
+_MOVE_BONUS_KEYS = {
+    MoveType.NORMAL: StatKey.NORMAL_DMG_BONUS,
+    MoveType.HEAVY: StatKey.NORMAL_DMG_BONUS,
+    MoveType.PLUNGE: 'plunge_dmg_bonus',
+    MoveType.EXECUTION: 'execution_dmg_bonus',
+    MoveType.SKILL: StatKey.SKILL_DMG_BONUS,
+    MoveType.ULTIMATE: StatKey.ULT_DMG_BONUS,
+    MoveType.QTE: StatKey.QTE_DMG_BONUS,
+}
+
+
+def _compute_zone_factors(attacker_stats: dict, target_stats: dict,
+                          element: Element, move_type: MoveType) -> tuple:
+    """按 14 乘区公式求出与技能倍率、暴击判定无关的各乘区（运算顺序与 DamageEngine.calculate 一致）"""
+    atk = attacker_stats[StatKey.FINAL_ATK]
+    c_dmg = attacker_stats.get(StatKey.CRIT_DMG, 0.5)
+    expected_crit_mult = 1.0 + DamageEngine.effective_crit_rate(attacker_stats) * c_dmg
+
+    is_physical = element == Element.PHYSICAL
+    is_staggered = target_stats.get('is_staggered', False)
+    elem = element.value
+
+    # 3. 伤害加成区
+    base_bonus = attacker_stats.get(StatKey.DMG_BONUS, 0.0)
+    if is_physical:
+        type_bonus = attacker_stats.get(StatKey.PHYSICAL_DMG_BONUS, 0.0)
+    else:
+        type_bonus = attacker_stats.get(StatKey.MAGIC_DMG_BONUS, 0.0)
+    move_key = _MOVE_BONUS_KEYS.get(move_type)
+    move_bonus = attacker_stats.get(move_key, 0.0) if move_key is not None else 0.0
+    if move_type == MoveType.HEAVY:
+        move_bonus = move_bonus + attacker_stats.get('heavy_dmg_bonus', 0.0)
+    elem_bonus = attacker_stats.get(f"{elem}_dmg_bonus", 0.0)
+    stagger_bonus = attacker_stats.get('stagger_dmg_bonus', 0.0) if is_staggered else 0.0
+    bonus_mult = 1.0 + base_bonus + type_bonus + move_bonus + elem_bonus + stagger_bonus
+
+    # 4. 伤害减免区
+    dmg_reduction_mult = 1.0 - target_stats.get('dmg_reduction', 0.0)
+
+    # 5. 易伤区
+    vuln = target_stats.get(StatKey.VULNERABILITY, 0.0)
+    if not is_physical:
+        vuln += target_stats.get(StatKey.MAGIC_VULN, 0.0)
+    else:
+        vuln += target_stats.get(StatKey.PHYS_VULN, 0.0)
+    vuln += target_stats.get(f"{elem}_vulnerability", 0.0)
+    vuln_mult = 1.0 + vuln
+
+    # 6. 增幅区
+    base_amp = attacker_stats.get(StatKey.AMPLIFICATION, 0.0)
+    if is_physical:
+        type_amp = attacker_stats.get('physical_amplification', 0.0)
+    else:
+        type_amp = attacker_stats.get('magic_amplification', 0.0)
+    elem_amp = attacker_stats.get(f"{elem}_amplification", 0.0)
+    amp_mult = 1.0 + base_amp + type_amp + elem_amp
+
+    # 7. 庇护区
+    sanctuary_mult = 1.0 - target_stats.get('sanctuary', 0.0)
+
+    # 8. 脆弱区
+    fragility = target_stats.get(StatKey.FRAGILITY, 0.0)
+    fragility += target_stats.get(f"{elem}_fragility", 0.0)
+    fragility_mult = 1.0 + fragility
+
+    # 9. 防御区
+    defense = max(0, target_stats.get(StatKey.DEFENSE, 0))
+    def_const = 100.0
+    def_mult = def_const / (def_const + defense)
+
+    # 10. 失衡易伤区
+    stagger_vuln_mult = 1.3 if is_staggered else 1.0
+
+    # 11. 减伤区
+    dmg_reduction_extra_mult = 1.0 - target_stats.get('dmg_reduction_extra', 0.0)
+
+    # 12. 抗性区
+    raw_res = target_stats.get(f"{elem}_res", 0.0)
+    res_pen = attacker_stats.get(StatKey.RES_PEN, 0.0)
+    res_mult = 1.0 - max(0.0, raw_res - res_pen)
+
+    # 13. 非主控减伤区
+    non_main_mult = attacker_stats.get('non_main_penalty', 1.0)
+
+    # 14. 特殊加成区
+    special_mult = 1.0 + attacker_stats.get(StatKey.SPECIAL_BONUS, 0.0)
+
+    return (atk, c_dmg, expected_crit_mult, bonus_mult, dmg_reduction_mult, vuln_mult, amp_mult,
+            sanctuary_mult, fragility_mult, def_mult, stagger_vuln_mult, dmg_reduction_extra_mult,
+            res_mult, non_main_mult, special_mult)
+
+
+# ============================================================
+# 批量计算（NumPy）辅助
+# ============================================================
+
+# 元素/招式类型编码：calculate_batch 中以下标表示
+ELEMENT_ORDER = tuple(Element)
+MOVE_TYPE_ORDER = tuple(MoveType)
+_PHYSICAL_CODE = ELEMENT_ORDER.index(Element.PHYSICAL)
+_HEAVY_CODE = MOVE_TYPE_ORDER.index(MoveType.HEAVY)
+
+
+def element_codes(elements):
+    """元素序列 -> 编码数组"""
+    import numpy as np
+    return np.array([ELEMENT_ORDER.index(e) for e in elements], dtype=np.intp)
+
+
+def move_type_codes(move_types):
+    """招式类型序列 -> 编码数组"""
+    import numpy as np
+    return np.array([MOVE_TYPE_ORDER.index(m) for m in move_types], dtype=np.intp)
+
+
+def stats_array(stats_list, keys=None):
+    """
+    属性字典列表 -> 结构化数组（缺省键取公式中的默认值）
+    Args:
+        keys: 需要的字段，默认取所有字典键的并集；布尔值字段（如 is_staggered）保存为 bool
+    """
+    import numpy as np
+
+    stats_list = list(stats_list)
+    if keys is None:
+        keys = [key for stats in stats_list for key in stats]
+    keys = list(dict.fromkeys(keys))
+    dtype = [(key, bool if key == 'is_staggered' else np.float64) for key in keys]
+    array = np.zeros(len(stats_list), dtype=dtype)
+    for key in keys:
+        default = _FIELD_DEFAULTS.get(key, 0.0)
+        array[key] = [stats.get(key, default) for stats in stats_list]
+    return array
+
+
+# 与 DamageEngine.calculate 中 .get 默认值一致的非零缺省
+_FIELD_DEFAULTS = {
+    StatKey.CRIT_DMG: 0.5,
+    'non_main_penalty': 1.0,
+    'is_staggered': False,
+}
+
+
+def _field(stats, key, default):
+    """读取结构化数组字段，缺失时返回标量默认值（参与广播）"""
+    import numpy as np
+    if stats.dtype.names and key in stats.dtype.names:
+        return stats[key]
+    return np.asarray(default)
@@ -71,6 +71,7 @@ class ConfigManager:
         # 暴击相关
         self.crit_rate_cap = 1.0   # 暴击率上限
         self.crit_rate_floor = 0.0 # 暴击率下限
+        self.crit_mode = "random"  # random: 随机判定, expected: 期望值（确定性）
 
         # 元素附着系统
         self.max_attachment_stacks = 4  # 最大附着层数
@@ -92,6 +93,8 @@ class ConfigManager:
         self.enable_statistics = True   # 启用统计系统
         self.enable_event_system = True  # 启用事件系统
         self.enable_detailed_logging = False  # 启用详细日志
+        self.enable_fast_forward = False  # 启用离散事件快进（跳过空闲tick）
+        self.event_history_size = 100  # 事件总线保留的历史条数（0=关闭）
 
         self._initialized = True
 
@@ -4,7 +4,7 @@
 """
 from typing import TYPE_CHECKING, List, Union, Optional
 from core.calculator import DamageEngine
-from core.enums import Element, MoveType, PhysAnomalyType
+from core.enums import CritMode, Element, MoveType, PhysAnomalyType
 from core.stats import StatKey
 from simulation.event_system import EventType, EventBuilder
 
@@ -39,7 +39,7 @@ def deal_damage(engine: 'SimEngine', attacker: 'BaseActor', target: 'DummyEnemy'
         attachments: 施加的附着列表（包括元素附着和物理异常）。如果为None，默认尝试施加damage element。如果为空列表，则不施加。
 
     Returns:
-        int: 最终伤害值
+        int: 最终伤害值（期望暴击模式下为未取整的期望伤害）
     """
     # 1. 获取攻击方面板
     attacker_stats = attacker.get_current_panel()
@@ -61,43 +61,89 @@ def deal_damage(engine: 'SimEngine', attacker: 'BaseActor', target: 'DummyEnemy'
     target_stats = target.get_defense_stats()
 
     # 4. 判断是否暴击（在计算伤害前判定）
-    crit_rate = attacker_stats.get(StatKey.CRIT_RATE, 0.0)
-    import random
-    is_crit = random.random() < crit_rate
+    crit_rate = DamageEngine.effective_crit_rate(attacker_stats)
+    expected_crit = engine.crit_mode == CritMode.EXPECTED
+    if expected_crit:
+        # 期望模式不做随机判定，也不发布暴击事件
+        crit_roll = None
+        is_crit = False
+    else:
+        crit_roll = engine.rng.crit(attacker.name).random()
+        is_crit = crit_roll < crit_rate
 
     # 5. 计算伤害（传入暴击判定结果）
     total_mv = skill_mv + reaction_result.extra_mv
-    base_damage = DamageEngine.calculate(
-        attacker_stats, target_stats, total_mv, element, move_type, is_crit=is_crit
+    base_damage = engine.damage_kernel.calculate(
+        attacker_stats, target_stats, total_mv, element, move_type,
+        is_crit=is_crit, expected_crit=expected_crit
     )
 
     final_damage = base_damage
 
     # 6. 发布伤害前事件（允许其他系统修改伤害）
-    pre_damage_event = EventBuilder.damage_event(
-        source=attacker,
-        target=target,
-        damage=final_damage,
-        skill_name=skill_name,
-        element=element,
-        move_type=move_type,
-        tick=engine.tick,
-        is_crit=is_crit
-    )
-    engine.event_bus.emit(pre_damage_event)
+    # 伤害前/后事件共用一个事件对象，两者都无人监听时不构建
+    event_bus = engine.event_bus
+    damage_event = None
+    if event_bus.has_listeners(EventType.PRE_DAMAGE) or event_bus.has_listeners(EventType.POST_DAMAGE):
+        damage_event = EventBuilder.damage_event(
+            source=attacker,
+            target=target,
+            damage=final_damage,
+            skill_name=skill_name,
+            element=element,
+            move_type=move_type,
+            tick=engine.tick,
+            is_crit=is_crit
+        )
+        event_bus.emit(damage_event)
 
-    # 如果事件被取消，则不造成伤害
-    if pre_damage_event.cancelled:
-        return 0
+        # 如果事件被取消，则不造成伤害
+        if damage_event.cancelled:
+            if engine.hit_trace is not None:
+                engine.hit_trace.invalidate(f"{skill_name} 的伤害被事件取消")
+            return 0
 
-    # 从事件中获取可能被修改的伤害值
-    final_damage = pre_damage_event.get('damage', final_damage)
+        # 从事件中获取可能被修改的伤害值
+        final_damage = damage_event.get('damage', final_damage)
 
     # 7. 应用伤害
     target.take_damage(final_damage)
 
+    # 7.1 记录命中轨迹（用于换装重算）
+    if engine.hit_trace is not None:
+        engine.hit_trace.record_hit(
+            tick=engine.tick,
+            attacker=attacker.name,
+            skill_name=skill_name,
+            skill_mv=total_mv,
+            element=element,
+            move_type=move_type,
+            attacker_stats=attacker_stats,
+            target_stats=target_stats,
+            damage=final_damage,
+            crit_roll=crit_roll,
+            crit_observed=crit_roll is not None and event_bus.has_listeners(EventType.CRIT_DEALT),
+            modified=final_damage != base_damage,
+        )
+
     # 8. 记录统计
     is_reaction = reaction_result.extra_mv > 0
+    crit_info = {}
+    if expected_crit:
+        # 记录随机模式下非暴击/暴击两种结果（已取整），供统计方差与蒙特卡洛采样使用
+        kernel = engine.damage_kernel
+        non_crit_damage = kernel.calculate(attacker_stats, target_stats, total_mv, element, move_type)
+        crit_damage = kernel.calculate(attacker_stats, target_stats, total_mv, element, move_type, is_crit=True)
+        if final_damage != base_damage and base_damage:
+            # 伤害被事件修改时按相同比例缩放
+            scale = final_damage / base_damage
+            non_crit_damage *= scale
+            crit_damage *= scale
+        crit_info = {
+            "crit_rate": crit_rate,
+            "non_crit_damage": non_crit_damage,
+            "crit_damage": crit_damage,
+        }
     engine.statistics.record_damage(
         tick=engine.tick,
         source=attacker.name,
@@ -107,18 +153,19 @@ def deal_damage(engine: 'SimEngine', attacker: 'BaseActor', target: 'DummyEnemy'
         element=element,
         move_type=move_type,
         is_crit=is_crit,
-        is_reaction=is_reaction
+        is_reaction=is_reaction,
+        **crit_info
     )
 
     # 9. 发布伤害后事件
-    post_damage_event = pre_damage_event
-    post_damage_event.event_type = EventType.POST_DAMAGE
-    post_damage_event.set('actual_damage', final_damage)
-    engine.event_bus.emit(post_damage_event)
+    if damage_event is not None:
+        damage_event.event_type = EventType.POST_DAMAGE
+        damage_event.set('actual_damage', final_damage)
+        event_bus.emit(damage_event)
 
     # 10. 如果是暴击，发布暴击事件
-    if is_crit:
-        engine.event_bus.emit_simple(
+    if is_crit and event_bus.has_listeners(EventType.CRIT_DEALT):
+        event_bus.emit_simple(
             EventType.CRIT_DEALT,
             attacker=attacker.name,
             target=target.name,
@@ -138,15 +185,17 @@ def deal_damage(engine: 'SimEngine', attacker: 'BaseActor', target: 'DummyEnemy'
                 extra_damage=reaction_result.extra_mv * attacker_stats[StatKey.FINAL_ATK] / 100.0
             )
 
-    # 12. 日志输出
-    log_parts = [f"[{attacker.name}] {skill_name} Hit造成伤害"]
-    if is_crit:
-        log_parts.append("💥 暴击!")
-    log_parts.append(f"{int(final_damage)}")
-    if reaction_result.log_msg:
-        log_parts.append(f"| {reaction_result.log_msg}")
-
-    engine.log(" ".join(log_parts))
+    # 12. 日志输出（无人记录时不拼接文本）
+    if engine.wants_log(kind="damage"):
+        log_parts = [f"[{attacker.name}] {skill_name} Hit造成伤害"]
+        if is_crit:
+            log_parts.append("💥 暴击!")
+        log_parts.append(f"{int(final_damage)}")
+        if expected_crit:
+            log_parts.append(f"(期望, 暴击率 {crit_rate:.0%})")
+        if reaction_result.log_msg:
+            log_parts.append(f"| {reaction_result.log_msg}")
+        engine.log(" ".join(log_parts), kind="damage")
 
     return final_damage
 
@@ -167,6 +216,8 @@ def deal_true_damage(engine: 'SimEngine', attacker: 'BaseActor', target: 'DummyE
     """
     # 应用伤害
     target.take_damage(damage)
+    if engine.hit_trace is not None:
+        engine.hit_trace.record_fixed(attacker.name if hasattr(attacker, 'name') else str(attacker), damage)
 
     # 记录统计
     engine.statistics.record_damage(
@@ -182,6 +233,7 @@ def deal_true_damage(engine: 'SimEngine', attacker: 'BaseActor', target: 'DummyE
     )
 
     # 日志
-    engine.log(f"[{attacker.name if hasattr(attacker, 'name') else attacker}] {skill_name} 造成真实伤害 {int(damage)}")
+    if engine.wants_log():
+        engine.log(f"[{attacker.name if hasattr(attacker, 'name') else attacker}] {skill_name} 造成真实伤害 {int(damage)}")
 
     return damage
@@ -24,6 +24,10 @@ class MoveType(Enum):
     QTE = "qte"
     OTHER = "other"
 
+class CritMode(Enum):
+    RANDOM = "random"        # 按暴击率随机判定
+    EXPECTED = "expected"    # 期望值：伤害 × (1 + 暴击率 × 暴击伤害)
+
 class StatType(Enum):
     STR = "strength"
     AGI = "agility"
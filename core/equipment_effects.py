@@ -12,6 +12,7 @@ class EquipmentEffectHandler:
         self.equipment = equipment
         self.engine = engine
         self.active_effects = {}  # 跟踪激活的效果
+        self.subscriptions = engine.event_bus.create_scope()
 
         # 注册事件监听
         self.register_effects()
@@ -21,45 +22,51 @@ class EquipmentEffectHandler:
         for effect in self.equipment.effects:
             if effect.effect_type == "on_reaction":
                 # 监听反应触发事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.REACTION_TRIGGERED,
                     lambda event, eff=effect: self.on_reaction_triggered(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
             elif effect.effect_type == "on_skill_cast":
                 # 监听技能释放事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.ACTION_START,
                     lambda event, eff=effect: self.on_skill_cast(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
             elif effect.effect_type == "on_damage_dealt":
                 # 监听伤害造成事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.DAMAGE_DEALT,
                     lambda event, eff=effect: self.on_damage_dealt(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
             elif effect.effect_type == "on_crit":
                 # 监听暴击事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.CRIT_DEALT,
                     lambda event, eff=effect: self.on_crit(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
             elif effect.effect_type == "on_buff_applied":
                 # 监听buff施加事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.BUFF_APPLIED,
                     lambda event, eff=effect: self.on_buff_applied(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
             elif effect.effect_type == "on_element_attach":
                 # 监听元素附着事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.ELEMENT_ATTACHED,
                     lambda event, eff=effect: self.on_element_attach(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
 
     def on_reaction_triggered(self, event, effect):
@@ -218,10 +225,11 @@ class EquipmentEffectHandler:
         # 添加到角色
         self.character.buffs.add_buff(buff)
 
-        self.engine.log(
-            f"[{self.character.name}] {self.equipment.name}特殊效果触发: {effect.description}",
-            level="INFO"
-        )
+        if self.engine.wants_log():
+            self.engine.log(
+                f"[{self.character.name}] {self.equipment.name}特殊效果触发: {effect.description}",
+                level="INFO"
+            )
 
     def apply_team_buff(self, effect):
         """给其他队友添加buff"""
@@ -243,12 +251,12 @@ class EquipmentEffectHandler:
             )
             teammate.buffs.add_buff(buff)
 
-        self.engine.log(
-            f"[{self.character.name}] {self.equipment.name}团队效果触发: {effect.description}",
-            level="INFO"
-        )
+        if self.engine.wants_log():
+            self.engine.log(
+                f"[{self.character.name}] {self.equipment.name}团队效果触发: {effect.description}",
+                level="INFO"
+            )
 
     def cleanup(self):
         """清理事件监听"""
-        # 事件总线会自动处理，这里预留接口
-        pass
+        self.subscriptions.close()
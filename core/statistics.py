@@ -20,6 +20,18 @@ class DamageRecord:
     move_type: MoveType   # 招式类型
     is_crit: bool = False # 是否暴击
     is_reaction: bool = False  # 是否来自反应
+    # 期望暴击模式下记录的暴击分布（随机模式为 None）
+    crit_rate: Optional[float] = None
+    non_crit_damage: float = 0.0
+    crit_damage: float = 0.0
+
+    @property
+    def variance(self) -> float:
+        """本次命中由暴击带来的方差 p(1-p)(暴击伤害-非暴击伤害)^2"""
+        if self.crit_rate is None:
+            return 0.0
+        spread = self.crit_damage - self.non_crit_damage
+        return self.crit_rate * (1.0 - self.crit_rate) * spread * spread
 
 
 @dataclass
@@ -63,6 +75,8 @@ class CharacterStats:
     reaction_damage: float = 0.0
     reaction_count: Dict[ReactionType, int] = field(default_factory=dict)
     crit_count: int = 0
+    expected_crit_count: float = 0.0  # 期望暴击模式下的暴击次数期望
+    damage_variance: float = 0.0      # 暴击带来的伤害方差（各次命中独立）
     hit_count: int = 0
     active_time: int = 0  # 活跃时间（tick）
 
@@ -70,6 +84,10 @@ class CharacterStats:
 class CombatStatistics:
     """战斗统计收集器"""
 
+    # 复制引擎时原始记录与时间线只复制列表，记录写入后不再修改（复制方式由 simulation.fork.register_deepcopy 登记）
+    _fork_shallow = ('damage_records', 'buff_records', 'reaction_records', 'skill_usage_records',
+                     'damage_timeline', 'dps_timeline')
+
     def __init__(self):
         # 原始记录
         self.damage_records: List[DamageRecord] = []
@@ -80,6 +98,7 @@ class CombatStatistics:
         # 聚合数据
         self.character_stats: Dict[str, CharacterStats] = {}
         self.total_damage = 0.0
+        self.damage_variance = 0.0
         self.combat_duration = 0  # tick
 
         # 时间线数据（用于绘图）
@@ -93,8 +112,12 @@ class CombatStatistics:
     def record_damage(self, tick: int, source: str, target: str,
                      skill_name: str, damage: float, element: Element,
                      move_type: MoveType, is_crit: bool = False,
-                     is_reaction: bool = False):
-        """记录伤害事件"""
+                     is_reaction: bool = False, crit_rate: Optional[float] = None,
+                     non_crit_damage: float = 0.0, crit_damage: float = 0.0):
+        """
+        记录伤害事件
+        期望暴击模式下 damage 为期望值，同时传入 crit_rate 与暴击/非暴击伤害以累计方差
+        """
         record = DamageRecord(
             tick=tick,
             source=source,
@@ -104,7 +127,10 @@ class CombatStatistics:
             element=element,
             move_type=move_type,
             is_crit=is_crit,
-            is_reaction=is_reaction
+            is_reaction=is_reaction,
+            crit_rate=crit_rate,
+            non_crit_damage=non_crit_damage,
+            crit_damage=crit_damage
         )
         self.damage_records.append(record)
         self.damage_timeline.append((tick, source, damage))
@@ -119,6 +145,11 @@ class CombatStatistics:
 
         if is_crit:
             stats.crit_count += 1
+        if crit_rate is not None:
+            variance = record.variance
+            stats.expected_crit_count += crit_rate
+            stats.damage_variance += variance
+            self.damage_variance += variance
 
         if is_reaction:
             stats.reaction_damage += damage
@@ -245,7 +276,15 @@ class CombatStatistics:
         if stats.hit_count == 0:
             return 0.0
 
-        return stats.crit_count / stats.hit_count
+        return (stats.crit_count + stats.expected_crit_count) / stats.hit_count
+
+    def get_damage_std(self, character: Optional[str] = None) -> float:
+        """暴击带来的伤害标准差（仅期望暴击模式下有值）"""
+        if character is None:
+            return self.damage_variance ** 0.5
+        if character in self.character_stats:
+            return self.character_stats[character].damage_variance ** 0.5
+        return 0.0
 
     def get_buff_uptime(self, owner: str, buff_name: str) -> float:
         """
@@ -321,6 +360,8 @@ class CombatStatistics:
         duration_sec = self.combat_duration / 10.0
         lines.append(f"\n战斗时长: {duration_sec:.1f}秒 ({self.combat_duration} ticks)")
         lines.append(f"总伤害: {int(self.total_damage):,}")
+        if self.damage_variance > 0:
+            lines.append(f"暴击标准差: ±{int(self.get_damage_std()):,}")
         lines.append(f"全队DPS: {self.calculate_dps():.1f}")
 
         # 角色伤害排行
@@ -343,6 +384,8 @@ class CombatStatistics:
             lines.append(f"  命中次数: {stats.hit_count}")
             if stats.hit_count > 0:
                 lines.append(f"  实际暴击率: {self.get_crit_rate(stats.name)*100:.1f}%")
+            if stats.damage_variance > 0:
+                lines.append(f"  暴击标准差: ±{int(self.get_damage_std(stats.name)):,}")
 
             # 技能伤害分解
             if stats.skill_damage and stats.total_damage > 0:
@@ -379,4 +422,5 @@ class CombatStatistics:
         self.dps_timeline.clear()
         self._dps_cache.clear()
         self.total_damage = 0.0
+        self.damage_variance = 0.0
         self.combat_duration = 0
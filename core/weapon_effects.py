@@ -12,6 +12,7 @@ class WeaponEffectHandler:
         self.weapon = weapon
         self.engine = engine
         self.active_effects = {}  # 跟踪激活的效果
+        self.subscriptions = engine.event_bus.create_scope()
 
         # 注册事件监听
         self.register_effects()
@@ -21,17 +22,19 @@ class WeaponEffectHandler:
         for effect in self.weapon.effects:
             if effect.effect_type == "on_reaction":
                 # 监听反应触发事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.REACTION_TRIGGERED,
                     lambda event, eff=effect: self.on_reaction_triggered(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
             elif effect.effect_type == "on_skill_cast":
                 # 监听技能释放事件
-                self.engine.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     EventType.ACTION_START,
                     lambda event, eff=effect: self.on_skill_cast(event, eff),
-                    priority=50
+                    priority=50,
+                    source=self.character
                 )
 
     def on_reaction_triggered(self, event, effect):
@@ -84,12 +87,12 @@ class WeaponEffectHandler:
         # 添加到角色
         self.character.buffs.add_buff(buff)
 
-        self.engine.log(
-            f"[{self.character.name}] {self.weapon.name}特殊效果触发: {effect.description}",
-            level="INFO"
-        )
+        if self.engine.wants_log():
+            self.engine.log(
+                f"[{self.character.name}] {self.weapon.name}特殊效果触发: {effect.description}",
+                level="INFO"
+            )
 
     def cleanup(self):
         """清理事件监听"""
-        # 事件总线会自动处理，这里预留接口
-        pass
+        self.subscriptions.close()
@@ -49,8 +49,9 @@ class AdminSim(BaseActor):
         # self.ult_cd = 300
         
         # 订阅事件
-        self.engine.event_bus.subscribe(EventType.POST_DAMAGE, self.on_post_damage)
-        self.engine.event_bus.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
+        self.subscriptions.subscribe(EventType.POST_DAMAGE, self.on_post_damage)
+        self.subscriptions.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered,
+                                        target=self.target)
 
     # ===== 状态管理 =====
     def on_tick(self, engine):
@@ -11,6 +11,8 @@ from core.damage_helper import deal_damage
 
 
 class AntalSim(BaseActor):
+    _checkpoint_fields = BaseActor._checkpoint_fields + ('passive_heal_cd',)
+
     # ===== 初始化 =====
     def __init__(self, engine, target):
         super().__init__("安塔尔", engine)
@@ -32,8 +34,8 @@ class AntalSim(BaseActor):
         self.passive_heal_cd = {}
         
         # 订阅事件
-        self.engine.event_bus.subscribe(EventType.POST_DAMAGE, self.on_damage_event)
-        self.engine.event_bus.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
+        self.subscriptions.subscribe(EventType.POST_DAMAGE, self.on_damage_event)
+        self.subscriptions.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
 
     # ===== 状态管理 =====
     def on_tick(self, engine):
@@ -45,6 +47,12 @@ class AntalSim(BaseActor):
         
         # qte_ready_timer 已在父类处理
 
+    def fast_forward(self, engine, ticks: int):
+        super().fast_forward(engine, ticks)
+        for name, cd in self.passive_heal_cd.items():
+            if cd > 0:
+                self.passive_heal_cd[name] = max(0, cd - ticks)
+
     def on_reaction_triggered(self, event):
         pass
 
@@ -64,7 +72,8 @@ class AntalSim(BaseActor):
 
         if has_amp and self.passive_heal_cd.get(actor.name, 0) == 0:
             heal = MECHANICS['passive_heal_base'] + self.attrs.strength * MECHANICS['passive_heal_scale']
-            self.engine.log(f"   [天赋] 安塔尔为 {actor.name} 回复 {int(heal)} 生命")
+            if self.engine.wants_log():
+                self.engine.log(f"   [天赋] 安塔尔为 {actor.name} 回复 {int(heal)} 生命")
             self.passive_heal_cd[actor.name] = MECHANICS['passive_cd']
 
     # ===== 伤害计算 =====
@@ -164,12 +173,14 @@ class AntalSim(BaseActor):
             # 强制恢复/再次施加状态
             if current_elem:
                 self.target.reaction_mgr.apply_hit(current_elem)
-                self.engine.log(f"   [连携技] 刷新/再次施加: {current_elem.value}")
+                if self.engine.wants_log():
+                    self.engine.log(f"   [连携技] 刷新/再次施加: {current_elem.value}")
             elif current_break > 0:
                 # 使用 ReactionManager 记录的最后一次异常类型刷新
                 last_type = self.target.reaction_mgr.last_phys_type
                 if last_type and last_type != PhysAnomalyType.NONE:
                     self.target.reaction_mgr.apply_hit(Element.PHYSICAL, last_type)
-                    self.engine.log(f"   [连携技] 刷新物理异常: {last_type.value}")
+                    if self.engine.wants_log():
+                        self.engine.log(f"   [连携技] 刷新物理异常: {last_type.value}")
 
         return Action("磁暴试验场", f_data['total'], [DamageEvent(f_data['hit'], perform)], move_type=MoveType.QTE)
\ No newline at end of file
@@ -1,5 +1,7 @@
+import math
 from collections import deque
-from dataclasses import asdict
+from dataclasses import fields
+from functools import lru_cache
 
 from core.enums import MoveType
 from core.stats import CombatStats, Attributes, StatKey
@@ -7,12 +9,52 @@ from mechanics.buff_system import BuffManager
 from simulation.action import Action
 from simulation.engine import SimEngine
 from simulation.event_system import EventType, EventBuilder
+from simulation.fork import deepcopy_with_callables
+
+# 释放战技消耗的技力
+SKILL_SP_COST = 100
+
+
+@lru_cache(maxsize=None)
+def _command_head(cmd: str) -> str:
+    """脚本指令的指令名（小写）"""
+    return cmd.split()[0].lower()
+
+
+@lru_cache(maxsize=None)
+def _stat_fields(stats_cls):
+    """面板数据类的字段名（按定义顺序）"""
+    return tuple(f.name for f in fields(stats_cls))
+
+
+def finalize_panel(panel):
+    """
+    计算最终攻击力 (Final Atk)
+    公式: (基础攻击 + 武器攻击 + 固定攻击) * (1 + 攻击百分比) * 属性乘区
+    """
+    base = panel[StatKey.BASE_ATK] + panel[StatKey.WEAPON_ATK] + panel[StatKey.FLAT_ATK]
+    atk_mult = 1.0 + panel[StatKey.ATK_PCT]
+    attr_mult = panel.get('_attr_multiplier', 1.0)
+    panel[StatKey.FINAL_ATK] = base * atk_mult * attr_mult
+    return panel
+
 
 class BaseActor:
+    # 缓存面板只读，复制引擎时共享（版本号随 Buff 一并复制）
+    _fork_shared = ('_panel_cache',)
+    __deepcopy__ = deepcopy_with_callables
+    # 检查点保存的标量状态（见 simulation.checkpoint），子类追加自己的机制状态
+    _checkpoint_fields = ('action_timer', 'is_busy', 'is_script_finished', 'waiting_for_sp',
+                          'qte_ready_timer', 'cooldowns')
+    # 解析指令时读取的状态，随行动记录，检查点恢复行动时按原值重新解析
+    _command_inputs = ('qte_ready_timer',)
+
     def __init__(self, name, engine: SimEngine):
         self.name = name
         self.engine = engine
         self.buffs = BuffManager(self)
+        # 角色及其机制订阅的事件监听器，dispose 时统一退订
+        self.subscriptions = engine.event_bus.create_scope()
 
         self.current_action: Action = None
         self.action_timer = 0
@@ -20,6 +62,8 @@ class BaseActor:
         self.cooldowns = {}
         self.action_queue = deque()
         self.is_script_finished = False
+        # 队首指令因技力不足未能释放（技力回满前无需逐tick重试）
+        self.waiting_for_sp = False
 
         self.main_attr = None # e.g. "intelligence"
         self.sub_attr = None  # e.g. "willpower"
@@ -41,10 +85,30 @@ class BaseActor:
         if self._panel_cache is not None and self._panel_cache_version == current_version:
             return self._panel_cache
 
-        # 1. 基础属性
-        panel = asdict(self.base_stats)
+        # 1. 基础属性 + 四维衍生
+        panel = self.build_base_panel()
+
+        # 2. 预处理 Hook (子类可覆盖)
+        self._modify_panel_before_buffs(panel)
+
+        # 3. 应用自身 Buff
+        self.buffs.apply_stats(panel)
+
+        # 4. 计算最终攻击力 (Final Atk)
+        finalize_panel(panel)
 
-        # 1.5 应用四维属性的影响（如果角色有attrs）
+        # 缓存结果
+        self._panel_cache = panel
+        self._panel_cache_version = current_version
+
+        return panel
+
+    def build_base_panel(self):
+        """基础面板：基础属性与四维衍生属性（不含 Hook 与 Buff）"""
+        # 面板字段均为数值，浅拷贝即可
+        panel = {name: getattr(self.base_stats, name) for name in _stat_fields(type(self.base_stats))}
+
+        # 应用四维属性的影响（如果角色有attrs）
         if hasattr(self, 'attrs') and self.attrs:
             # 计算最大生命值: 基础生命 + 力量 * 5
             panel[StatKey.BASE_HP] = self.base_stats.base_hp + (self.attrs.strength * 5)
@@ -61,23 +125,6 @@ class BaseActor:
                 # 属性乘区作为独立乘区，在最终攻击力计算后应用
                 panel['_attr_multiplier'] = attr_mult
 
-        # 2. 预处理 Hook (子类可覆盖)
-        self._modify_panel_before_buffs(panel)
-
-        # 3. 应用自身 Buff
-        self.buffs.apply_stats(panel)
-
-        # 4. 计算最终攻击力 (Final Atk)
-        # 公式: (基础攻击 + 武器攻击 + 固定攻击) * (1 + 攻击百分比) * 属性乘区
-        base = panel[StatKey.BASE_ATK] + panel[StatKey.WEAPON_ATK] + panel[StatKey.FLAT_ATK]
-        atk_mult = 1.0 + panel[StatKey.ATK_PCT]
-        attr_mult = panel.get('_attr_multiplier', 1.0)
-        panel[StatKey.FINAL_ATK] = base * atk_mult * attr_mult
-
-        # 缓存结果
-        self._panel_cache = panel
-        self._panel_cache_version = current_version
-
         return panel
     
     def _modify_panel_before_buffs(self, stats):
@@ -86,8 +133,14 @@ class BaseActor:
 
     def set_script(self, script_list):
         self.action_queue = deque(script_list)
+        self.waiting_for_sp = False
         self.engine.log(f"[{self.name}] 脚本已装载，共 {len(script_list)} 个指令")
 
+    def queue_command(self, cmd: str):
+        """在脚本末尾追加一条指令（运行中逐条决策时使用）"""
+        self.action_queue.append(cmd)
+        self.is_script_finished = False
+
     def on_tick(self, engine):
         self.buffs.tick_all(engine)
         for skill in list(self.cooldowns.keys()):
@@ -103,6 +156,58 @@ class BaseActor:
         else:
             self.process_next_command()
 
+    def ticks_until_next_event(self):
+        """
+        距离下一次需要逐tick处理还有多少tick（供引擎快进使用）
+        子类若有额外的计时器，需同时重写本方法与 fast_forward
+        """
+        horizon = self.buffs.ticks_until_change()
+        if self.is_busy and self.current_action:
+            act = self.current_action
+            remaining = act.duration - self.action_timer
+            event = act.get_next_event()
+            if event is not None:
+                remaining = min(remaining, math.ceil(event.time_offset - self.action_timer))
+            return max(1, min(horizon, remaining))
+
+        if self.action_queue:
+            if self.waiting_for_sp:
+                # 技力足够前重试都会失败；其他实体先消耗技力只会让本次预计提前，届时重新计算
+                return max(1, min(horizon, self.engine.party_manager.ticks_until_sp(SKILL_SP_COST, 0.1)))
+            # 等待QTE就绪的指令在就绪前不会有任何动作，就绪只会由其他实体的事件触发
+            if not (_command_head(self.action_queue[0]) == "qte" and self.qte_ready_timer <= 0):
+                return 1
+        elif not self.is_script_finished:
+            return 1
+        return max(1, horizon)
+
+    def fast_forward(self, engine, ticks: int):
+        """批量推进 ticks 个空闲tick，效果等同于逐tick调用 on_tick"""
+        self.buffs.fast_forward(engine, ticks)
+        for skill, cd in self.cooldowns.items():
+            if cd > 0:
+                self.cooldowns[skill] = max(0, cd - ticks)
+        if self.qte_ready_timer > 0:
+            self.qte_ready_timer = max(0, self.qte_ready_timer - ticks)
+        if self.is_busy and self.current_action:
+            self.action_timer += ticks
+
+    def dispose(self):
+        """
+        释放角色：退订事件、清理武器/装备效果、断开行动闭包与Buff引用
+        引擎 dispose 时调用，之后角色不可再参与模拟
+        """
+        self.subscriptions.close()
+        for handler in getattr(self, 'weapon_handlers', []) + getattr(self, 'equipment_handlers', []):
+            handler.cleanup()
+        self.weapon_handlers = []
+        self.equipment_handlers = []
+        self.current_action = None
+        self.is_busy = False
+        self.action_queue.clear()
+        self.buffs.clear()
+        self._panel_cache = None
+
     def _process_action(self):
         self.action_timer += 1
         act = self.current_action
@@ -115,14 +220,15 @@ class BaseActor:
 
         if self.action_timer >= act.duration:
             # 发布行动结束事件
-            event = EventBuilder.action_event(
+            self.engine.event_bus.emit_deferred(
+                EventType.ACTION_END,
+                EventBuilder.action_event,
                 EventType.ACTION_END,
                 character=self,
                 action_name=act.name,
                 duration=act.duration,
                 tick=self.engine.tick
             )
-            self.engine.event_bus.emit(event)
 
             self.is_busy = False
             self.current_action = None
@@ -132,20 +238,25 @@ class BaseActor:
         
         # 检查并消耗技力
         if action.move_type == MoveType.SKILL:
-            if not self.engine.party_manager.try_consume_sp(100):
-                self.engine.log(f"[{self.name}] 技力不足 ({self.engine.party_manager.get_sp()}/100), 无法释放战技: {action.name}", level="WARNING")
+            self.waiting_for_sp = not self.engine.party_manager.try_consume_sp(SKILL_SP_COST)
+            if self.waiting_for_sp:
+                if self.engine.wants_log("WARNING"):
+                    self.engine.log(f"[{self.name}] 技力不足 ({self.engine.party_manager.get_sp()}/100), 无法释放战技: {action.name}", level="WARNING")
                 return False
-            else:
+            if self.engine.wants_log():
                 self.engine.log(f"[{self.name}] 消耗100技力, 剩余: {self.engine.party_manager.get_sp()}")
 
         self.is_busy = True
         self.current_action = action
         self.action_timer = 0
         action.reset()
-        self.engine.log(f"[{self.name}] 执行: {action.name}")
+        if self.engine.wants_log(kind="action"):
+            self.engine.log(f"[{self.name}] 执行: {action.name}", kind="action")
 
         # 发布行动开始事件
-        event = EventBuilder.action_event(
+        self.engine.event_bus.emit_deferred(
+            EventType.ACTION_START,
+            EventBuilder.action_event,
             EventType.ACTION_START,
             character=self,
             action_name=action.name,
@@ -153,7 +264,6 @@ class BaseActor:
             tick=self.engine.tick,
             move_type=action.move_type
         )
-        self.engine.event_bus.emit(event)
 
         # 记录技能使用
         self.engine.statistics.record_skill_usage(
@@ -172,8 +282,10 @@ class BaseActor:
                 self.is_script_finished = True
             return
         cmd = self.action_queue[0]
+        inputs = tuple(getattr(self, name) for name in self._command_inputs)
         action = self.parse_command(cmd)
         if action:
+            action.command, action.inputs = cmd, inputs
             if self.start_action(action):
                 self.action_queue.popleft()
         
@@ -40,7 +40,7 @@ class ChenSim(BaseActor):
         # self.ult_cd = 300
         
         # 订阅事件
-        self.engine.event_bus.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
+        self.subscriptions.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
 
     # ===== 状态管理 =====
     def on_tick(self, engine):
@@ -32,6 +32,8 @@ class ImpactBoostBuff(UsageBuff):
                 self.consume()
 
 class DaPanSim(BaseActor):
+    _fork_shared = BaseActor._fork_shared + ('_talent_panel',)
+
     def __init__(self, engine, target):
         super().__init__("大潘", engine)
         self.target = target
@@ -47,7 +49,10 @@ class DaPanSim(BaseActor):
         # self.skill_cd = 150
         # self.ult_cd = 300
         
-        self.engine.event_bus.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
+        self.subscriptions.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
+
+        # 天赋二面板缓存：(基础面板对象, 破防层数, 加成后面板)
+        self._talent_panel = (None, 0, None)
 
     def on_tick(self, engine):
         super().on_tick(engine)
@@ -71,10 +76,16 @@ class DaPanSim(BaseActor):
         # 天赋二：对破防敌人伤害提升
         stacks = self.target.reaction_mgr.phys_break_stacks
         if stacks > 0:
+            # 在副本上加成，避免反复累加到基类缓存的面板上
+            cached_base, cached_stacks, cached_panel = self._talent_panel
+            if cached_base is panel and cached_stacks == stacks:
+                return cached_panel
             bonus = stacks * MECHANICS["talent_2_bonus_per_stack"]
-            panel[StatKey.PHYSICAL_DMG_BONUS] += bonus
-            # log太频繁，略过
-            
+            talent_panel = dict(panel)
+            talent_panel[StatKey.PHYSICAL_DMG_BONUS] += bonus
+            self._talent_panel = (panel, stacks, talent_panel)
+            return talent_panel
+
         return panel
 
     # ===== 技能工厂 =====
@@ -175,7 +186,8 @@ class DaPanSim(BaseActor):
             # 获取当前层数用于日志
             current_buff = self.buffs.get_buff("备料")
             stacks = current_buff.stacks if current_buff else 1
-            self.engine.log(f"   [天赋] 获得备料状态 (层数: {stacks})")
+            if self.engine.wants_log():
+                self.engine.log(f"   [天赋] 获得备料状态 (层数: {stacks})")
             
         events.append(DamageEvent(f_data['final_hit'], final_hit))
         
@@ -200,7 +212,8 @@ class DaPanSim(BaseActor):
                 attachments=[PhysAnomalyType.IMPACT]
             )
             
-            self.engine.log(f"[{self.name}] 加料！造成伤害")
+            if self.engine.wants_log():
+                self.engine.log(f"[{self.name}] 加料！造成伤害")
             
             # 失衡
             self.target.apply_stagger(15, self.engine)
@@ -209,7 +222,8 @@ class DaPanSim(BaseActor):
             buff = self.buffs.get_buff("备料")
             if buff:
                 buff.stacks -= 1
-                self.engine.log(f"   [天赋] 消耗备料 (剩余: {buff.stacks})，QTE冷却刷新")
+                if self.engine.wants_log():
+                    self.engine.log(f"   [天赋] 消耗备料 (剩余: {buff.stacks})，QTE冷却刷新")
                 
                 # 如果层数为0，移除Buff
                 if buff.stacks <= 0:
@@ -29,7 +29,7 @@ class ErdilaSim(BaseActor):
         # self.ult_cd = 300
         
         # 订阅事件
-        self.engine.event_bus.subscribe(EventType.POST_DAMAGE, self.on_post_damage)
+        self.subscriptions.subscribe(EventType.POST_DAMAGE, self.on_post_damage)
 
     # ===== 状态管理 =====
     def on_tick(self, engine):
@@ -55,7 +55,7 @@ class ErdilaSim(BaseActor):
             if not has_attach and not has_break:
                 self.qte_ready_timer = 30 # 3秒内可发动
                 self.engine.log(f"   [艾尔黛拉] 检测到队友重击且目标状态符合(无附着/无破防)，火山蘑菇云就绪！")
-            else:
+            elif self.engine.wants_log():
                 self.engine.log(f"   [艾尔黛拉] 检测到队友重击但目标状态不符 (Attach:{has_attach}, Break:{has_break})")
 
     # ===== 天赋机制 =====
@@ -68,7 +68,8 @@ class ErdilaSim(BaseActor):
         base_heal = MECHANICS['heal_base'] + wil * MECHANICS['heal_scale']
         final_heal = base_heal * (1.0 + panel.get('heal_bonus', 0.0))
 
-        self.engine.log(f"   [治疗] 艾尔黛拉回复全队 {int(final_heal)} 点生命值")
+        if self.engine.wants_log():
+            self.engine.log(f"   [治疗] 艾尔黛拉回复全队 {int(final_heal)} 点生命值")
 
     # ===== 伤害计算 =====
     # _deal_damage 已移除，使用 core.damage_helper.deal_damage
@@ -182,8 +183,7 @@ class ErdilaSim(BaseActor):
                     move_type=MoveType.ULTIMATE
                 )
                 # 模拟概率掉落影子治疗
-                import random
-                if random.random() < 0.5:
+                if self.engine.rng.proc(self.name).random() < 0.5:
                     self._perform_heal()
 
             events.append(DamageEvent(i * f_data['interval'] + 2, hit))
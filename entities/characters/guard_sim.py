@@ -35,6 +35,9 @@ class IronOathBuff(Buff):
         self.stacks = stacks
 
 class GuardSim(BaseActor):
+    _checkpoint_fields = BaseActor._checkpoint_fields + ('qte_break_stacks', 'sp_accumulated')
+    _command_inputs = BaseActor._command_inputs + ('qte_break_stacks',)
+
     # ===== 初始化 =====
     def __init__(self, engine, target):
         super().__init__("骏卫", engine)
@@ -55,7 +58,7 @@ class GuardSim(BaseActor):
         self.sp_accumulated = 0 # 天赋一累积恢复的技力
         
         # 订阅事件
-        self.engine.event_bus.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
+        self.subscriptions.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
 
     # ===== 状态管理 =====
     def on_tick(self, engine):
@@ -70,7 +73,8 @@ class GuardSim(BaseActor):
             self.sp_accumulated -= MECHANICS['passive_sp_threshold']
             self._trigger_morale(duration=MECHANICS['passive_buff_duration'])
             
-        self.engine.log(f"   [骏卫] 恢复技力 {amount} (累积: {self.sp_accumulated})")
+        if self.engine.wants_log():
+            self.engine.log(f"   [骏卫] 恢复技力 {amount} (累积: {self.sp_accumulated})")
 
     def _trigger_morale(self, duration):
         """获得士气激昂"""
@@ -145,10 +149,11 @@ class GuardSim(BaseActor):
                     self.target.apply_stagger(15, self.engine)
                     self._restore_sp(MECHANICS["ult_final_sp"])
                     self._trigger_morale_for_all(MECHANICS["passive2_buff_duration"])
-                    self.buffs.buffs.remove(b) # 移除Buff
+                    self.buffs.remove_buff(b.name) # 移除Buff
                 else:
                     # 袭扰
-                    self.engine.log(f"   [终结技] 盾卫袭扰 (剩余铁誓: {current_stack})")
+                    if self.engine.wants_log():
+                        self.engine.log(f"   [终结技] 盾卫袭扰 (剩余铁誓: {current_stack})")
                     deal_damage(
                         self.engine, self, self.target,
                         skill_name="盾卫袭扰",
@@ -252,7 +257,8 @@ class GuardSim(BaseActor):
         f_data = FRAME_DATA["qte"]
         
         def perform():
-            self.engine.log(f"   [连携技] 盈月邀击 (消耗{stacks}层)")
+            if self.engine.wants_log():
+                self.engine.log(f"   [连携技] 盈月邀击 (消耗{stacks}层)")
             
             # 斩击次数 = stacks (max 3)
             count = min(stacks, 3)
@@ -17,6 +17,10 @@ class HeatInflict(Buff):
 
 
 class LevatineSim(BaseActor):
+    _checkpoint_fields = BaseActor._checkpoint_fields + ('molten_stacks', 'ult_duration_ticks')
+    # 普攻倍率与战技是否核爆在解析时按熔火层数/强化状态决定
+    _command_inputs = BaseActor._command_inputs + ('molten_stacks', 'ult_duration_ticks')
+
     # ===== 初始化 =====
     def __init__(self, engine, target):
         super().__init__("莱瓦汀", engine)
@@ -35,9 +39,9 @@ class LevatineSim(BaseActor):
         self.ult_duration_ticks = 0
 
         # 订阅事件
-        self.engine.event_bus.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
-        self.engine.event_bus.subscribe(EventType.BUFF_APPLIED, self.on_buff_event)
-        self.engine.event_bus.subscribe(EventType.BUFF_STACKED, self.on_buff_event)
+        self.subscriptions.subscribe(EventType.REACTION_TRIGGERED, self.on_reaction_triggered)
+        self.subscriptions.subscribe(EventType.BUFF_APPLIED, self.on_buff_event)
+        self.subscriptions.subscribe(EventType.BUFF_STACKED, self.on_buff_event)
 
     # ===== 状态管理 =====
     def on_tick(self, engine):
@@ -49,6 +53,17 @@ class LevatineSim(BaseActor):
         
         # qte_ready_timer 已在父类处理
 
+    def ticks_until_next_event(self):
+        horizon = super().ticks_until_next_event()
+        if self.ult_duration_ticks > 0:
+            horizon = min(horizon, self.ult_duration_ticks)
+        return horizon
+
+    def fast_forward(self, engine, ticks: int):
+        if self.ult_duration_ticks > 0:
+            self.ult_duration_ticks -= ticks
+        super().fast_forward(engine, ticks)
+
     def on_reaction_triggered(self, event):
         pass
 
@@ -76,7 +91,8 @@ class LevatineSim(BaseActor):
                 
         if is_trigger:
             self.qte_ready_timer = 30
-            self.engine.log(f"   [莱瓦汀] 检测到异常施加({buff_name})，沸腾就绪！")
+            if self.engine.wants_log():
+                self.engine.log(f"   [莱瓦汀] 检测到异常施加({buff_name})，沸腾就绪！")
 
     @property
     def is_ult_active(self):
@@ -141,7 +157,8 @@ class LevatineSim(BaseActor):
             is_last = (seq_index == 4) if not self.is_ult_active else False
             if is_last and self.target.buffs.consume_tag("heat_inflict"):
                  self.molten_stacks = min(4, self.molten_stacks + 1)
-                 self.engine.log(f"   [天赋] 吸收附着！层数: {self.molten_stacks}")
+                 if self.engine.wants_log():
+                     self.engine.log(f"   [天赋] 吸收附着！层数: {self.molten_stacks}")
 
         return Action(f"普攻{seq_index+1}", f_data['total'], [DamageEvent(f_data['hit'], perform)])
 
@@ -162,7 +179,8 @@ class LevatineSim(BaseActor):
             )
             if not has_full_stacks:  # 只在非满层时增加
                 self.molten_stacks = min(4, self.molten_stacks + 1)
-                self.engine.log(f"   (状态) 熔火层数: {self.molten_stacks}")
+                if self.engine.wants_log():
+                    self.engine.log(f"   (状态) 熔火层数: {self.molten_stacks}")
 
         def hit_burst():
             self.molten_stacks = 0
@@ -231,7 +249,8 @@ class LevatineSim(BaseActor):
             # 3. 获得熔火 (只要命中至少1个，获得1层)
             if hit_count > 0:
                 self.molten_stacks = min(4, self.molten_stacks + 1)
-                self.engine.log(f"   (状态) 熔火层数: {self.molten_stacks}")
+                if self.engine.wants_log():
+                    self.engine.log(f"   (状态) 熔火层数: {self.molten_stacks}")
 
             # 4. 回复终结技能量 (基于命中数)
             # 命中1->25, 2->30, 3+->35
@@ -241,7 +260,8 @@ class LevatineSim(BaseActor):
             elif hit_count >= 3: energy_gain = MECHANICS["qte_energy_gain"][3]
             
             if energy_gain > 0:
-                self.engine.log(f"   [资源] 获得终结技能量: {energy_gain}")
+                if self.engine.wants_log():
+                    self.engine.log(f"   [资源] 获得终结技能量: {energy_gain}")
                 # 尝试调用 party_manager (如果存在)
                 if hasattr(self.engine, 'party_manager'):
                     # 假设有接口，或者我们暂时只 log
@@ -45,9 +45,9 @@ class WolfguardSim(BaseActor):
 
         # 订阅事件
         # 监听反应触发 (主要用于非 Buff 类反应，或作为补充)
-        self.engine.event_bus.subscribe(EventType.REACTION_TRIGGERED, self._on_reaction_trigger)
+        self.subscriptions.subscribe(EventType.REACTION_TRIGGERED, self._on_reaction_trigger)
         # 监听 Buff 施加 (主要用于燃烧、附着等 Buff)
-        self.engine.event_bus.subscribe(EventType.BUFF_APPLIED, self._on_buff_applied)
+        self.subscriptions.subscribe(EventType.BUFF_APPLIED, self._on_buff_applied)
 
     # ===== 事件监听 =====
     def _on_buff_applied(self, event):
@@ -66,7 +66,8 @@ class WolfguardSim(BaseActor):
         
         if is_anomaly:
             self.qte_ready_timer = 30
-            self.engine.log(f"   [狼卫] 检测到元素异常Buff({buff_name})，爆裂手雷就绪！")
+            if self.engine.wants_log():
+                self.engine.log(f"   [狼卫] 检测到元素异常Buff({buff_name})，爆裂手雷就绪！")
             
         # 2. 天赋一：灼热獠牙
         # 条件：狼卫自己触发了燃烧 (通过技能或普攻)
@@ -92,7 +93,8 @@ class WolfguardSim(BaseActor):
         # QTE触发条件：REACTION_TRIGGERED 里的 ATTACH 也是一种附着
         if reaction_type == ReactionType.ATTACH:
             self.qte_ready_timer = 30
-            self.engine.log(f"   [狼卫] 检测到元素附着(Attach反应)，爆裂手雷就绪！")
+            if self.engine.wants_log():
+                self.engine.log(f"   [狼卫] 检测到元素附着(Attach反应)，爆裂手雷就绪！")
 
     # ===== 天赋机制 =====
     def _trigger_passive_one(self):
@@ -124,7 +126,7 @@ class WolfguardSim(BaseActor):
     def create_skill(self):
         f_data = FRAME_DATA["skill"]
         events = []
-        context = {"consumed": False}
+        state = {"consumed": False}
 
         def hit_base():
             mv = SKILL_MULTIPLIERS["skill_base"]
@@ -132,11 +134,12 @@ class WolfguardSim(BaseActor):
             has_conduct = self.target.buffs.consume_tag(ReactionType.CONDUCTIVE)
 
             if has_burn or has_conduct:
-                context["consumed"] = True
+                state["consumed"] = True
                 self.engine.log(f"   [战技] 成功消耗异常状态！")
                 refund = MECHANICS["skill_refund"]
                 # self.cooldowns["skill"] = max(0, self.cooldowns["skill"] - refund)
-                self.engine.log(f"   [天赋] CD减少 {refund/10.0}秒 (已移除CD机制)")
+                if self.engine.wants_log():
+                    self.engine.log(f"   [天赋] CD减少 {refund/10.0}秒 (已移除CD机制)")
                 # 消耗状态时不施加附着，使用新添加的 can_attach 参数
                 deal_damage(
                     self.engine, self, self.target,
@@ -157,7 +160,7 @@ class WolfguardSim(BaseActor):
                 )
 
         def hit_extra():
-            if context["consumed"]:
+            if state["consumed"]:
                 mv = SKILL_MULTIPLIERS["skill_extra"]
                 self.engine.log(f"   >>> [战技] 追加射击！")
                 # 追加射击造成大量火伤。描述没说是否附着，通常追加攻击也是火伤。
@@ -172,7 +175,7 @@ class WolfguardSim(BaseActor):
 
         events.append(DamageEvent(f_data['hit'], hit_base))
         events.append(DamageEvent(f_data['extra_hit'], hit_extra))
-        return Action("灼热弹痕", f_data['total'], events)
+        return Action("灼热弹痕", f_data['total'], events, state=state)
 
     def create_ult(self):
         f_data = FRAME_DATA["ult"]
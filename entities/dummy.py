@@ -1,11 +1,18 @@
 from simulation.engine import SimEngine
 from mechanics.buff_system import BuffManager
 from mechanics.reaction_manager import ReactionManager
+from simulation.fork import deepcopy_with_callables
 
 from core.enums import Element, PhysAnomalyType
 from core.stats import CombatStats, Attributes, StatKey
 
 class DummyEnemy:
+    # 防御面板只读，复制引擎时共享
+    _fork_shared = ('_defense_cache',)
+    __deepcopy__ = deepcopy_with_callables
+    # 检查点保存的状态（见 simulation.checkpoint）
+    _checkpoint_fields = ('total_damage_taken', 'stagger_gauge', 'stagger_max', 'is_staggered', 'stagger_duration')
+
     def __init__(self, engine, name, defense=500, resistances=None):
         self.name = name
         self.engine = engine
@@ -22,6 +29,14 @@ class DummyEnemy:
         self.is_staggered = False # 是否处于失衡状态
         self.stagger_duration = 0 # 失衡持续时间(ticks)
 
+        # 防御属性缓存，Buff版本号或失衡状态变化时失效
+        self._defense_cache = None
+        self._defense_cache_key = None
+
+    def dispose(self):
+        """释放敌人：清空Buff"""
+        self.buffs.clear()
+
     def on_tick(self, engine: SimEngine):
         self.buffs.tick_all(engine)
 
@@ -31,7 +46,21 @@ class DummyEnemy:
             if self.stagger_duration <= 0:
                 self.is_staggered = False
                 self.stagger_gauge = 0.0
-                engine.log(f"[{self.name}] 失衡状态结束")
+                if engine.wants_log():
+                    engine.log(f"[{self.name}] 失衡状态结束")
+
+    def ticks_until_next_event(self):
+        """距离下一次需要逐tick处理还有多少tick（供引擎快进使用）"""
+        horizon = self.buffs.ticks_until_change()
+        if self.is_staggered and self.stagger_duration > 0:
+            horizon = min(horizon, self.stagger_duration)
+        return max(1, horizon)
+
+    def fast_forward(self, engine: SimEngine, ticks: int):
+        """批量推进 ticks 个空闲tick"""
+        self.buffs.fast_forward(engine, ticks)
+        if self.is_staggered and self.stagger_duration > 0:
+            self.stagger_duration -= ticks
 
     def apply_stagger(self, value: float, engine: SimEngine):
         """施加失衡值"""
@@ -39,15 +68,24 @@ class DummyEnemy:
             return  # 已经处于失衡状态，不再增加
 
         self.stagger_gauge += value
-        engine.log(f"   [失衡] 施加 {value} 点失衡值，当前: {self.stagger_gauge}/{self.stagger_max}")
+        if engine.wants_log():
+            engine.log(f"   [失衡] 施加 {value} 点失衡值，当前: {self.stagger_gauge}/{self.stagger_max}")
 
         if self.stagger_gauge >= self.stagger_max:
             self.is_staggered = True
             self.stagger_duration = 50  # 5秒失衡时间
-            engine.log(f"   >>> [{self.name}] 进入失衡状态！")
+            if engine.wants_log():
+                engine.log(f"   >>> [{self.name}] 进入失衡状态！")
 
     def get_defense_stats(self):
-        """获取防御计算所需的属性快照"""
+        """
+        获取防御计算所需的属性快照（只读，同一状态下的多段命中共用缓存）
+        动态Buff需在贡献变化时调用 buffs.notify_stats_changed()
+        """
+        cache_key = (self.buffs.get_version(), self.is_staggered)
+        if self._defense_cache is not None and self._defense_cache_key == cache_key:
+            return self._defense_cache
+
         # 1. 基础属性
         stats = {
             StatKey.DEFENSE: self.defense,
@@ -67,6 +105,8 @@ class DummyEnemy:
         # 2. 应用 Buff (直接修改stats字典)
         self.buffs.apply_stats(stats)
 
+        self._defense_cache = stats
+        self._defense_cache_key = cache_key
         return stats
 
     def take_damage(self, amount):
@@ -1,7 +1,9 @@
+import math
 from typing import List, Dict, Optional
 from core.enums import BuffCategory, BuffEffect, ReactionType
 from core.formulas import calculate_tech_enhancement
 from core.stats import StatKey
+from simulation.event_system import EventType, EventBuilder
 
 class Buff:
     """Buff基类"""
@@ -16,6 +18,7 @@ class Buff:
         self.effect_type = effect_type  # 使用枚举
         self.timer = 0
         self.owner = None  # 持有者引用
+        self._applied_deltas = None  # 已计入 BuffManager 汇总的属性增量
 
         # 额外标签（用于特殊识别，如反应类型）
         self.tags = set()
@@ -36,6 +39,15 @@ class Buff:
         """修改目标属性"""
         pass
 
+    def stat_deltas(self) -> Optional[Dict[str, float]]:
+        """
+        当前层数下对各属性的固定增量，由 BuffManager 累加进汇总表
+        返回 None 表示动态Buff（属性随时间变化或依赖面板内容），每次计算面板时调用 modify_stats
+        """
+        if type(self).modify_stats is Buff.modify_stats:
+            return {}
+        return None
+
     def on_stack(self, new_buff):
         """Buff叠加时触发"""
         self.stacks = min(self.max_stacks, self.stacks + new_buff.stacks)
@@ -47,6 +59,39 @@ class Buff:
         self.duration_ticks -= 1
         return self.duration_ticks <= 0
 
+    def ticks_until_change(self):
+        """
+        距离下一次需要逐tick处理（过期、跳伤等）还有多少tick
+        重写了 on_tick 却未重写 fast_forward 的子类无法快进，返回1
+        """
+        if not _supports_fast_forward(type(self)):
+            return 1
+        return max(1, self.duration_ticks)
+
+    def fast_forward(self, owner, engine, ticks: int):
+        """批量推进 ticks 个tick（调用方保证 ticks < ticks_until_change()）"""
+        self.timer += ticks
+        self.duration_ticks -= ticks
+
+
+_FAST_FORWARD_SUPPORT: Dict[type, bool] = {}
+
+
+def _defining_class(cls, attr):
+    for klass in cls.__mro__:
+        if attr in klass.__dict__:
+            return klass
+    return None
+
+
+def _supports_fast_forward(cls) -> bool:
+    """on_tick 的定义层级不比 fast_forward 更深时才能安全快进"""
+    supported = _FAST_FORWARD_SUPPORT.get(cls)
+    if supported is None:
+        supported = issubclass(_defining_class(cls, 'fast_forward'), _defining_class(cls, 'on_tick'))
+        _FAST_FORWARD_SUPPORT[cls] = supported
+    return supported
+
 class UsageBuff(Buff):
     """次数限制Buff基类"""
     def __init__(self, name: str, duration: float, usages: int = 1, 
@@ -96,6 +141,11 @@ class StatModifierBuff(Buff):
             else:
                 stats[key] = value * self.stacks
 
+    def stat_deltas(self) -> Optional[Dict[str, float]]:
+        if type(self).modify_stats is not StatModifierBuff.modify_stats:
+            return None
+        return {key: value * self.stacks for key, value in self.stat_modifiers.items()}
+
 # ============================================================
 # 保持向后兼容的简化类（使用StatModifierBuff实现）
 # ============================================================
@@ -154,10 +204,14 @@ class DoTBuff(Buff):
 
         if self.tick_counter >= self.interval_ticks:
             self.tick_counter = 0
-            engine.log(f"   [DOT] [{self.name}] 造成 {int(self.damage)} 点持续伤害")
+            if engine.wants_log():
+                engine.log(f"   [DOT] [{self.name}] 造成 {int(self.damage)} 点持续伤害")
 
             if hasattr(owner, 'take_damage'):
                 owner.take_damage(self.damage)
+                hit_trace = getattr(engine, 'hit_trace', None)
+                if hit_trace is not None:
+                    hit_trace.record_fixed(self.source_name, self.damage)
 
                 # 记录到统计系统
                 if hasattr(engine, 'statistics'):
@@ -175,6 +229,15 @@ class DoTBuff(Buff):
                     )
         return is_expired
 
+    def ticks_until_change(self):
+        if not _supports_fast_forward(type(self)):
+            return 1
+        return max(1, min(self.duration_ticks, self.interval_ticks - self.tick_counter))
+
+    def fast_forward(self, owner, engine, ticks: int):
+        super().fast_forward(owner, engine, ticks)
+        self.tick_counter += ticks
+
 # ============================================================
 # 元素反应Buff（使用增强计算）
 # ============================================================
@@ -223,10 +286,27 @@ class CorrosionBuff(Buff):
             self.tick_timer = 0
             if self.current_shred < self.max_shred:
                 self.current_shred = min(self.max_shred, self.current_shred + self.tick_shred)
+                self._notify_owner()
                 # engine.log(f"   [腐蚀] 抗性削减加深 -> {self.current_shred:.2%}")
                 
         return is_expired
 
+    def fast_forward(self, owner, engine, ticks: int):
+        # 削减加深不产生事件，可在快进中逐秒补算
+        super().fast_forward(owner, engine, ticks)
+        steps, self.tick_timer = divmod(self.tick_timer + ticks, self.tick_interval)
+        previous = self.current_shred
+        for _ in range(steps):
+            if self.current_shred < self.max_shred:
+                self.current_shred = min(self.max_shred, self.current_shred + self.tick_shred)
+        if self.current_shred != previous:
+            self._notify_owner()
+
+    def _notify_owner(self):
+        """削减值变化（每秒至多一次）时通知持有者刷新属性缓存"""
+        if self.owner is not None and hasattr(self.owner, 'buffs'):
+            self.owner.buffs.notify_stats_changed()
+
     def modify_stats(self, stats: Dict):
         for k in list(stats.keys()):
             if k.endswith("_res"):
@@ -262,6 +342,40 @@ class BuffManager:
         self.buffs: List[Buff] = []
         self._version = 0  # 版本号,用于缓存失效
 
+        # 固定增量Buff的属性汇总（施加/叠加/移除时增量维护）
+        self._stat_deltas: Dict[str, float] = {}
+        self._stat_counts: Dict[str, int] = {}  # 每个属性的贡献者数量，归零时删除键避免浮点残留
+        # 动态Buff（stat_deltas 返回 None），计算面板时按施加顺序调用 modify_stats
+        self._dynamic_buffs: List[Buff] = []
+
+    def _track(self, buff: Buff):
+        """将Buff的属性贡献计入汇总"""
+        deltas = buff.stat_deltas()
+        if deltas is None:
+            self._dynamic_buffs.append(buff)
+            return
+        buff._applied_deltas = deltas
+        for key, value in deltas.items():
+            self._stat_deltas[key] = self._stat_deltas.get(key, 0.0) + value
+            self._stat_counts[key] = self._stat_counts.get(key, 0) + 1
+
+    def _untrack(self, buff: Buff):
+        """从汇总中扣除Buff的属性贡献"""
+        deltas = getattr(buff, '_applied_deltas', None)
+        if deltas is None:
+            if buff in self._dynamic_buffs:
+                self._dynamic_buffs.remove(buff)
+            return
+        buff._applied_deltas = None
+        for key, value in deltas.items():
+            count = self._stat_counts[key] - 1
+            if count:
+                self._stat_counts[key] = count
+                self._stat_deltas[key] -= value
+            else:
+                del self._stat_counts[key]
+                del self._stat_deltas[key]
+
     def get_version(self):
         """获取当前版本号"""
         return self._version
@@ -270,6 +384,19 @@ class BuffManager:
         """增加版本号"""
         self._version += 1
 
+    def notify_stats_changed(self):
+        """动态Buff的属性贡献发生变化时调用（如腐蚀每秒加深），使依赖版本号的属性缓存失效"""
+        self._increment_version()
+
+    def clear(self):
+        """移除全部Buff（不触发事件，用于释放实体）"""
+        if self.buffs:
+            self.buffs.clear()
+            self._stat_deltas.clear()
+            self._stat_counts.clear()
+            self._dynamic_buffs.clear()
+            self._increment_version()
+
     def get_buff(self, name: str) -> Optional[Buff]:
         """获取指定名称的Buff"""
         for b in self.buffs:
@@ -281,13 +408,15 @@ class BuffManager:
         """添加或叠加Buff"""
         for b in self.buffs:
             if b.name == new_buff.name:
+                self._untrack(b)
                 b.on_stack(new_buff)
+                self._track(b)
                 self._increment_version()  # 更新版本号
                 if engine:
-                    engine.log(f"   (Buff) [{self.owner.name}] 刷新: {b.name} (层数:{b.stacks})")
+                    if engine.wants_log():
+                        engine.log(f"   (Buff) [{self.owner.name}] 刷新: {b.name} (层数:{b.stacks})")
                     # 发布Buff叠加事件
-                    if hasattr(engine, 'event_bus'):
-                        from simulation.event_system import EventType, EventBuilder
+                    if hasattr(engine, 'event_bus') and engine.event_bus.has_listeners(EventType.BUFF_STACKED):
                         event = EventBuilder.buff_event(
                             EventType.BUFF_STACKED,
                             owner=self.owner,
@@ -302,13 +431,14 @@ class BuffManager:
         self.buffs.append(new_buff)
         # 初始化Buff
         new_buff.on_apply(self.owner, engine)
+        self._track(new_buff)
         self._increment_version()  # 更新版本号
 
         if engine:
-            engine.log(f"   (Buff) [{self.owner.name}] 获得: {new_buff.name}")
+            if engine.wants_log():
+                engine.log(f"   (Buff) [{self.owner.name}] 获得: {new_buff.name}")
             # 发布Buff施加事件
-            if hasattr(engine, 'event_bus'):
-                from simulation.event_system import EventType, EventBuilder
+            if hasattr(engine, 'event_bus') and engine.event_bus.has_listeners(EventType.BUFF_APPLIED):
                 event = EventBuilder.buff_event(
                     EventType.BUFF_APPLIED,
                     owner=self.owner,
@@ -330,10 +460,11 @@ class BuffManager:
                 active_buffs.append(b)
             else:
                 version_changed = True
-                engine.log(f"   (Buff) [{self.owner.name}] 效果结束: {b.name}")
+                self._untrack(b)
+                if engine.wants_log():
+                    engine.log(f"   (Buff) [{self.owner.name}] 效果结束: {b.name}")
                 # 发布Buff过期事件
-                if hasattr(engine, 'event_bus'):
-                    from simulation.event_system import EventType
+                if hasattr(engine, 'event_bus') and engine.event_bus.has_listeners(EventType.BUFF_EXPIRED):
                     engine.event_bus.emit_simple(
                         EventType.BUFF_EXPIRED,
                         owner=self.owner.name,
@@ -344,10 +475,47 @@ class BuffManager:
         if version_changed:
             self._increment_version()  # 更新版本号
 
+    def ticks_until_change(self):
+        """所有Buff中最近一次需要逐tick处理的时刻"""
+        horizon = math.inf
+        for b in self.buffs:
+            horizon = min(horizon, b.ticks_until_change())
+        return horizon
+
+    def fast_forward(self, engine, ticks: int):
+        """批量推进所有Buff"""
+        for b in self.buffs:
+            b.fast_forward(self.owner, engine, ticks)
+
     def apply_stats(self, base_stats: Dict):
-        """应用所有Buff的属性修改(直接修改传入的字典)"""
+        """
+        应用所有Buff的属性修改(直接修改传入的字典)
+        没有动态Buff时直接叠加固定增量汇总；否则按施加顺序分段，
+        每个动态Buff之前先叠加排在它前面的固定增量，与逐个调用 modify_stats 的顺序一致
+        """
+        if not self._dynamic_buffs:
+            self._add_deltas(base_stats, self._stat_deltas)
+            return
+        pending: Dict[str, float] = {}
         for b in self.buffs:
-            b.modify_stats(base_stats)
+            deltas = b._applied_deltas
+            if deltas is None:
+                self._add_deltas(base_stats, pending)
+                pending.clear()
+                b.modify_stats(base_stats)
+            else:
+                for key, value in deltas.items():
+                    pending[key] = pending.get(key, 0.0) + value
+        self._add_deltas(base_stats, pending)
+
+    @staticmethod
+    def _add_deltas(stats: Dict, deltas: Dict[str, float]):
+        """将属性增量叠加到字典上"""
+        for key, value in deltas.items():
+            if key in stats:
+                stats[key] += value
+            else:
+                stats[key] = value
         
     def apply_reaction_enhancements(self, reaction_result):
         """应用所有Buff的反应增强效果"""
@@ -360,8 +528,11 @@ class BuffManager:
         for b in self.buffs:
             if tag in b.tags:
                 self.buffs.remove(b)
+                self._untrack(b)
+                self._increment_version()
                 if engine:
-                    engine.log(f"   (Buff) [{self.owner.name}] 消耗: {b.name}")
+                    if engine.wants_log():
+                        engine.log(f"   (Buff) [{self.owner.name}] 消耗: {b.name}")
                 return True
         return False
 
@@ -370,6 +541,8 @@ class BuffManager:
         for b in self.buffs:
             if b.name == name:
                 self.buffs.remove(b)
+                self._untrack(b)
+                self._increment_version()
                 return True
         return False
 
@@ -6,6 +6,7 @@
 from typing import Callable, Optional, List, Dict, Any
 from dataclasses import dataclass
 from simulation.event_system import Event, EventType
+from simulation.fork import deepcopy_with_callables
 
 
 @dataclass
@@ -16,6 +17,8 @@ class QTECondition:
     check: Callable[[Event], bool]      # 条件检查函数
     priority: int = 0                   # 优先级
 
+    __deepcopy__ = deepcopy_with_callables
+
 
 @dataclass
 class QTESkill:
@@ -27,6 +30,8 @@ class QTESkill:
     can_trigger: Callable[[], bool] = lambda: True  # 额外检查（如资源、CD）
     on_trigger: Optional[Callable[[Event], None]] = None  # 触发回调
 
+    __deepcopy__ = deepcopy_with_callables
+
 
 class QTEManager:
     """
@@ -50,8 +55,8 @@ class QTEManager:
         # CD追踪
         self.cooldowns: Dict[str, int] = {}
 
-        # 监听器记录（用于清理）
-        self.listeners = []
+        # 监听器作用域（用于清理）
+        self.subscriptions = self.event_bus.create_scope()
 
     def register_qte(self, qte_skill: QTESkill):
         """注册一个QTE技能"""
@@ -63,12 +68,11 @@ class QTEManager:
             event_types = self._infer_event_types(condition)
 
             for event_type in event_types:
-                listener = self.event_bus.subscribe(
+                self.subscriptions.subscribe(
                     event_type,
                     lambda event, cond=condition, qte=qte_skill: self._on_event(event, cond, qte),
                     priority=condition.priority
                 )
-                self.listeners.append((event_type, listener))
 
     def _infer_event_types(self, condition: QTECondition) -> List[EventType]:
         """根据条件名称推断需要监听的事件类型"""
@@ -110,7 +114,8 @@ class QTEManager:
 
     def _trigger_qte(self, event: Event, qte_skill: QTESkill):
         """触发QTE技能"""
-        self.engine.log(f"[QTE触发] {self.character.name} -> {qte_skill.name}")
+        if self.engine.wants_log():
+            self.engine.log(f"[QTE触发] {self.character.name} -> {qte_skill.name}")
 
         # 设置CD
         self.cooldowns[qte_skill.name] = qte_skill.cooldown
@@ -127,9 +132,7 @@ class QTEManager:
 
     def cleanup(self):
         """清理所有监听器"""
-        for event_type, listener in self.listeners:
-            self.event_bus.unsubscribe(event_type, listener)
-        self.listeners.clear()
+        self.subscriptions.close()
 
 
 # ===== 预定义常用条件 =====
@@ -347,12 +350,16 @@ def example_levatine_qte(character, engine, target):
         )
 
         target.take_damage(base_dmg)
-        engine.log(f"   [伤害] 炽焰喷发造成: {int(base_dmg)}")
+        if getattr(engine, 'hit_trace', None) is not None:
+            engine.hit_trace.record_fixed(character.name, base_dmg, uses_panel=True)
+        if engine.wants_log():
+            engine.log(f"   [伤害] 炽焰喷发造成: {int(base_dmg)}")
 
         # 获得1层熔火
         if hasattr(character, 'molten_stacks'):
             character.molten_stacks = min(4, character.molten_stacks + 1)
-            engine.log(f"   [天赋] 获得熔火层数: {character.molten_stacks}")
+            if engine.wants_log():
+                engine.log(f"   [天赋] 获得熔火层数: {character.molten_stacks}")
 
         # 记录统计
         if hasattr(engine, 'statistics'):
@@ -21,6 +21,9 @@ class ReactionResult:
             self.reaction_types = []
 
 class ReactionManager:
+    # 检查点保存的状态（见 simulation.checkpoint）
+    _checkpoint_fields = ('attachment_element', 'attachment_stacks', 'phys_break_stacks', 'last_phys_type')
+
     def __init__(self, owner: 'BaseActor', engine: 'SimEngine'):
         self.owner = owner
         self.engine = engine
@@ -28,6 +31,7 @@ class ReactionManager:
         self.attachment_element: Optional[Element] = None
         self.attachment_stacks: int = 0
         self.phys_break_stacks: int = 0
+        self.last_phys_type: Optional[PhysAnomalyType] = None
 
     def has_magic_attachment(self) -> bool:
         return self.attachment_element is not None
@@ -231,6 +235,8 @@ class ReactionManager:
     def _emit_event(self, result, attacker_name, incoming_element, level, phys_type=None):
         if hasattr(self.engine, 'event_bus'):
             from simulation.event_system import EventType
+            if not self.engine.event_bus.has_listeners(EventType.REACTION_TRIGGERED):
+                return
             # Emit for each reaction type
             for r_type in result.reaction_types:
                 data = {
@@ -251,6 +257,8 @@ class ReactionManager:
         """发出元素附着事件"""
         if hasattr(self.engine, 'event_bus'):
             from simulation.event_system import EventType
+            if not self.engine.event_bus.has_listeners(EventType.ELEMENT_ATTACHED):
+                return
             self.engine.event_bus.emit_simple(
                 EventType.ELEMENT_ATTACHED,
                 target=self.owner.name,
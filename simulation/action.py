@@ -1,5 +1,7 @@
 from dataclasses import dataclass
-from typing import Callable, List
+from typing import Any, Callable, Dict, List
+
+from simulation.fork import deepcopy_with_callables
 
 @dataclass
 class DamageEvent:
@@ -7,15 +9,24 @@ class DamageEvent:
     damage_func: Callable  # 回调
     name: str = "Hit"
 
+    # 回调是捕获角色的闭包，复制引擎时需重新绑定
+    __deepcopy__ = deepcopy_with_callables
+
 from core.enums import MoveType
 
 class Action:
-    def __init__(self, name: str, duration: int, events: List[DamageEvent] = None, move_type: MoveType = MoveType.OTHER):
+    def __init__(self, name: str, duration: int, events: List[DamageEvent] = None, move_type: MoveType = MoveType.OTHER,
+                 state: Dict[str, Any] = None):
         self.name = name
         self.duration = duration
         self.events = sorted(events or [], key=lambda x: x.time_offset)
         self.processed_event_index = 0
         self.move_type = move_type
+        # 各段回调共享的可变状态（只存数据，检查点按值保存）
+        self.state = state if state is not None else {}
+        # 产生该行动的脚本指令与解析时读取的角色状态（检查点据此重建回调）
+        self.command = None
+        self.inputs = ()
 
     def reset(self):
         self.processed_event_index = 0
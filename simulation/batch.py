@@ -0,0 +1,206 @@
+"""
+批量模拟
+将大量配置（队伍、脚本、配装、敌人、时长、随机种子）分发到进程池并行运行，
+只回传精简的结果记录，适合参数扫描与随机种子统计
+"""
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.config_manager import get_config
+from core.equipment_system import EquipmentManager, EquipmentSetManager
+from core.weapon_system import WeaponManager
+from simulation.engine import SimEngine
+from simulation.loadout import (
+    apply_custom_attrs, apply_equipments, apply_weapon, create_enemy,
+    discover_characters, resolve_equipments, timeline_to_script,
+)
+
+
+@dataclass
+class CharacterSpec:
+    """单个角色的模拟配置"""
+    name: str
+    script: List[str] = field(default_factory=list)
+    timeline: Optional[List[Tuple[float, str]]] = None  # [(开始时间, 指令)]，优先于 script
+    weapon_id: Optional[str] = None
+    equipment_ids: Dict[str, str] = field(default_factory=dict)  # {slot: equipment_id}
+    custom_attrs: Optional[Dict[str, Any]] = None
+    molten_stacks: int = 0
+
+
+@dataclass
+class EnemySpec:
+    """敌人配置"""
+    defense: float = 100.0
+    dmg_taken_mults: Dict[str, float] = field(default_factory=dict)  # physical/heat/... -> 受伤倍率
+
+
+@dataclass
+class RunSpec:
+    """一次模拟的完整配置"""
+    characters: List[CharacterSpec]
+    enemy: EnemySpec = field(default_factory=EnemySpec)
+    duration: float = 20.0
+    seed: Optional[int] = None
+    crit_mode: Optional[str] = None  # random / expected，默认读取配置
+    run_id: Optional[str] = None
+
+
+@dataclass
+class RunResult:
+    """精简的模拟结果"""
+    run_id: str
+    seed: Optional[int]
+    total_damage: float = 0.0
+    dps: float = 0.0
+    damage_std: float = 0.0  # 期望暴击模式下的暴击标准差
+    damage_by_character: Dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+@dataclass
+class SimulationContext:
+    """进程内复用的角色表与武器/装备库"""
+    char_map: Dict[str, type]
+    weapon_manager: WeaponManager
+    equipment_manager: EquipmentManager
+    set_manager: EquipmentSetManager
+
+
+# 每个工作进程在初始化时构建一次
+_CONTEXT: Optional[SimulationContext] = None
+
+
+def load_context(weapon_file: str = "weapons.json", equipment_dir: str = "equipment") -> SimulationContext:
+    """加载角色表与武器/装备库"""
+    char_map, _ = discover_characters()
+    return SimulationContext(
+        char_map=char_map,
+        weapon_manager=WeaponManager(weapon_file),
+        equipment_manager=EquipmentManager(equipment_dir),
+        set_manager=EquipmentSetManager(equipment_dir),
+    )
+
+
+def _init_worker(weapon_file: str, equipment_dir: str, log_level: str):
+    """工作进程预热：导入模块、发现角色、加载库，后续任务直接复用"""
+    global _CONTEXT
+    get_config().log_level = log_level
+    _CONTEXT = load_context(weapon_file, equipment_dir)
+
+
+def build_simulation(spec: RunSpec, context: SimulationContext, engine: Optional[SimEngine] = None):
+    """
+    按配置搭建战斗场景（不运行）
+    Returns:
+        (engine, target)
+    """
+    engine = engine or SimEngine(seed=spec.seed, crit_mode=spec.crit_mode)
+    target = create_enemy(engine, spec.enemy.defense, spec.enemy.dmg_taken_mults)
+    engine.entities.append(target)
+
+    for char_spec in spec.characters:
+        char_class = context.char_map.get(char_spec.name)
+        if char_class is None:
+            raise ValueError(f"未知角色: {char_spec.name}")
+
+        obj = char_class(engine, target)
+        apply_custom_attrs(obj, char_spec.custom_attrs)
+
+        if char_spec.weapon_id:
+            weapon = context.weapon_manager.get(char_spec.weapon_id)
+            if weapon:
+                apply_weapon(obj, weapon, engine)
+
+        if char_spec.equipment_ids:
+            equipments = resolve_equipments(char_spec.equipment_ids, context.equipment_manager)
+            apply_equipments(obj, equipments, context.set_manager, engine)
+
+        if hasattr(obj, "molten_stacks"):
+            obj.molten_stacks = char_spec.molten_stacks
+
+        if char_spec.timeline:
+            obj.set_script(timeline_to_script(char_spec.timeline))
+        else:
+            obj.set_script(list(char_spec.script))
+
+        engine.entities.append(obj)
+
+    return engine, target
+
+
+def run_spec(spec: RunSpec, context: Optional[SimulationContext] = None) -> RunResult:
+    """在当前进程中运行一次模拟"""
+    context = context or _CONTEXT or load_context()
+    engine, target = build_simulation(spec, context)
+    try:
+        engine.run(spec.duration, fast_forward=True)
+
+        total = target.total_damage_taken
+        return RunResult(
+            run_id=spec.run_id,
+            seed=engine.seed,
+            total_damage=total,
+            dps=total / spec.duration if spec.duration > 0 else 0.0,
+            damage_std=engine.statistics.get_damage_std(),
+            damage_by_character={
+                name: cs.total_damage for name, cs in engine.statistics.character_stats.items()
+            },
+        )
+    finally:
+        # 工作进程会连续运行大量模拟，及时断开引用以便回收
+        engine.dispose()
+
+
+def _run_indexed(item: Tuple[int, RunSpec]) -> RunResult:
+    index, spec = item
+    run_id = spec.run_id if spec.run_id is not None else str(index)
+    try:
+        result = run_spec(spec)
+        result.run_id = run_id
+        return result
+    except Exception as e:
+        traceback.print_exc()
+        return RunResult(run_id=run_id, seed=spec.seed, error=str(e))
+
+
+def run_batch(specs: Iterable[RunSpec], max_workers: Optional[int] = None,
+              chunksize: Optional[int] = None, weapon_file: str = "weapons.json",
+              equipment_dir: str = "equipment", log_level: str = "WARNING") -> List[RunResult]:
+    """
+    并行运行一批模拟
+
+    Args:
+        specs: 模拟配置
+        max_workers: 进程数，默认CPU核数；<=1 时在当前进程串行运行
+        chunksize: 每次派发给工作进程的任务数，默认按进程数自动分块
+        log_level: 工作进程的日志级别（批量运行时默认关闭INFO日志）
+
+    Returns:
+        与输入顺序一致的结果列表，单次失败记录在 RunResult.error 中
+    """
+    items = list(enumerate(specs))
+    if not items:
+        return []
+
+    workers = max_workers or os.cpu_count() or 1
+    workers = min(workers, len(items))
+
+    if workers <= 1:
+        config = get_config()
+        previous_level = config.log_level
+        _init_worker(weapon_file, equipment_dir, log_level)
+        try:
+            return [_run_indexed(item) for item in items]
+        finally:
+            config.log_level = previous_level
+
+    if chunksize is None:
+        chunksize = max(1, len(items) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(weapon_file, equipment_dir, log_level)) as executor:
+        return list(executor.map(_run_indexed, items, chunksize=chunksize))
@@ -0,0 +1,512 @@
+"""
+检查点
+把引擎的战斗状态写成版本化的格式，之后可在任意进程中恢复并继续推进。
+长时间模拟可定期写检查点以便中断后续跑，公共开场也可以只算一次、由多个任务分别加载。
+
+只保存显式列出的状态数据，不保存对象图：
+- 引擎：tick、种子、暴击模式、技力、各随机子流状态、统计数据；快照引擎另存快照历史、日志与采样进度
+- 实体：类属性 _checkpoint_fields 列出的状态、行动队列、Buff、元素附着与破防层数（同样按 _checkpoint_fields）
+- Buff 按注册类型（已加载的 Buff 子类，模块:限定名）保存实例数据
+- 当前行动保存产生它的脚本指令、解析指令时读取的角色状态（_command_inputs）、进度与各段共享状态，
+  恢复时按原状态重新解析指令得到回调，并核对各段时间点
+队伍、配装与事件订阅由调用方的构建函数重建：loads 先构建同样配置的新引擎，再写回保存的状态。
+事件历史、伤害内核缓存与命中轨迹不保存。
+
+格式：
+    b"EFCK" | 格式版本(u16) | zlib 压缩的 JSON
+值只能是 JSON 基本类型；元组、集合、非字符串键的字典与 core.enums 中的枚举以单键对象标记，
+加载时只会构造 Buff 子类、core.enums 中的枚举与统计记录。保存的状态结构变化时递增 CHECKPOINT_VERSION。
+"""
+import enum
+import json
+import os
+import struct
+import zlib
+from collections import defaultdict, deque
+from dataclasses import fields
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+from core import enums
+from core.statistics import BuffRecord, CharacterStats, CombatStatistics, DamageRecord, ReactionRecord, SkillUsageRecord
+from mechanics.buff_system import Buff, BuffManager
+from mechanics.reaction_manager import ReactionManager
+from simulation.engine import SimEngine
+from simulation.party_manager import PartyManager
+from simulation.snapshot_engine import SnapshotEngine
+from simulation.snapshot_history import DeltaHistory
+
+CHECKPOINT_VERSION = 2
+MAGIC = b"EFCK"
+_HEADER = struct.Struct("<4sH")
+
+# 可加载的枚举（按类名）
+_ENUMS = {
+    cls.__name__: cls for cls in vars(enums).values()
+    if isinstance(cls, type) and issubclass(cls, enum.Enum) and cls.__module__ == enums.__name__
+}
+
+# 统计中的原始记录列表及其记录类型
+_RECORD_LISTS = (
+    ("damage_records", DamageRecord),
+    ("buff_records", BuffRecord),
+    ("reaction_records", ReactionRecord),
+    ("skill_usage_records", SkillUsageRecord),
+)
+
+# 快照引擎的构造选项，须与构建函数给出的引擎一致
+_SNAPSHOT_OPTIONS = ("history_format", "keyframe_every", "snapshot_every", "snapshot_on_change", "snapshot_fields")
+
+
+class CheckpointError(ValueError):
+    """检查点无法写入或加载"""
+
+
+# ===== 值编码 =====
+
+def _plain(value):
+    """把状态值编码为 JSON 值；只接受数据（基本类型、容器与 core.enums 中的枚举）"""
+    cls = type(value)
+    if value is None or cls in (bool, int, float, str):
+        return value
+    if cls is list:
+        return [_plain(v) for v in value]
+    if cls is tuple:
+        return {"$tuple": [_plain(v) for v in value]}
+    if cls is set:
+        return {"$set": [_plain(v) for v in value]}
+    if cls is dict:
+        if all(type(k) is str and not k.startswith("$") for k in value):
+            return {k: _plain(v) for k, v in value.items()}
+        return {"$dict": [[_plain(k), _plain(v)] for k, v in value.items()]}
+    if isinstance(value, enum.Enum) and _ENUMS.get(cls.__name__) is cls:
+        return {"$enum": f"{cls.__name__}.{value.name}"}
+    raise CheckpointError(f"检查点只能保存数据，不支持的类型: {cls.__module__}.{cls.__qualname__}")
+
+
+def _value(data):
+    """_plain 的逆过程"""
+    if type(data) is list:
+        return [_value(v) for v in data]
+    if type(data) is not dict:
+        return data
+    if len(data) == 1:
+        (tag, inner), = data.items()
+        if tag == "$tuple":
+            return tuple(_value(v) for v in inner)
+        if tag == "$set":
+            return {_value(v) for v in inner}
+        if tag == "$dict":
+            return {_value(k): _value(v) for k, v in inner}
+        if tag == "$enum":
+            return _enum(inner)
+    return {k: _value(v) for k, v in data.items()}
+
+
+def _enum(text: str):
+    cls_name, _, name = text.partition(".")
+    cls = _ENUMS.get(cls_name)
+    if cls is None or name not in cls.__members__:
+        raise CheckpointError(f"检查点引用了未知的枚举值: {text}")
+    return cls[name]
+
+
+def _class_name(cls) -> str:
+    return f"{cls.__module__}:{cls.__qualname__}"
+
+
+def _fields_state(obj, names) -> Dict[str, Any]:
+    return {name: _plain(getattr(obj, name)) for name in names}
+
+
+def _restore_fields(obj, names, state: Dict[str, Any]):
+    for name in names:
+        setattr(obj, name, _value(state[name]))
+
+
+def _checkpoint_fields(obj):
+    names = getattr(type(obj), "_checkpoint_fields", None)
+    if names is None:
+        raise CheckpointError(f"{type(obj).__qualname__} 未声明 _checkpoint_fields，无法写入检查点")
+    return names
+
+
+# ===== Buff =====
+
+def _buff_types() -> Dict[str, type]:
+    """可加载的 Buff 类型：当前进程中已加载的 Buff 子类"""
+    types, pending = {}, [Buff]
+    while pending:
+        cls = pending.pop()
+        types[_class_name(cls)] = cls
+        pending.extend(cls.__subclasses__())
+    return types
+
+
+def _buff_state(buff: Buff) -> Dict[str, Any]:
+    # 持有者由所在的 BuffManager 决定，其余实例属性须为数据
+    return {"type": _class_name(type(buff)),
+            "data": {k: _plain(v) for k, v in vars(buff).items() if k != "owner"}}
+
+
+def _restore_buff(state: Dict[str, Any], owner, buff_types: Dict[str, type]) -> Buff:
+    cls = buff_types.get(state["type"])
+    if cls is None:
+        raise CheckpointError(f"检查点引用了未知的 Buff 类型: {state['type']}")
+    buff = cls.__new__(cls)
+    for key, value in state["data"].items():
+        setattr(buff, key, _value(value))
+    buff.owner = owner
+    return buff
+
+
+def _buff_manager_state(manager: BuffManager) -> Dict[str, Any]:
+    index = {id(b): i for i, b in enumerate(manager.buffs)}
+    # 属性汇总按施加/移除顺序增量累加，直接保存以保证恢复后面板逐位一致
+    return {
+        "buffs": [_buff_state(b) for b in manager.buffs],
+        "version": manager._version,
+        "stat_deltas": _plain(manager._stat_deltas),
+        "stat_counts": _plain(manager._stat_counts),
+        "dynamic": [index[id(b)] for b in manager._dynamic_buffs],
+    }
+
+
+def _restore_buff_manager(manager: BuffManager, state: Dict[str, Any], buff_types: Dict[str, type]):
+    manager.buffs = [_restore_buff(b, manager.owner, buff_types) for b in state["buffs"]]
+    manager._version = state["version"]
+    manager._stat_deltas = _value(state["stat_deltas"])
+    manager._stat_counts = _value(state["stat_counts"])
+    manager._dynamic_buffs = [manager.buffs[i] for i in state["dynamic"]]
+
+
+# ===== 行动 =====
+
+def _action_state(action) -> Dict[str, Any]:
+    if action.command is None:
+        raise CheckpointError(f"行动 {action.name} 不是由脚本指令产生，无法写入检查点")
+    return {
+        "command": action.command,
+        "inputs": _plain(action.inputs),
+        "name": action.name,
+        "duration": action.duration,
+        "move_type": _plain(action.move_type),
+        "index": action.processed_event_index,
+        "offsets": [event.time_offset for event in action.events],
+        "state": _plain(action.state),
+    }
+
+
+def _restore_action(actor, state: Dict[str, Any]):
+    """按解析时的角色状态重新解析指令，得到与原行动相同的回调，再写回进度"""
+    names = type(actor)._command_inputs
+    inputs = _value(state["inputs"])
+    if len(inputs) != len(names):
+        raise CheckpointError(f"[{actor.name}] 行动的解析状态与当前代码不符")
+    current = {name: getattr(actor, name) for name in names}
+    for name, value in zip(names, inputs):
+        setattr(actor, name, value)
+    action = actor.parse_command(state["command"])
+    for name, value in current.items():
+        setattr(actor, name, value)
+
+    if action is None or [event.time_offset for event in action.events] != state["offsets"]:
+        raise CheckpointError(f"[{actor.name}] 无法按指令 {state['command']!r} 重建当前行动")
+    action.command, action.inputs = state["command"], inputs
+    action.name = state["name"]
+    action.duration = state["duration"]
+    action.move_type = _value(state["move_type"])
+    action.processed_event_index = state["index"]
+    # 回调闭包持有同一个状态字典，原地更新
+    action.state.update(_value(state["state"]))
+    actor.current_action = action
+
+
+# ===== 实体 =====
+
+def _entity_state(entity) -> Dict[str, Any]:
+    state = {
+        "class": _class_name(type(entity)),
+        "name": entity.name,
+        "fields": _fields_state(entity, _checkpoint_fields(entity)),
+    }
+    if hasattr(entity, "buffs"):
+        state["buffs"] = _buff_manager_state(entity.buffs)
+    if hasattr(entity, "reaction_mgr"):
+        state["reactions"] = _fields_state(entity.reaction_mgr, ReactionManager._checkpoint_fields)
+    if hasattr(entity, "action_queue"):
+        state["queue"] = list(entity.action_queue)
+    if getattr(entity, "current_action", None) is not None:
+        state["action"] = _action_state(entity.current_action)
+    return state
+
+
+def _restore_entity(entity, state: Dict[str, Any], buff_types: Dict[str, type]):
+    if state["class"] != _class_name(type(entity)) or state["name"] != entity.name:
+        raise CheckpointError(f"构建的实体 {entity.name} 与检查点中的 {state['name']} 不符")
+    _restore_fields(entity, _checkpoint_fields(entity), state["fields"])
+    if "buffs" in state:
+        _restore_buff_manager(entity.buffs, state["buffs"], buff_types)
+    if "reactions" in state:
+        _restore_fields(entity.reaction_mgr, ReactionManager._checkpoint_fields, state["reactions"])
+    if "queue" in state:
+        entity.action_queue = deque(state["queue"])
+    if hasattr(entity, "current_action"):
+        entity.current_action = None
+        if "action" in state:
+            _restore_action(entity, state["action"])
+    # 面板/防御缓存按 Buff 版本号判断有效，版本号已被替换，缓存一律作废
+    if hasattr(entity, "_panel_cache"):
+        entity._panel_cache = None
+        entity._panel_cache_version = -1
+    if hasattr(entity, "_defense_cache"):
+        entity._defense_cache = None
+        entity._defense_cache_key = None
+
+
+# ===== 统计 =====
+
+def _record_fields(cls):
+    return tuple(f.name for f in fields(cls))
+
+
+def _statistics_state(stats: CombatStatistics) -> Dict[str, Any]:
+    state = {
+        name: [[_plain(getattr(r, f)) for f in _record_fields(cls)] for r in getattr(stats, name)]
+        for name, cls in _RECORD_LISTS
+    }
+    state.update({
+        "character_stats": {name: _fields_state(s, _record_fields(CharacterStats))
+                            for name, s in stats.character_stats.items()},
+        "total_damage": stats.total_damage,
+        "damage_variance": stats.damage_variance,
+        "combat_duration": stats.combat_duration,
+        "damage_timeline": _plain(stats.damage_timeline),
+        "dps_timeline": _plain(dict(stats.dps_timeline)),
+        "dps_window": stats._dps_window,
+        "dps_cache": _plain(dict(stats._dps_cache)),
+    })
+    return state
+
+
+def _restore_statistics(stats: CombatStatistics, state: Dict[str, Any]):
+    for name, cls in _RECORD_LISTS:
+        setattr(stats, name, [cls(*(_value(v) for v in row)) for row in state[name]])
+    stats.character_stats = {
+        name: CharacterStats(**{k: _value(v) for k, v in s.items()})
+        for name, s in state["character_stats"].items()
+    }
+    stats.total_damage = state["total_damage"]
+    stats.damage_variance = state["damage_variance"]
+    stats.combat_duration = state["combat_duration"]
+    stats.damage_timeline = _value(state["damage_timeline"])
+    stats.dps_timeline = defaultdict(list, _value(state["dps_timeline"]))
+    stats._dps_window = state["dps_window"]
+    stats._dps_cache = defaultdict(list, _value(state["dps_cache"]))
+
+
+# ===== 快照 =====
+
+def _snapshot_state(engine: SnapshotEngine) -> Dict[str, Any]:
+    if isinstance(engine.history, DeltaHistory):
+        history = _delta_state(engine.history, engine.entities)
+    else:
+        history = _plain(engine.history)
+    return {
+        "options": _fields_state(engine, _SNAPSHOT_OPTIONS),
+        "history": history,
+        "logs": _plain(engine.logs),
+        "logs_by_tick": _plain(dict(engine.logs_by_tick)),
+        "damage_by_tick": _plain(dict(engine.damage_by_tick)),
+        "damage_pos": engine._damage_pos,
+        "frame_count": engine._frame_count,
+        "last_frame_tick": engine._last_frame_tick,
+        "last_state": _state_key_state(engine),
+    }
+
+
+def _restore_snapshot(engine: SnapshotEngine, state: Dict[str, Any]):
+    if _fields_state(engine, _SNAPSHOT_OPTIONS) != state["options"]:
+        raise CheckpointError("构建的快照引擎选项与检查点不符")
+    if isinstance(engine.history, DeltaHistory):
+        _restore_delta(engine.history, engine.entities, state["history"])
+    else:
+        engine.history = _value(state["history"])
+    engine.logs = _value(state["logs"])
+    engine.logs_by_tick = defaultdict(list, _value(state["logs_by_tick"]))
+    engine.damage_by_tick = defaultdict(int, _value(state["damage_by_tick"]))
+    engine._damage_pos = state["damage_pos"]
+    engine._frame_count = state["frame_count"]
+    engine._last_frame_tick = state["last_frame_tick"]
+    engine._last_state = _restore_state_key(engine, state["last_state"])
+
+
+def _state_key_state(engine: SnapshotEngine):
+    """按变化采样的上一帧状态；其中的动作按对象身份比较，记录为是否仍是实体的当前行动"""
+    key = engine._last_state
+    if key is None:
+        return None
+    entities = []
+    for entity, (buffs, action, extra, qte) in zip(engine.entities, key[1:]):
+        current = None if action is None else action is getattr(entity, "current_action", None)
+        entities.append(_plain([buffs, current, extra, qte]))
+    return {"sp": key[0], "entities": entities}
+
+
+def _restore_state_key(engine: SnapshotEngine, state):
+    if state is None:
+        return None
+    key = [state["sp"]]
+    for entity, item in zip(engine.entities, state["entities"]):
+        buffs, current, extra, qte = _value(item)
+        # 已结束的行动不等于任何新行动
+        action = None if current is None else (entity.current_action if current else object())
+        key.append((buffs, action, extra, qte))
+    return key
+
+
+def _entity_buffs(entities) -> Dict[str, list]:
+    return {e.name: e.buffs.buffs for e in entities if hasattr(e, "buffs")}
+
+
+def _delta_state(history: DeltaHistory, entities) -> Dict[str, Any]:
+    """增量编码器的上一帧状态中 Buff 按对象身份比较，记录为实体当前 Buff 列表中的序号（已移除的为 None）"""
+    buffs_by_entity = _entity_buffs(entities)
+    prev = {}
+    for name, (buffs, action, extra, qte) in history._entities.items():
+        current = buffs_by_entity.get(name, [])
+        items = []
+        for item in buffs:
+            index = next((i for i, b in enumerate(current) if b is item[0]), None)
+            items.append([index, _plain(list(item[1:]))])
+        prev[name] = [items, _plain(action), extra, qte]
+    return {"records": _plain(history.records), "tick": history._tick, "sp": history._sp, "entities": prev}
+
+
+def _restore_delta(history: DeltaHistory, entities, state: Dict[str, Any]):
+    buffs_by_entity = _entity_buffs(entities)
+    history.records = _value(state["records"])
+    history._tick = state["tick"]
+    history._sp = state["sp"]
+    history._entities = {}
+    for name, (items, action, extra, qte) in state["entities"].items():
+        current = buffs_by_entity.get(name, [])
+        buffs = [(object() if index is None else current[index],) + tuple(_value(rest)) for index, rest in items]
+        history._entities[name] = (buffs, _value(action), extra, qte)
+
+
+# ===== 引擎 =====
+
+def _engine_state(engine: SimEngine) -> Dict[str, Any]:
+    state = {
+        "tick": engine.tick,
+        "seed": engine.seed,
+        "crit_mode": _plain(engine.crit_mode),
+        "party": _fields_state(engine.party_manager, PartyManager._checkpoint_fields),
+        "rng": _plain(engine.rng.getstate()),
+        "events_enabled": engine.event_bus.is_enabled(),
+        "statistics": _statistics_state(engine.statistics),
+        "entities": [_entity_state(e) for e in engine.entities],
+    }
+    if isinstance(engine, SnapshotEngine):
+        state["snapshot"] = _snapshot_state(engine)
+    return state
+
+
+def _restore_engine(engine: SimEngine, state: Dict[str, Any]):
+    if len(engine.entities) != len(state["entities"]):
+        raise CheckpointError("构建的队伍与检查点不符")
+    engine.tick = state["tick"]
+    engine.seed = state["seed"]
+    engine.rng.setstate(state["seed"], _value(state["rng"]))
+    engine.crit_mode = _value(state["crit_mode"])
+    _restore_fields(engine.party_manager, PartyManager._checkpoint_fields, state["party"])
+    if state["events_enabled"]:
+        engine.event_bus.enable()
+    else:
+        engine.event_bus.disable()
+    _restore_statistics(engine.statistics, state["statistics"])
+    buff_types = _buff_types()
+    for entity, entity_state in zip(engine.entities, state["entities"]):
+        _restore_entity(entity, entity_state, buff_types)
+    if "snapshot" in state:
+        _restore_snapshot(engine, state["snapshot"])
+    engine.hit_trace = None
+
+
+# ===== 接口 =====
+
+def dumps(engine: SimEngine, level: int = 6) -> bytes:
+    """把引擎状态编码为检查点字节串"""
+    state = {
+        "meta": {"tick": engine.tick, "seed": engine.seed, "engine": _class_name(type(engine))},
+        "engine": _engine_state(engine),
+    }
+    data = json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(MAGIC, CHECKPOINT_VERSION) + zlib.compress(data, level)
+
+
+def read_meta(data: bytes) -> dict:
+    """只读取检查点的元信息（tick、种子、引擎类型），不恢复引擎"""
+    return _payload(data)["meta"]
+
+
+def loads(data: bytes, build: Callable[[], SimEngine]) -> SimEngine:
+    """
+    从检查点字节串恢复引擎，恢复后可直接继续 run_until
+    Args:
+        build: 无参构建函数，返回与写入检查点时相同配置（队伍、配装、脚本、敌人、快照选项）的未运行引擎
+    """
+    state = _payload(data)
+    engine = build()
+    try:
+        if _class_name(type(engine)) != state["meta"]["engine"]:
+            raise CheckpointError(f"构建的引擎类型与检查点中的 {state['meta']['engine']} 不符")
+        _restore_engine(engine, state["engine"])
+    except CheckpointError:
+        engine.dispose()
+        raise
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        engine.dispose()
+        raise CheckpointError(f"检查点数据损坏: {e!r}") from e
+    return engine
+
+
+def _payload(data: bytes) -> Dict[str, Any]:
+    if len(data) < _HEADER.size:
+        raise CheckpointError("检查点数据不完整")
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise CheckpointError("不是检查点文件")
+    if version != CHECKPOINT_VERSION:
+        raise CheckpointError(f"不支持的检查点格式版本: {version}（当前 {CHECKPOINT_VERSION}）")
+    try:
+        return json.loads(zlib.decompress(data[_HEADER.size:]))
+    except (zlib.error, ValueError) as e:
+        raise CheckpointError(f"检查点数据损坏: {e}") from e
+
+
+def save_checkpoint(engine: SimEngine, path) -> None:
+    """写入检查点文件（先写临时文件再替换，中断时不会留下半个文件）"""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(dumps(engine))
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path, build: Callable[[], SimEngine]) -> SimEngine:
+    """读取检查点文件并恢复引擎（build 见 loads）"""
+    return loads(Path(path).read_bytes(), build)
+
+
+def run_with_checkpoints(engine: SimEngine, end_tick: int, path, interval: int, fast_forward=None) -> SimEngine:
+    """
+    推进到 end_tick，每 interval 个tick写一次检查点（不发布战斗开始/结束事件，同 run_until）
+    中断后用 load_checkpoint(path, build) 恢复，再次调用本函数即可从上次写入处继续
+    """
+    if interval <= 0:
+        raise ValueError("interval 必须为正数")
+    while engine.tick < end_tick:
+        engine.run_until(min(end_tick, engine.tick + interval), fast_forward=fast_forward)
+        save_checkpoint(engine, path)
+    return engine
@@ -1,24 +1,53 @@
+import copy
 import logging
+import math
 import sys
 from simulation.party_manager import PartyManager
-from typing import List
+from typing import List, Optional
 from core.statistics import CombatStatistics
+from core.calculator import DamageKernel
 from core.config_manager import ConfigManager
+from core.enums import CritMode
 from simulation.event_system import EventBus, Event, EventType
+from simulation.fork import deepcopy_with_callables, register_deepcopy, shared_constants
+from simulation.rng import RandomStreams
+
+register_deepcopy(CombatStatistics)
 
 # 避免重复配置
 _LOGGING_CONFIGURED = False
 
+_LOG_LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR
+}
+
 class SimEngine:
-    def __init__(self):
+    # 复制时只复制容器本身的属性，子类按需扩展
+    _fork_shallow = ()
+    __deepcopy__ = deepcopy_with_callables
+
+    def __init__(self, seed=None, crit_mode=None):
         self.tick = 0        # 1 tick = 0.1s
         self.entities = []
+
+        # 随机数：运行级种子 + 命名子流（未指定种子时随机生成，可从 self.seed 读回以复现）
+        self.rng = RandomStreams(seed)
+        self.seed = self.rng.seed
         
         # 集成新系统
         self.config = ConfigManager.get_instance()
+        # 暴击模式：随机判定 / 期望值（未指定时读取配置）
+        self.crit_mode = CritMode(crit_mode or self.config.crit_mode)
         self.statistics = CombatStatistics()
-        self.event_bus = EventBus()
+        self.event_bus = EventBus(history_size=self.config.event_history_size)
         self.party_manager = PartyManager()
+        # 伤害计算内核（缓存面板/防御快照下的乘区）
+        self.damage_kernel = DamageKernel()
+        # 命中轨迹记录器（simulation.replay.HitTrace），为 None 时不记录
+        self.hit_trace = None
         
         # 配置日志
         self._setup_logging()
@@ -35,22 +64,28 @@ class SimEngine:
             self.logger.addHandler(handler)
             _LOGGING_CONFIGURED = True
         
-        level_map = {
-            "DEBUG": logging.DEBUG,
-            "INFO": logging.INFO,
-            "WARNING": logging.WARNING,
-            "ERROR": logging.ERROR
-        }
-        log_level = level_map.get(self.config.log_level.upper(), logging.INFO)
+        log_level = _LOG_LEVELS.get(self.config.log_level.upper(), logging.INFO)
         self.logger.setLevel(log_level)
 
-    def log(self, message: str, level: str = "INFO"):
+    def wants_log(self, level: str = "INFO", kind: Optional[str] = None) -> bool:
+        """
+        该条日志是否会被记录；热路径上的调用方据此跳过日志文本的拼接
+        Args:
+            level: 日志级别
+            kind: 日志类别（"action" 行动开始、"damage" 直接伤害），供子类按类别筛选
+        """
+        return self.logger.isEnabledFor(_LOG_LEVELS.get(level, logging.INFO))
+
+    def log(self, message: str, level: str = "INFO", kind: Optional[str] = None):
         """
         统一日志接口
         Args:
             message: 日志内容
             level: 日志级别 (DEBUG, INFO, WARNING, ERROR)
+            kind: 日志类别（见 wants_log）
         """
+        if not self.logger.isEnabledFor(_LOG_LEVELS.get(level, logging.INFO)):
+            return
         seconds = self.tick / 10.0
         timestamp = f"[{int(seconds // 60):02}:{seconds % 60:04.1f}]"
         formatted_msg = f"{timestamp} {message}"
@@ -64,35 +99,133 @@ class SimEngine:
         else:
             self.logger.info(formatted_msg)
 
-    def run(self, max_seconds=30):
+    def run(self, max_seconds=30, fast_forward=None):
+        """
+        运行模拟
+        Args:
+            max_seconds: 模拟时长（秒）
+            fast_forward: 是否启用离散事件快进（跳过无事发生的tick），默认读取配置
+        """
+        if fast_forward is None:
+            fast_forward = self.config.enable_fast_forward
         max_ticks = int(max_seconds * 10)
+        end_tick = self.tick + max_ticks
         self.log(f"=== 模拟开始 (时长: {max_seconds}s) ===")
 
         # 发布战斗开始事件
         self.event_bus.emit_simple(EventType.COMBAT_START, tick=self.tick)
 
-        for _ in range(max_ticks):
-            self.tick += 1
-            self.statistics.update_combat_duration(self.tick)
+        self.run_until(end_tick, fast_forward=fast_forward)
 
-            # 发布Tick开始事件
-            self.event_bus.emit_simple(EventType.TICK_START, tick=self.tick)
+        # 发布战斗结束事件
+        self.event_bus.emit_simple(EventType.COMBAT_END, tick=self.tick)
+        self.log("=== 模拟结束 ===")
 
-            # 更新队伍资源
-            self.party_manager.update(0.1)
+    def run_until(self, end_tick, stop=None, fast_forward=None):
+        """
+        推进到 end_tick（不发布战斗开始/结束事件），供分段运行与搜索使用
+        Args:
+            stop: 每个tick处理完后调用，返回 True 时提前暂停
+        Returns:
+            是否因 stop 提前暂停
+        """
+        if fast_forward is None:
+            fast_forward = self.config.enable_fast_forward
+        while self.tick < end_tick:
+            self.step()
+            if stop is not None and stop():
+                return True
+            if fast_forward:
+                self.fast_forward(end_tick - self.tick)
+        return False
 
-            # 处理所有实体
-            for entity in self.entities:
-                try:
-                    entity.on_tick(self)
-                except Exception as e:
-                    self.log(f"错误: {entity.name} 处理tick时出错: {e}", level="ERROR")
-                    import traceback
-                    traceback.print_exc()
+    def fork(self):
+        """
+        复制当前战斗状态，返回可独立推进的引擎
+        配置、日志器与角色模块的常量表共享；伤害内核按对象身份缓存，副本使用新的内核；不复制命中轨迹
+        各类状态对象通过 _fork_shared/_fork_shallow 共享不会原地修改的部分（见 simulation.fork）
+        """
+        memo = shared_constants(self.entities)
+        memo.update({
+            id(self.config): self.config,
+            id(self.logger): self.logger,
+            id(self.damage_kernel): DamageKernel(self.damage_kernel.max_entries),
+            id(self.hit_trace): None,
+        })
+        return copy.deepcopy(self, memo)
 
-            # 发布Tick结束事件
-            self.event_bus.emit_simple(EventType.TICK_END, tick=self.tick)
+    def step(self):
+        """推进一个tick"""
+        self.tick += 1
+        self.statistics.update_combat_duration(self.tick)
 
-        # 发布战斗结束事件
-        self.event_bus.emit_simple(EventType.COMBAT_END, tick=self.tick)
-        self.log("=== 模拟结束 ===")
\ No newline at end of file
+        # 发布Tick开始事件
+        self.event_bus.emit_simple(EventType.TICK_START, tick=self.tick)
+
+        # 更新队伍资源
+        self.party_manager.update(0.1)
+
+        # 处理所有实体
+        for entity in self.entities:
+            try:
+                entity.on_tick(self)
+            except Exception as e:
+                self.log(f"错误: {entity.name} 处理tick时出错: {e}", level="ERROR")
+                import traceback
+                traceback.print_exc()
+
+        # 发布Tick结束事件
+        self.event_bus.emit_simple(EventType.TICK_END, tick=self.tick)
+
+    def ticks_until_next_event(self):
+        """
+        距离下一个"有事发生"的tick还有多少tick
+        实体需实现 ticks_until_next_event / fast_forward，否则视为每tick都需处理
+        """
+        # 有人监听逐tick事件时不能跳过
+        if (self.event_bus.get_listener_count(EventType.TICK_START)
+                or self.event_bus.get_listener_count(EventType.TICK_END)
+                or self.event_bus.has_global_listeners()):
+            return 1
+
+        horizon = math.inf
+        for entity in self.entities:
+            if not hasattr(entity, 'ticks_until_next_event') or not hasattr(entity, 'fast_forward'):
+                return 1
+            horizon = min(horizon, entity.ticks_until_next_event())
+            if horizon <= 1:
+                return 1
+        return horizon
+
+    def fast_forward(self, max_ticks):
+        """
+        批量跳过空闲tick，结果与逐tick运行一致
+        Args:
+            max_ticks: 最多跳过的tick数
+        Returns:
+            实际跳过的tick数
+        """
+        horizon = self.ticks_until_next_event()
+        skip = int(min(horizon - 1, max_ticks))
+        if skip <= 0:
+            return 0
+
+        self.tick += skip
+        self.statistics.update_combat_duration(self.tick)
+        self.party_manager.fast_forward(skip, 0.1)
+        for entity in self.entities:
+            entity.fast_forward(self, skip)
+        return skip
+
+    def dispose(self):
+        """
+        释放引擎：依次释放实体、移除全部监听器，断开引擎与实体间的引用
+        统计数据与日志保留，应在读取完实体上的结果后调用
+        """
+        for entity in self.entities:
+            dispose = getattr(entity, 'dispose', None)
+            if dispose is not None:
+                dispose()
+        self.entities.clear()
+        self.event_bus.reset()
+        self.damage_kernel.clear()
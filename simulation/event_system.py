@@ -3,10 +3,12 @@
 提供灵活的事件订阅和发布机制，支持复杂游戏机制的实现
 """
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional
-from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import defaultdict, deque
 from enum import Enum
 
+from simulation.fork import deepcopy_with_callables
+
 
 class EventType(Enum):
     """事件类型枚举"""
@@ -78,22 +80,54 @@ class Event:
         self.modified = True
 
 
+def _filter_key(obj: Any) -> Any:
+    """过滤键统一使用名字：实体实例取 name，字符串原样返回"""
+    if obj is None:
+        return None
+    return getattr(obj, 'name', obj)
+
+
+def _event_source_key(event: Event) -> Any:
+    """事件来源：优先 event.source，否则取数据中的 attacker"""
+    if event.source is not None:
+        return _filter_key(event.source)
+    return event.data.get('attacker')
+
+
+def _event_target_key(event: Event) -> Any:
+    """事件目标：优先 event.target，否则取数据中的 target"""
+    if event.target is not None:
+        return _filter_key(event.target)
+    return _filter_key(event.data.get('target'))
+
+
 class EventListener:
     """事件监听器"""
 
     def __init__(self, callback: Callable[[Event], None],
-                 priority: int = 0, once: bool = False):
+                 priority: int = 0, once: bool = False,
+                 source: Any = None, target: Any = None):
         """
         Args:
             callback: 回调函数
             priority: 优先级（数值越大越先执行）
             once: 是否只触发一次
+            source: 只接收该来源的事件（角色实例或名字）
+            target: 只接收该目标的事件（实体实例或名字）
         """
         self.callback = callback
         self.priority = priority
         self.once = once
+        self.source = _filter_key(source)
+        self.target = _filter_key(target)
+        self.event_type: Optional[EventType] = None  # 由 EventBus 订阅时填写，None 表示全局监听器
         self.executed_count = 0
 
+    def matches(self, source_key: Any, target_key: Any) -> bool:
+        """判断事件的来源/目标是否满足过滤条件"""
+        return ((self.source is None or self.source == source_key) and
+                (self.target is None or self.target == target_key))
+
     def execute(self, event: Event):
         """执行回调"""
         self.callback(event)
@@ -103,20 +137,70 @@ class EventListener:
         """判断是否应该移除"""
         return self.once and self.executed_count > 0
 
+    # 回调常为捕获角色的 lambda，复制引擎时需重新绑定
+    __deepcopy__ = deepcopy_with_callables
+
 
 class EventBus:
-    """事件总线"""
+    """
+    事件总线
+
+    每种事件维护一份按优先级排好序的不可变派发元组，仅在订阅/退订时重建，
+    发布时直接遍历；没有监听者的事件直接跳过。
+    带 source/target 过滤的监听器按 (来源, 目标) 建立路由缓存，
+    发布时只调用匹配的监听器
+    """
+
+    # 复制时事件历史只复制队列，副本中的历史事件仍引用原引擎的实体
+    _fork_shallow = ('_event_history',)
+    __deepcopy__ = deepcopy_with_callables
 
-    def __init__(self):
+    def __init__(self, history_size: int = 100):
+        """
+        Args:
+            history_size: 保留的事件历史条数，0 表示关闭历史记录
+        """
         self._listeners: Dict[EventType, List[EventListener]] = defaultdict(list)
         self._global_listeners: List[EventListener] = []
-        self._event_history: List[Event] = []
-        self._max_history = 100  # 保留最近的事件历史
+        # 派发表（只读快照，发布过程中订阅变化不影响本次派发）
+        self._dispatch: Dict[EventType, Tuple[EventListener, ...]] = {}
+        self._global_dispatch: Tuple[EventListener, ...] = ()
+        # 含过滤监听器的事件类型 -> {(来源, 目标): 派发元组}
+        self._routes: Dict[EventType, Dict[Tuple[Any, Any], Tuple[EventListener, ...]]] = {}
+        self._event_history: Optional[deque] = None
+        self.set_history_size(history_size)
         self._enabled = True
 
+    def _rebuild(self, event_type: EventType):
+        """重建某类事件的派发元组"""
+        listeners = self._listeners.get(event_type)
+        if listeners:
+            self._dispatch[event_type] = tuple(listeners)
+        else:
+            self._listeners.pop(event_type, None)
+            self._dispatch.pop(event_type, None)
+
+        if listeners and any(l.source is not None or l.target is not None for l in listeners):
+            self._routes[event_type] = {}
+        else:
+            self._routes.pop(event_type, None)
+
+    def _route(self, event: Event, routes: Dict) -> Tuple[EventListener, ...]:
+        """按事件来源/目标取出匹配的监听器（结果按键缓存）"""
+        key = (_event_source_key(event), _event_target_key(event))
+        listeners = routes.get(key)
+        if listeners is None:
+            listeners = tuple(l for l in self._dispatch[event.event_type] if l.matches(*key))
+            routes[key] = listeners
+        return listeners
+
+    def _rebuild_global(self):
+        self._global_dispatch = tuple(self._global_listeners)
+
     def subscribe(self, event_type: EventType,
                  callback: Callable[[Event], None],
-                 priority: int = 0, once: bool = False) -> EventListener:
+                 priority: int = 0, once: bool = False,
+                 source: Any = None, target: Any = None) -> EventListener:
         """
         订阅事件
 
@@ -125,13 +209,17 @@ class EventBus:
             callback: 回调函数
             priority: 优先级（0-100，数值越大越先执行）
             once: 是否只触发一次
+            source: 只接收该来源的事件（按名字匹配 event.source 或数据中的 attacker）
+            target: 只接收该目标的事件（按名字匹配 event.target 或数据中的 target）
 
         Returns:
             EventListener: 监听器对象（可用于取消订阅）
         """
-        listener = EventListener(callback, priority, once)
+        listener = EventListener(callback, priority, once, source, target)
+        listener.event_type = event_type
         self._listeners[event_type].append(listener)
         self._listeners[event_type].sort(key=lambda x: x.priority, reverse=True)
+        self._rebuild(event_type)
         return listener
 
     def subscribe_all(self, callback: Callable[[Event], None],
@@ -149,6 +237,7 @@ class EventBus:
         listener = EventListener(callback, priority)
         self._global_listeners.append(listener)
         self._global_listeners.sort(key=lambda x: x.priority, reverse=True)
+        self._rebuild_global()
         return listener
 
     def unsubscribe(self, event_type: EventType, listener: EventListener):
@@ -156,6 +245,46 @@ class EventBus:
         if event_type in self._listeners:
             if listener in self._listeners[event_type]:
                 self._listeners[event_type].remove(listener)
+                self._rebuild(event_type)
+
+    def unsubscribe_all(self, listener: EventListener):
+        """取消全局订阅"""
+        if listener in self._global_listeners:
+            self._global_listeners.remove(listener)
+            self._rebuild_global()
+
+    def remove(self, listener: EventListener):
+        """移除监听器（按订阅时记录的事件类型，全局监听器同样适用）"""
+        if listener.event_type is None:
+            self.unsubscribe_all(listener)
+        else:
+            self.unsubscribe(listener.event_type, listener)
+
+    def create_scope(self) -> 'SubscriptionScope':
+        """创建订阅作用域，作用域关闭时统一退订其中的监听器"""
+        return SubscriptionScope(self)
+
+    def has_listeners(self, event_type: EventType) -> bool:
+        """
+        快速检查某类事件是否有人监听（含全局监听器）
+        调用方可据此跳过事件对象与数据字典的构建
+        """
+        return self._enabled and (event_type in self._dispatch or bool(self._global_dispatch))
+
+    def has_global_listeners(self) -> bool:
+        """是否有监听全部事件的监听器"""
+        return bool(self._global_dispatch)
+
+    def emit_deferred(self, event_type: EventType, builder: Callable[..., Event], *args, **kwargs):
+        """
+        延迟构建并发布事件：仅在有人监听时才调用 builder(*args, **kwargs) 创建事件
+
+        Usage:
+            bus.emit_deferred(EventType.ACTION_END, EventBuilder.action_event,
+                              EventType.ACTION_END, character=self, action_name=name, duration=d)
+        """
+        if self.has_listeners(event_type):
+            self.emit(builder(*args, **kwargs))
 
     def emit(self, event: Event):
         """
@@ -167,42 +296,50 @@ class EventBus:
         if not self._enabled:
             return
 
+        listeners = self._dispatch.get(event.event_type, ())
+        global_listeners = self._global_dispatch
+        if not listeners and not global_listeners:
+            return
+
+        routes = self._routes.get(event.event_type)
+        if routes is not None:
+            listeners = self._route(event, routes)
+
         # 记录事件历史
-        self._event_history.append(event)
-        if len(self._event_history) > self._max_history:
-            self._event_history.pop(0)
+        if self._event_history is not None:
+            self._event_history.append(event)
 
         # 执行全局监听器
-        for listener in list(self._global_listeners):
+        for listener in global_listeners:
             if event.cancelled:
                 break
             listener.execute(event)
 
         # 执行特定类型监听器
-        if event.event_type in self._listeners:
-            listeners_to_remove = []
-
-            for listener in list(self._listeners[event.event_type]):
-                if event.cancelled:
-                    break
-
-                listener.execute(event)
-
-                if listener.should_remove():
-                    listeners_to_remove.append(listener)
+        has_expired = False
+        for listener in listeners:
+            if event.cancelled:
+                break
+            listener.execute(event)
+            if listener.once:
+                has_expired = True
 
-            # 移除一次性监听器
-            for listener in listeners_to_remove:
-                self._listeners[event.event_type].remove(listener)
+        # 移除一次性监听器
+        if has_expired:
+            remaining = [l for l in self._listeners[event.event_type] if not l.should_remove()]
+            self._listeners[event.event_type] = remaining
+            self._rebuild(event.event_type)
 
     def emit_simple(self, event_type: EventType, **kwargs):
         """
-        快捷方式：发布简单事件
+        快捷方式：发布简单事件（无人监听时不创建事件对象）
 
         Args:
             event_type: 事件类型
             **kwargs: 事件数据
         """
+        if not self._enabled or (event_type not in self._dispatch and not self._global_dispatch):
+            return
         event = Event(event_type=event_type, data=kwargs)
         self.emit(event)
 
@@ -216,8 +353,12 @@ class EventBus:
         if event_type is None:
             self._listeners.clear()
             self._global_listeners.clear()
+            self._dispatch.clear()
+            self._routes.clear()
+            self._rebuild_global()
         elif event_type in self._listeners:
             self._listeners[event_type].clear()
+            self._rebuild(event_type)
 
     def get_listener_count(self, event_type: Optional[EventType] = None) -> int:
         """获取监听器数量"""
@@ -225,6 +366,13 @@ class EventBus:
             return sum(len(listeners) for listeners in self._listeners.values()) + len(self._global_listeners)
         return len(self._listeners.get(event_type, []))
 
+    def set_history_size(self, size: int):
+        """设置事件历史容量，0 表示关闭（只记录实际派发过的事件）"""
+        if size > 0:
+            self._event_history = deque(self._event_history or (), maxlen=size)
+        else:
+            self._event_history = None
+
     def get_event_history(self, event_type: Optional[EventType] = None,
                          limit: int = 10) -> List[Event]:
         """
@@ -237,8 +385,10 @@ class EventBus:
         Returns:
             事件列表（最新的在前）
         """
+        if self._event_history is None:
+            return []
         if event_type is None:
-            return self._event_history[-limit:][::-1]
+            return list(self._event_history)[-limit:][::-1]
 
         filtered = [e for e in self._event_history if e.event_type == event_type]
         return filtered[-limit:][::-1]
@@ -258,7 +408,53 @@ class EventBus:
     def reset(self):
         """重置事件总线"""
         self.clear_listeners()
-        self._event_history.clear()
+        if self._event_history is not None:
+            self._event_history.clear()
+
+
+class SubscriptionScope:
+    """
+    订阅作用域
+    由角色/效果处理器持有，记录通过它订阅的监听器，close() 时一并退订
+
+    Usage:
+        self.subscriptions = engine.event_bus.create_scope()
+        self.subscriptions.subscribe(EventType.POST_DAMAGE, self.on_post_damage)
+        ...
+        self.subscriptions.close()
+    """
+
+    def __init__(self, event_bus: EventBus):
+        self.event_bus = event_bus
+        self.listeners: List[EventListener] = []
+
+    def subscribe(self, event_type: EventType, callback: Callable[[Event], None],
+                  **kwargs) -> EventListener:
+        """订阅事件（参数同 EventBus.subscribe）"""
+        listener = self.event_bus.subscribe(event_type, callback, **kwargs)
+        self.listeners.append(listener)
+        return listener
+
+    def subscribe_all(self, callback: Callable[[Event], None], priority: int = 0) -> EventListener:
+        """订阅所有事件"""
+        listener = self.event_bus.subscribe_all(callback, priority)
+        self.listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener: EventListener):
+        """提前退订单个监听器"""
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+            self.event_bus.remove(listener)
+
+    def close(self):
+        """退订作用域内的全部监听器"""
+        for listener in self.listeners:
+            self.event_bus.remove(listener)
+        self.listeners.clear()
+
+    def __len__(self) -> int:
+        return len(self.listeners)
 
 
 # 便捷的装饰器
@@ -0,0 +1,114 @@
+"""
+引擎复制辅助
+copy.deepcopy 把函数视为不可变对象直接共享，而行动事件、事件监听器、QTE条件中的回调
+大多是捕获了角色实例的闭包/lambda，共享会让副本继续操作原角色。
+持有回调的类用 deepcopy_with_callables 作为 __deepcopy__，复制时重建闭包并把捕获的对象一并复制。
+
+复制只针对可变的战斗状态，其余结构共享：
+- 类属性 _fork_shared 列出的实例属性直接共享（如按版本缓存、不会原地修改的面板）
+- 类属性 _fork_shallow 列出的容器只复制容器本身，元素共享（如写入后不再修改的追加式记录）
+- core 层的类不依赖本模块，由 simulation 层用 register_deepcopy 挂上 __deepcopy__（如 CombatStatistics）
+- 角色模块中的常量表（倍率、帧数据等大写命名的 dict/list/tuple）由 shared_constants 登记为共享
+"""
+import copy
+import sys
+import types
+from functools import lru_cache
+
+
+def copy_callable(fn, memo):
+    """复制函数：闭包单元与默认参数按 memo 深拷贝，代码与模块全局变量共享"""
+    if not isinstance(fn, types.FunctionType):
+        return copy.deepcopy(fn, memo)
+    if not fn.__closure__ and not fn.__defaults__ and not fn.__kwdefaults__:
+        return fn
+    cached = memo.get(id(fn))
+    if cached is not None:
+        return cached
+
+    closure = None
+    if fn.__closure__:
+        closure = tuple(_copy_cell(cell, memo) for cell in fn.__closure__)
+    clone = types.FunctionType(fn.__code__, fn.__globals__, fn.__name__, None, closure)
+    memo[id(fn)] = clone
+    memo.setdefault(id(memo), []).append(fn)  # 与 copy.deepcopy 相同：保持原对象存活，id 不被复用
+    clone.__defaults__ = _copy_value(fn.__defaults__, memo)
+    clone.__kwdefaults__ = _copy_value(fn.__kwdefaults__, memo)
+    clone.__qualname__ = fn.__qualname__
+    clone.__dict__.update(fn.__dict__)
+    return clone
+
+
+def register_deepcopy(*classes):
+    """为不能导入本模块的类（core 层）设置 __deepcopy__，类上的 _fork_shared/_fork_shallow 照常生效"""
+    for cls in classes:
+        cls.__deepcopy__ = deepcopy_with_callables
+
+
+def _copy_cell(cell, memo):
+    cached = memo.get(id(cell))
+    if cached is not None:
+        return cached
+    clone = types.CellType()
+    # 先登记再复制内容，闭包之间相互引用时不会无限递归
+    memo[id(cell)] = clone
+    memo.setdefault(id(memo), []).append(cell)
+    try:
+        contents = cell.cell_contents
+    except ValueError:  # 尚未赋值的单元
+        return clone
+    clone.cell_contents = _copy_value(contents, memo)
+    return clone
+
+
+def _copy_value(value, memo):
+    if isinstance(value, types.FunctionType):
+        return copy_callable(value, memo)
+    if isinstance(value, tuple) and any(isinstance(v, types.FunctionType) for v in value):
+        return tuple(_copy_value(v, memo) for v in value)
+    return copy.deepcopy(value, memo)
+
+
+def deepcopy_with_callables(obj, memo):
+    """通用 __deepcopy__：逐个复制实例属性，闭包回调重新绑定到副本，按 _fork_shared/_fork_shallow 共享结构"""
+    clone = obj.__class__.__new__(obj.__class__)
+    memo[id(obj)] = clone
+    shared = getattr(obj, '_fork_shared', ())
+    shallow = getattr(obj, '_fork_shallow', ())
+    for key, value in obj.__dict__.items():
+        if key in shared:
+            clone.__dict__[key] = value
+        elif key in shallow:
+            clone.__dict__[key] = copy.copy(value)
+        else:
+            clone.__dict__[key] = _copy_value(value, memo)
+    return clone
+
+
+def _collect(value, found):
+    if isinstance(value, (dict, list, tuple)) and id(value) not in found:
+        found[id(value)] = value
+        for item in (value.values() if isinstance(value, dict) else value):
+            _collect(item, found)
+
+
+@lru_cache(maxsize=None)
+def _module_constants(module_name: str) -> dict:
+    found = {}
+    module = sys.modules.get(module_name)
+    for name, value in vars(module).items() if module is not None else ():
+        if name.isupper():
+            _collect(value, found)
+    return found
+
+
+def shared_constants(entities) -> dict:
+    """
+    实体所在模块的常量表，作为 deepcopy 的 memo 预置项（id -> 原对象），复制时直接共享
+    常量表在导入后视为只读
+    """
+    memo = {}
+    for cls in {type(entity) for entity in entities}:
+        for klass in cls.__mro__:
+            memo.update(_module_constants(klass.__module__))
+    return memo
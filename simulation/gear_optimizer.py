@@ -0,0 +1,429 @@
+"""
+配装优化
+从武器库与装备库枚举 武器 × 4个装备槽 × 套装效果 的组合，对固定循环求每个角色的前K名配装
+
+- 支配剪枝：同槽位中被至少K件装备支配（各属性不低于、同套装、均无特效）的装备直接剔除
+- 分组：特效（武器特效、装备特效、套装特效）会改变战斗流程，按特效组合分组，每组记录一次命中轨迹
+- 分支定界：组内只有数值差异，按轨迹重算（simulation.replay）评估；未定槽位取各属性上界，
+  上界不超过当前第K名的分支整枝剪掉；逐件叠加的中间面板按装备前缀缓存
+- 轨迹不能沿用的配装（反应/持续伤害依赖的属性变化、暴击触发效果等）退回完整模拟，并行运行
+
+上界假设装备属性均为正收益（伤害随各属性单调不减）
+"""
+import copy
+import heapq
+import itertools
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+from core.equipment_system import Equipment, EquipmentSlot
+from core.weapon_system import Weapon
+from simulation.batch import CharacterSpec, RunSpec, SimulationContext, load_context, run_batch
+from simulation.engine import SimEngine
+from simulation.loadout import apply_custom_attrs, apply_stat_bonuses, apply_weapon
+from simulation.replay import HitTrace, effect_signature, record_trace
+
+SLOT_ORDER = [slot.value for slot in EquipmentSlot]
+ACCESSORY_SLOTS = (EquipmentSlot.ACCESSORY_1.value, EquipmentSlot.ACCESSORY_2.value)
+
+# 骨架中"无特效装备"的占位
+_PLAIN = "plain"
+
+
+@dataclass
+class GearBuild:
+    """一套配装及其伤害"""
+    weapon_id: Optional[str]
+    equipment_ids: Dict[str, str]
+    total_damage: float
+    dps: float
+    repriced: bool  # True: 轨迹重算；False: 完整模拟
+
+
+@dataclass
+class OptimizeStats:
+    """搜索统计"""
+    pruned_items: int = 0      # 被支配剔除的武器/装备数
+    pruned_branches: int = 0   # 分支定界剪掉的分支数
+    repriced: int = 0          # 轨迹重算的配装数
+    simulated: int = 0         # 完整模拟的配装数
+    traces: int = 0            # 记录的轨迹数
+
+
+@dataclass
+class OptimizeResult:
+    """单个角色的优化结果"""
+    character: str
+    builds: List[GearBuild] = field(default_factory=list)  # 按伤害从高到低
+    stats: OptimizeStats = field(default_factory=OptimizeStats)
+
+
+def _bonuses(item) -> Dict[str, float]:
+    if isinstance(item, Weapon):
+        return dict(item.stat_bonuses, weapon_atk=item.weapon_atk)
+    return item.stat_bonuses
+
+
+def _dominates(a: Dict[str, float], b: Dict[str, float], tie_wins: bool) -> bool:
+    strict = False
+    for key in set(a) | set(b):
+        x, y = a.get(key, 0.0), b.get(key, 0.0)
+        if x < y:
+            return False
+        if x > y:
+            strict = True
+    return strict or tie_wins
+
+
+def prune_dominated(items: list, keep: int, group=lambda item: None) -> list:
+    """
+    剔除被至少 keep 个同组候选支配的候选
+    支配：各属性不低于，且至少一项更高（属性完全相同时排在前面的支配后面的）
+    group 返回 None 的候选不参与比较（如带特效的装备）
+    """
+    survivors = []
+    for i, item in enumerate(items):
+        key = group(item)
+        count = 0
+        if key is not None:
+            for j, other in enumerate(items):
+                if j != i and group(other) == key and _dominates(_bonuses(other), _bonuses(item), j < i):
+                    count += 1
+                    if count >= keep:
+                        break
+        if count < keep:
+            survivors.append(item)
+    return survivors
+
+
+class _PanelBuilder:
+    """按配装前缀逐件叠加属性，缓存中间状态（部分面板）"""
+
+    def __init__(self, char_spec: CharacterSpec, context: SimulationContext, max_states: int = 100000):
+        char_class = context.char_map.get(char_spec.name)
+        if char_class is None:
+            raise ValueError(f"未知角色: {char_spec.name}")
+        self.engine = SimEngine()
+        self.actor = char_class(self.engine, None)
+        self.engine.entities.append(self.actor)
+        apply_custom_attrs(self.actor, char_spec.custom_attrs)
+        self.max_states = max_states
+        self._states = {(): (copy.copy(self.actor.base_stats), copy.copy(self.actor.attrs))}
+
+    def _load(self, state):
+        self.actor.base_stats = copy.copy(state[0])
+        self.actor.attrs = copy.copy(state[1])
+
+    def state(self, prefix: Tuple[str, ...], parent, item):
+        """prefix 为包含 item 的前缀键；parent 为不含 item 的状态"""
+        cached = self._states.get(prefix)
+        if cached is not None:
+            return cached
+        self._load(parent)
+        if isinstance(item, Weapon):
+            apply_weapon(self.actor, item, self.engine, with_effects=False)
+        elif item is not None:
+            apply_stat_bonuses(self.actor, item.stat_bonuses)
+        state = (self.actor.base_stats, self.actor.attrs)
+        if len(self._states) >= self.max_states:
+            self._states.clear()
+        self._states[prefix] = state
+        return state
+
+    def panel(self, state, extra_bonuses=()) -> dict:
+        self._load(state)
+        for bonuses in extra_bonuses:
+            apply_stat_bonuses(self.actor, bonuses)
+        return self.actor.build_base_panel()
+
+    def dispose(self):
+        self._states.clear()
+        self.engine.dispose()
+
+
+def _positive_sum(dicts) -> Dict[str, float]:
+    total: Dict[str, float] = {}
+    for d in dicts:
+        for key, value in d.items():
+            if value > 0:
+                total[key] = total.get(key, 0.0) + value
+    return total
+
+
+def _slot_upper(items) -> Dict[str, float]:
+    """槽位上界：各属性取候选中的最大正值"""
+    upper: Dict[str, float] = {}
+    for item in items:
+        for key, value in item.stat_bonuses.items():
+            if value > upper.get(key, 0.0):
+                upper[key] = value
+    return upper
+
+
+class GearOptimizer:
+    """单个角色的配装搜索"""
+
+    def __init__(self, spec: RunSpec, character: str, top_k: int = 5,
+                 weapon_ids: Optional[List[str]] = None, equipment_ids: Optional[List[str]] = None,
+                 context: Optional[SimulationContext] = None, max_workers: Optional[int] = None,
+                 max_simulations: int = 500):
+        """
+        Args:
+            spec: 固定的队伍、循环与敌人配置，其余角色的配装保持不变
+            character: 要优化的角色名
+            weapon_ids / equipment_ids: 候选范围，默认为整个武器库/装备库
+            max_simulations: 需要完整模拟的配装数上限，超出时报错（请缩小候选范围）
+        """
+        self.context = context or load_context()
+        self.spec = spec
+        self.top_k = top_k
+        self.max_workers = max_workers
+        self.max_simulations = max_simulations
+        self.stats = OptimizeStats()
+
+        matches = [i for i, c in enumerate(spec.characters) if c.name == character]
+        if not matches:
+            raise ValueError(f"配置中没有角色: {character}")
+        self.char_index = matches[0]
+        self.char_spec = spec.characters[self.char_index]
+        self.character = character
+
+        set_manager = self.context.set_manager
+        self._effect_sets = {
+            s.id for s in set_manager.get_all() if any(bonus.effects for bonus in s.bonuses)
+        }
+
+        weapons = ([self.context.weapon_manager.get(w) for w in weapon_ids]
+                   if weapon_ids is not None else self.context.weapon_manager.get_all())
+        weapons = [w for w in weapons if w is not None]
+        self.weapons = prune_dominated(weapons, top_k, lambda w: None if w.effects else ())
+        if not self.weapons:
+            self.weapons = [None]
+
+        equipments = ([self.context.equipment_manager.get(e) for e in equipment_ids]
+                      if equipment_ids is not None else self.context.equipment_manager.get_all())
+        equipments = [e for e in equipments if e is not None]
+        self.slot_items: Dict[str, List[Equipment]] = {}
+        accessories = [e for e in equipments if e.slot in ACCESSORY_SLOTS]
+        # 两个配件槽共用候选，被支配者需多留一件
+        accessories = prune_dominated(accessories, top_k + 1, self._dominance_group)
+        for slot in SLOT_ORDER:
+            if slot in ACCESSORY_SLOTS:
+                self.slot_items[slot] = accessories
+            else:
+                self.slot_items[slot] = prune_dominated(
+                    [e for e in equipments if e.slot == slot], top_k, self._dominance_group)
+        kept = len(self.weapons) + len(accessories) + sum(
+            len(self.slot_items[s]) for s in SLOT_ORDER if s not in ACCESSORY_SLOTS)
+        self.stats.pruned_items = len(weapons) + len(equipments) - kept
+        self._accessory_index = {e.id: i for i, e in enumerate(accessories)}
+
+        # 套装属性上界：候选中出现的套装，所有档位的正向属性全部计入
+        set_ids = {e.set_id for e in equipments if e.set_id}
+        self._set_upper = _positive_sum(
+            bonus.stat_bonuses for set_id in set_ids if set_manager.get(set_id)
+            for bonus in set_manager.get(set_id).bonuses)
+
+        self._heap: List[Tuple[float, int, GearBuild]] = []
+        self._seen = set()
+        self._counter = itertools.count()
+        self._pending: List[Tuple[Optional[str], Dict[str, str]]] = []
+        self._traces: Dict[tuple, HitTrace] = {}
+
+    def _dominance_group(self, item: Equipment):
+        if item.effects:
+            return None
+        return (item.set_id,)
+
+    def _category(self, item: Equipment):
+        """特效类别：自身有特效的装备单独成类，特效套装的部件按套装归类，其余为无特效装备"""
+        if item.effects:
+            return ("item", item.id)
+        if item.set_id in self._effect_sets:
+            return ("set", item.set_id)
+        return _PLAIN
+
+    # --- 结果 ---
+
+    @property
+    def threshold(self) -> float:
+        if len(self._heap) < self.top_k:
+            return float("-inf")
+        return self._heap[0][0]
+
+    def _push(self, build: GearBuild):
+        key = (build.weapon_id, tuple(sorted(build.equipment_ids.values())))
+        if key in self._seen:
+            return
+        entry = (build.total_damage, next(self._counter), build)
+        if len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, entry)
+        elif build.total_damage > self._heap[0][0]:
+            _, _, dropped = heapq.heapreplace(self._heap, entry)
+            self._seen.discard((dropped.weapon_id, tuple(sorted(dropped.equipment_ids.values()))))
+        else:
+            return
+        self._seen.add(key)
+
+    def _variant(self, weapon_id, equipment_ids, run_id=None) -> RunSpec:
+        characters = list(self.spec.characters)
+        characters[self.char_index] = replace(self.char_spec, weapon_id=weapon_id,
+                                              equipment_ids=dict(equipment_ids))
+        return replace(self.spec, characters=characters, run_id=run_id)
+
+    # --- 搜索 ---
+
+    def _skeletons(self):
+        """每个槽位取 无特效装备 / 某件特效装备 / 某个特效套装的部件，无特效骨架优先"""
+        options = []
+        for slot in SLOT_ORDER:
+            categories = [_PLAIN]
+            for item in self.slot_items[slot]:
+                category = self._category(item)
+                if category not in categories:
+                    categories.append(category)
+            options.append(categories)
+        return itertools.product(*options)
+
+    def _representative(self, weapon, skeleton) -> Optional[Dict[str, str]]:
+        """骨架的代表配装（用于记录轨迹）：特效部分按骨架取第一件，无特效槽位留空"""
+        chosen = {}
+        last_accessory = -1
+        for slot, category in zip(SLOT_ORDER, skeleton):
+            if category == _PLAIN:
+                continue
+            for item in self.slot_items[slot]:
+                if self._category(item) != category:
+                    continue
+                if slot in ACCESSORY_SLOTS:
+                    if self._accessory_index[item.id] <= last_accessory:
+                        continue
+                    last_accessory = self._accessory_index[item.id]
+                chosen[slot] = item.id
+                break
+            else:
+                return None
+        return chosen
+
+    def _trace_for(self, weapon, skeleton):
+        equipment_ids = self._representative(weapon, skeleton)
+        if equipment_ids is None:
+            return None
+        weapon_id = weapon.id if weapon is not None else None
+        variant = self._variant(weapon_id, equipment_ids)
+        signature = effect_signature(variant.characters[self.char_index], self.context)
+        trace = self._traces.get(signature)
+        if trace is None:
+            trace, _ = record_trace(variant, self.context)
+            self._traces[signature] = trace
+            self.stats.traces += 1
+        return trace
+
+    def _leaf(self, weapon, trace, builder, state, chosen):
+        weapon_id = weapon.id if weapon is not None else None
+        equipment_ids = {slot: item.id for slot, item in chosen if item is not None}
+        equipments = [item for _, item in chosen if item is not None]
+        set_bonuses = [
+            bonus.stat_bonuses
+            for bonuses in self.context.set_manager.check_set_bonuses(equipments).values()
+            for bonus in bonuses
+        ]
+        result, _ = trace.reprice({self.character: builder.panel(state, set_bonuses)})
+        if result is None:
+            self._pending.append((weapon_id, equipment_ids))
+            if len(self._pending) > self.max_simulations:
+                raise ValueError(f"需要完整模拟的配装超过上限 {self.max_simulations}，请缩小候选范围")
+            return
+        self.stats.repriced += 1
+        self._push(GearBuild(weapon_id, equipment_ids, result.total_damage, result.dps, repriced=True))
+
+    def _bound(self, trace, builder, state, depth, uppers) -> float:
+        panel = builder.panel(state, (uppers[depth], self._set_upper))
+        result, _ = trace.reprice({self.character: panel})
+        return result.total_damage if result is not None else float("inf")
+
+    def _search_skeleton(self, weapon, skeleton, builder, weapon_state, weapon_key):
+        trace = self._trace_for(weapon, skeleton)
+        if trace is None:
+            return
+
+        candidates = []
+        for slot, category in zip(SLOT_ORDER, skeleton):
+            items = [item for item in self.slot_items[slot] if self._category(item) == category]
+            if category == _PLAIN and (not items or (slot == ACCESSORY_SLOTS[1] and len(self.slot_items[slot]) < 2)):
+                # 槽位没有可用装备时留空
+                items.append(None)
+            candidates.append(items)
+        # uppers[d]: 第 d 个槽位及之后的属性上界之和
+        uppers = [_positive_sum(_slot_upper(c for c in items if c is not None)
+                                for items in candidates[d:]) for d in range(len(SLOT_ORDER) + 1)]
+
+        last_depth = len(SLOT_ORDER) - 1
+
+        def dfs(depth, key, state, chosen, last_accessory):
+            slot = SLOT_ORDER[depth]
+            children = []
+            for item in candidates[depth]:
+                index = -1
+                if item is not None and slot in ACCESSORY_SLOTS:
+                    # 配件无序：第二个配件须排在第一个之后
+                    index = self._accessory_index[item.id]
+                    if index <= last_accessory:
+                        continue
+                child_key = key + (item.id if item is not None else "",)
+                child_state = builder.state(child_key, state, item)
+                if depth == last_depth:
+                    self._leaf(weapon, trace, builder, child_state, chosen + [(slot, item)])
+                    continue
+                bound = self._bound(trace, builder, child_state, depth + 1, uppers)
+                children.append((bound, child_key, child_state, item, max(index, last_accessory)))
+            children.sort(key=lambda c: c[0], reverse=True)
+            for i, (bound, child_key, child_state, item, accessory) in enumerate(children):
+                if bound <= self.threshold:
+                    self.stats.pruned_branches += len(children) - i
+                    break
+                dfs(depth + 1, child_key, child_state, chosen + [(slot, item)], accessory)
+
+        dfs(0, weapon_key, weapon_state, [], -1)
+
+    def run(self) -> OptimizeResult:
+        builder = _PanelBuilder(self.char_spec, self.context)
+        try:
+            root = builder.state((), None, None)
+            for weapon in self.weapons:
+                weapon_key = (weapon.id if weapon is not None else "",)
+                weapon_state = builder.state(weapon_key, root, weapon)
+                for skeleton in self._skeletons():
+                    self._search_skeleton(weapon, skeleton, builder, weapon_state, weapon_key)
+        finally:
+            builder.dispose()
+
+        if self._pending:
+            specs = [self._variant(w, e, run_id=str(i)) for i, (w, e) in enumerate(self._pending)]
+            for (weapon_id, equipment_ids), result in zip(self._pending, run_batch(specs, max_workers=self.max_workers)):
+                if result.error is not None:
+                    continue
+                self.stats.simulated += 1
+                self._push(GearBuild(weapon_id, equipment_ids, result.total_damage, result.dps, repriced=False))
+
+        builds = [entry[2] for entry in sorted(self._heap, key=lambda e: (-e[0], e[1]))]
+        return OptimizeResult(self.character, builds, self.stats)
+
+
+def optimize_gear(spec: RunSpec, characters: Optional[List[str]] = None, top_k: int = 5,
+                  context: Optional[SimulationContext] = None, **kwargs) -> Dict[str, OptimizeResult]:
+    """
+    逐个角色优化配装（其余角色保持原配装）
+
+    Args:
+        spec: 固定的队伍、循环与敌人配置
+        characters: 要优化的角色，默认为全部
+        top_k: 每个角色返回的配装数
+        kwargs: 传给 GearOptimizer（weapon_ids / equipment_ids / max_workers / max_simulations）
+
+    Returns:
+        {角色名: OptimizeResult}
+    """
+    context = context or load_context()
+    names = characters or [c.name for c in spec.characters]
+    return {name: GearOptimizer(spec, name, top_k=top_k, context=context, **kwargs).run() for name in names}
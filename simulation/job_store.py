@@ -0,0 +1,281 @@
+"""
+异步模拟任务
+一个任务包含一条或多条模拟请求，任务与各项的请求、状态、结果保存在 sqlite 中；
+服务重启后，运行中断的项重新排队，未完成的任务继续执行。
+结果以 zlib 压缩的 JSON 保存，另存一份摘要（总伤害、统计、种子）供分页快速浏览。
+"""
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+# 任务与项的状态
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# 摘要中保留的结果字段
+SUMMARY_FIELDS = ("total_dmg", "char_names", "statistics", "seed")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    request TEXT NOT NULL,
+    summary TEXT,
+    result BLOB,
+    error TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_items_status ON job_items (job_id, status);
+"""
+
+
+def summarize(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: result.get(k) for k in SUMMARY_FIELDS}
+
+
+class JobStore:
+    """sqlite 任务存储（线程安全）"""
+
+    def __init__(self, path: str = "jobs.db"):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA foreign_keys=ON")
+            self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, sql_params: List[Tuple[str, Tuple]]):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in sql_params:
+                    self._conn.execute(sql, params)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql: str, params: Tuple = ()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def create(self, requests: List[Dict[str, Any]]) -> str:
+        """新建任务，返回任务ID；requests 为可 JSON 序列化的请求"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "INSERT INTO jobs (id, status, created_at, updated_at, total) VALUES (?, ?, ?, ?, ?)",
+                    (job_id, PENDING, now, now, len(requests)),
+                )
+                self._conn.executemany(
+                    "INSERT INTO job_items (job_id, idx, status, request) VALUES (?, ?, ?, ?)",
+                    ((job_id, i, PENDING, json.dumps(r, ensure_ascii=False)) for i, r in enumerate(requests)),
+                )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务状态与进度，不存在时返回 None"""
+        rows = self._query("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        if not rows:
+            return None
+        job = dict(rows[0])
+        finished = job["done"] + job["failed"]
+        job["progress"] = finished / job["total"] if job["total"] else 1.0
+        return job
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近创建的任务"""
+        rows = self._query("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self.get(row["id"]) for row in rows]
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 50,
+                summary: bool = False) -> List[Dict[str, Any]]:
+        """按序号分页取各项结果；summary 为 True 时只返回摘要"""
+        column = "summary" if summary else "result"
+        rows = self._query(
+            f"SELECT idx, status, {column} AS data, error FROM job_items "
+            "WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?",
+            (job_id, offset, limit),
+        )
+        items = []
+        for row in rows:
+            data = row["data"]
+            if data is not None:
+                data = json.loads(data if summary else zlib.decompress(data))
+            items.append({"index": row["idx"], "status": row["status"], "result": data, "error": row["error"]})
+        return items
+
+    def claim(self, job_id: str) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """取出任务中下一项待运行的请求并标记为运行中；没有待运行项或任务已取消时返回 None"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT i.idx, i.request FROM job_items i JOIN jobs j ON j.id = i.job_id "
+                    "WHERE i.job_id = ? AND i.status = ? AND j.status IN (?, ?) ORDER BY i.idx LIMIT 1",
+                    (job_id, PENDING, PENDING, RUNNING),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute("UPDATE job_items SET status = ? WHERE job_id = ? AND idx = ?",
+                                       (RUNNING, job_id, row["idx"]))
+                    self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                                       (RUNNING, time.time(), job_id, PENDING))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return None if row is None else (row["idx"], json.loads(row["request"]))
+
+    def release(self, job_id: str, idx: int):
+        """运行中的项放回队列（进程池繁忙时稍后重试）"""
+        self._transaction([("UPDATE job_items SET status = ? WHERE job_id = ? AND idx = ? AND status = ?",
+                            (PENDING, job_id, idx, RUNNING))])
+
+    def finish(self, job_id: str, idx: int, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None):
+        """记录一项的结果或错误；全部项结束后任务标记为完成"""
+        if error is None:
+            data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+            item = (DONE, json.dumps(summarize(result), ensure_ascii=False), zlib.compress(data), None)
+            counter = "done"
+        else:
+            item = (FAILED, None, None, error)
+            counter = "failed"
+        self._transaction([
+            ("UPDATE job_items SET status = ?, summary = ?, result = ?, error = ? WHERE job_id = ? AND idx = ?",
+             item + (job_id, idx)),
+            (f"UPDATE jobs SET {counter} = {counter} + 1, updated_at = ? WHERE id = ?", (time.time(), job_id)),
+            ("UPDATE jobs SET status = ? WHERE id = ? AND status = ? AND done + failed >= total",
+             (DONE, job_id, RUNNING)),
+        ])
+
+    def cancel(self, job_id: str) -> bool:
+        """取消任务：未运行的项不再执行，已运行的项保留结果"""
+        if self.get(job_id) is None:
+            return False
+        self._transaction([
+            ("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status IN (?, ?)",
+             (CANCELLED, time.time(), job_id, PENDING, RUNNING)),
+            ("UPDATE job_items SET status = ? WHERE job_id = ? AND status = ?", (CANCELLED, job_id, PENDING)),
+        ])
+        return True
+
+    def delete(self, job_id: str) -> bool:
+        if self.get(job_id) is None:
+            return False
+        self._transaction([("DELETE FROM jobs WHERE id = ?", (job_id,))])
+        return True
+
+    def recover(self) -> List[str]:
+        """服务启动时调用：中断的项重新排队，返回未完成的任务（按创建顺序）"""
+        self._transaction([("UPDATE job_items SET status = ? WHERE status = ?", (PENDING, RUNNING))])
+        rows = self._query("SELECT id FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (PENDING, RUNNING))
+        return [row["id"] for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class JobRunner:
+    """
+    在事件循环中按提交顺序执行任务，每个任务最多 concurrency 项同时运行
+    run_item 抛出 retry_on 中的异常时该项放回队列，retry_delay 秒后重试；其他异常记为该项失败
+    """
+
+    def __init__(self, store: JobStore, run_item: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                 concurrency: int = 1, retry_on: Tuple[Type[BaseException], ...] = (),
+                 retry_delay: float = 1.0):
+        self.store = store
+        self.run_item = run_item
+        self.concurrency = max(1, concurrency)
+        self.retry_on = retry_on
+        self.retry_delay = retry_delay
+        self._queue: "asyncio.Queue[str]" = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """在运行中的事件循环里启动，并恢复未完成的任务"""
+        self._queue = asyncio.Queue()
+        for job_id in self.store.recover():
+            self._queue.put_nowait(job_id)
+        self._task = asyncio.ensure_future(self._loop())
+
+    async def submit(self, requests: List[Dict[str, Any]]) -> str:
+        """保存任务并排队执行，需先调用 start"""
+        if self._queue is None:
+            raise RuntimeError("JobRunner 尚未启动，请先调用 start()")
+        job_id = await asyncio.to_thread(self.store.create, requests)
+        self._queue.put_nowait(job_id)
+        return job_id
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await asyncio.gather(*(self._work(job_id) for _ in range(self.concurrency)))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("任务 %s 执行出错", job_id)
+
+    async def _work(self, job_id: str):
+        # 存储操作（含结果的序列化与压缩）在线程中执行，不阻塞事件循环
+        while True:
+            claimed = await asyncio.to_thread(self.store.claim, job_id)
+            if claimed is None:
+                return
+            idx, request = claimed
+            try:
+                result = await self.run_item(request)
+            except self.retry_on:
+                await asyncio.to_thread(self.store.release, job_id, idx)
+                await asyncio.sleep(self.retry_delay)
+                continue
+            except asyncio.CancelledError:
+                # 服务关闭：该项保持运行中，重启后由 recover 重新排队
+                raise
+            except Exception as e:
+                await asyncio.to_thread(self.store.finish, job_id, idx, error=str(e) or type(e).__name__)
+                continue
+            await asyncio.to_thread(self.store.finish, job_id, idx, result=result)
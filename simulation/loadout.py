@@ -0,0 +1,197 @@
+"""
+配装与战斗场景构建
+API、批量模拟等入口共用的角色发现、属性覆盖、武器/装备/套装应用逻辑
+"""
+import importlib
+import inspect
+import logging
+import os
+import pkgutil
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.enums import Element
+from core.equipment_effects import EquipmentEffectHandler
+from core.equipment_system import Equipment
+from core.weapon_effects import WeaponEffectHandler
+from entities.characters.base_actor import BaseActor
+from entities.dummy import DummyEnemy
+from simulation.engine import SimEngine
+
+logger = logging.getLogger(__name__)
+
+CHARACTERS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "entities", "characters")
+
+# 敌人受伤倍率字段 -> 元素
+ENEMY_ELEMENT_FIELDS = {
+    "physical": Element.PHYSICAL,
+    "heat": Element.HEAT,
+    "electric": Element.ELECTRIC,
+    "nature": Element.NATURE,
+    "frost": Element.FROST,
+}
+
+
+def discover_characters() -> Tuple[Dict[str, type], Dict[str, str]]:
+    """
+    扫描 entities.characters 下的所有 *_sim 模块
+    Returns:
+        (角色名 -> 角色类, 角色名 -> 默认脚本文本)
+    """
+    char_map = {}
+    default_scripts = {}
+    # 中文名只在实例上，用一个临时引擎实例化，结束后释放
+    temp_engine = SimEngine()
+
+    for _, name, _ in pkgutil.iter_modules([CHARACTERS_DIR]):
+        if not name.endswith("_sim") or name == "base_actor":
+            continue
+        try:
+            module = importlib.import_module(f"entities.characters.{name}")
+        except Exception as e:
+            logger.error(f"Error importing module {name}: {e}", exc_info=True)
+            continue
+
+        for _, obj in inspect.getmembers(module):
+            if not (inspect.isclass(obj) and issubclass(obj, BaseActor) and obj != BaseActor):
+                continue
+            try:
+                temp_instance = obj(temp_engine, None)
+                temp_engine.entities.append(temp_instance)
+                char_name = temp_instance.name
+                char_map[char_name] = obj
+
+                # 根据能力生成默认脚本
+                script_lines = []
+                if hasattr(obj, 'create_skill'):
+                    script_lines.append("skill")
+                    script_lines.append("wait 2.0")
+                if hasattr(obj, 'create_ult'):
+                    script_lines.append("ult")
+                if not script_lines:
+                    script_lines = ["a1", "wait 1.0", "a2"]
+
+                default_scripts[char_name] = "\n".join(script_lines)
+                logger.info(f"Loaded character: {char_name} from {name}")
+            except Exception as e:
+                logger.error(f"Failed to load character from {name}: {e}", exc_info=True)
+
+    temp_engine.dispose()
+    return char_map, default_scripts
+
+
+def parse_script_input(text: str) -> List[str]:
+    """多行脚本文本 -> 指令列表"""
+    return [line.strip() for line in text.split('\n') if line.strip()]
+
+
+def timeline_to_script(timeline: Iterable[Tuple[float, str]]) -> List[str]:
+    """时间轴 [(开始时间, 指令)] -> 基于 wait_until 的脚本"""
+    script = []
+    for start_time, cmd in sorted(timeline, key=lambda t: t[0]):
+        script.append(f"wait_until {start_time}")
+        script.append(cmd)
+    return script
+
+
+def create_enemy(engine, defense: float = 100, dmg_taken_mults: Optional[Dict[str, float]] = None,
+                 name: str = "测试机甲") -> DummyEnemy:
+    """
+    创建木桩敌人
+    Args:
+        dmg_taken_mults: 元素名(physical/heat/...) -> 受伤倍率，抗性 = 1 - 倍率
+    """
+    dmg_taken_mults = dmg_taken_mults or {}
+    resistances = {
+        element: 1.0 - dmg_taken_mults.get(field, 1.0)
+        for field, element in ENEMY_ELEMENT_FIELDS.items()
+    }
+    return DummyEnemy(engine, name, defense=defense, resistances=resistances)
+
+
+def apply_custom_attrs(obj, custom_attrs: Optional[Dict[str, Any]]):
+    """应用自定义属性覆盖（等级、四维、基础面板）"""
+    if not custom_attrs:
+        return
+
+    if custom_attrs.get('level'):
+        obj.base_stats.level = custom_attrs['level']
+
+    if custom_attrs.get('attrs'):
+        for attr_name, attr_value in custom_attrs['attrs'].items():
+            if hasattr(obj.attrs, attr_name):
+                setattr(obj.attrs, attr_name, attr_value)
+
+    if custom_attrs.get('base_stats'):
+        for stat_name, stat_value in custom_attrs['base_stats'].items():
+            if hasattr(obj.base_stats, stat_name):
+                setattr(obj.base_stats, stat_name, stat_value)
+
+
+def apply_stat_bonuses(obj, stat_bonuses: Dict[str, float]):
+    """叠加属性加成：四维取整累加，其余累加到基础面板"""
+    for stat_name, stat_value in stat_bonuses.items():
+        if hasattr(obj.attrs, stat_name):
+            current = getattr(obj.attrs, stat_name)
+            setattr(obj.attrs, stat_name, current + int(stat_value))
+        elif hasattr(obj.base_stats, stat_name):
+            current = getattr(obj.base_stats, stat_name)
+            setattr(obj.base_stats, stat_name, current + stat_value)
+
+
+def apply_weapon(obj, weapon, engine, with_effects: bool = True):
+    """装备武器：武器攻击力、属性加成、特殊效果"""
+    obj.base_stats.weapon_atk = weapon.weapon_atk
+    apply_stat_bonuses(obj, weapon.stat_bonuses)
+
+    if with_effects and weapon.effects:
+        weapon_handler = WeaponEffectHandler(obj, weapon, engine)
+        # 存储 handler 引用以便后续清理
+        if not hasattr(obj, 'weapon_handlers'):
+            obj.weapon_handlers = []
+        obj.weapon_handlers.append(weapon_handler)
+
+
+def apply_equipments(obj, equipments: List[Equipment], set_manager, engine, with_effects: bool = True):
+    """装备一组装备并激活满足条件的套装效果"""
+    if not hasattr(obj, 'equipment_handlers'):
+        obj.equipment_handlers = []
+
+    for equipment in equipments:
+        apply_stat_bonuses(obj, equipment.stat_bonuses)
+        if with_effects and equipment.effects:
+            obj.equipment_handlers.append(EquipmentEffectHandler(obj, equipment, engine))
+
+    if not equipments or set_manager is None:
+        return
+
+    active_set_bonuses = set_manager.check_set_bonuses(equipments)
+    for set_id, bonuses in active_set_bonuses.items():
+        equipment_set = set_manager.get(set_id)
+        for bonus in bonuses:
+            apply_stat_bonuses(obj, bonus.stat_bonuses)
+            engine.log(f"[{obj.name}] 套装效果激活: {equipment_set.name} - {bonus.description}")
+
+            if with_effects and bonus.effects:
+                for effect in bonus.effects:
+                    # 用临时装备对象承载套装效果
+                    temp_equipment = Equipment(
+                        id=f"set_{set_id}",
+                        name=f"{equipment_set.name}套装效果",
+                        description=bonus.description,
+                        slot="set",
+                        stat_bonuses={},
+                        effects=[effect]
+                    )
+                    obj.equipment_handlers.append(EquipmentEffectHandler(obj, temp_equipment, engine))
+
+
+def resolve_equipments(equipment_ids: Optional[Dict[str, str]], equipment_manager) -> List[Equipment]:
+    """槽位 -> 装备ID 映射解析为装备对象列表（忽略空槽和不存在的ID）"""
+    equipments = []
+    for _, equipment_id in (equipment_ids or {}).items():
+        if not equipment_id:
+            continue
+        equipment = equipment_manager.get(equipment_id)
+        if equipment:
+            equipments.append(equipment)
+    return equipments
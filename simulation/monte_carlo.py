@@ -0,0 +1,110 @@
+"""
+暴击蒙特卡洛
+在期望暴击模式下跑一次确定性模拟并记录每次命中的暴击/非暴击伤害，
+再用 NumPy 对命中序列批量采样暴击结果，得到总伤害分布，
+避免为统计暴击波动而重复运行完整模拟
+"""
+from dataclasses import dataclass, replace
+from typing import Optional
+
+import numpy as np
+
+from core.enums import CritMode
+from simulation.batch import RunSpec, SimulationContext, build_simulation, load_context, run_batch
+from simulation.event_system import EventType
+
+
+@dataclass
+class DamageDistribution:
+    """总伤害分布"""
+    mean: float
+    std: float
+    p5: float
+    p50: float
+    p95: float
+    samples: int
+    expected_total: float  # 期望暴击模式下的总伤害
+    method: str            # vectorized: 命中序列采样; resimulation: 完整重跑
+
+
+def sample_crit_totals(non_crit: np.ndarray, crit: np.ndarray, crit_rate: np.ndarray,
+                       samples: int, rng: np.random.Generator, fixed_damage: float = 0.0,
+                       max_block: int = 4_000_000) -> np.ndarray:
+    """
+    对命中序列批量采样暴击，返回每个样本的总伤害
+    non_crit / crit 为随机模式下该次命中的两种结果（由伤害内核算出并取整）；按块采样以限制内存
+    """
+    hits = len(crit_rate)
+    totals = np.empty(samples, dtype=np.float64)
+    if hits == 0:
+        totals.fill(fixed_damage)
+        return totals
+
+    block = max(1, max_block // hits)
+    for start in range(0, samples, block):
+        stop = min(samples, start + block)
+        rolls = rng.random((stop - start, hits)) < crit_rate
+        totals[start:stop] = np.where(rolls, crit, non_crit).sum(axis=1) + fixed_damage
+    return totals
+
+
+def crit_distribution(spec: RunSpec, samples: int = 10000, seed: Optional[int] = None,
+                      context: Optional[SimulationContext] = None,
+                      max_resimulations: int = 500, max_workers: Optional[int] = None) -> DamageDistribution:
+    """
+    估计一组配置的暴击伤害分布
+
+    有 CRIT_DEALT 订阅者时（如暴击触发的装备效果），暴击会改变后续战斗流程，
+    命中序列不再固定，此时退回到按不同种子完整重跑（最多 max_resimulations 次）
+
+    Args:
+        spec: 模拟配置（crit_mode 会被覆盖）
+        samples: 采样次数
+        seed: 采样随机种子
+    """
+    context = context or load_context()
+    engine, target = build_simulation(replace(spec, crit_mode=CritMode.EXPECTED.value), context)
+
+    if engine.event_bus.get_listener_count(EventType.CRIT_DEALT) > 0:
+        base_seed = spec.seed if spec.seed is not None else engine.seed
+        runs = min(samples, max_resimulations)
+        results = run_batch(
+            [replace(spec, seed=base_seed + i, crit_mode=CritMode.RANDOM.value, run_id=str(i))
+             for i in range(runs)],
+            max_workers=max_workers,
+        )
+        totals = np.array([r.total_damage for r in results if r.error is None], dtype=np.float64)
+        expected_total = float(totals.mean()) if len(totals) else 0.0
+        method = "resimulation"
+    else:
+        engine.run(spec.duration, fast_forward=True)
+        records = engine.statistics.damage_records
+        crit_hits = [r for r in records if r.crit_rate is not None]
+        fixed_damage = sum(r.damage for r in records if r.crit_rate is None)
+
+        totals = sample_crit_totals(
+            np.array([r.non_crit_damage for r in crit_hits], dtype=np.float64),
+            np.array([r.crit_damage for r in crit_hits], dtype=np.float64),
+            np.array([r.crit_rate for r in crit_hits], dtype=np.float64),
+            samples,
+            np.random.default_rng(seed),
+            fixed_damage=fixed_damage,
+        )
+        expected_total = target.total_damage_taken
+        method = "vectorized"
+    engine.dispose()
+
+    if len(totals) == 0:
+        return DamageDistribution(0.0, 0.0, 0.0, 0.0, 0.0, 0, expected_total, method)
+
+    p5, p50, p95 = np.percentile(totals, [5, 50, 95])
+    return DamageDistribution(
+        mean=float(totals.mean()),
+        std=float(totals.std()),
+        p5=float(p5),
+        p50=float(p50),
+        p95=float(p95),
+        samples=len(totals),
+        expected_total=expected_total,
+        method=method,
+    )
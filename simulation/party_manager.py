@@ -1,3 +1,5 @@
+import math
+
 from core.config_manager import get_config
 
 class PartyManager:
@@ -5,6 +7,9 @@ class PartyManager:
     队伍管理器
     管理全队共享资源（如技力）
     """
+    # 检查点保存的状态（见 simulation.checkpoint）
+    _checkpoint_fields = ('sp', 'max_sp', 'sp_regen_rate')
+
     def __init__(self):
         self.config = get_config()
         self.max_sp = 300.0
@@ -15,6 +20,26 @@ class PartyManager:
         """每帧更新"""
         if self.sp < self.max_sp:
             self.sp = min(self.max_sp, self.sp + self.sp_regen_rate * dt)
+
+    def fast_forward(self, ticks: int, dt: float):
+        """连续推进多帧（逐帧累加以保持浮点结果一致，回满后提前结束）"""
+        for _ in range(ticks):
+            if self.sp >= self.max_sp:
+                break
+            self.update(dt)
+
+    def ticks_until_sp(self, amount: float, dt: float) -> float:
+        """技力回复到 amount 还需多少帧（已足够时为 0，不回复时为 inf）"""
+        if self.sp >= amount:
+            return 0
+        if amount > self.max_sp or self.sp_regen_rate <= 0:
+            return math.inf
+        # 按 update 的累加顺序推演，得到与逐帧回复相同的越过时刻
+        sp, ticks = self.sp, 0
+        while sp < amount:
+            sp = min(self.max_sp, sp + self.sp_regen_rate * dt)
+            ticks += 1
+        return ticks
             
     def try_consume_sp(self, amount: float) -> bool:
         """尝试消耗技力"""
@@ -0,0 +1,319 @@
+"""
+命中轨迹回放与换装重算
+模拟一次后导出命中轨迹（时间、攻击者、技能、倍率、元素、招式类型、双方属性快照、暴击随机数），
+小幅换装（基础属性/武器/装备的数值部分）时直接按轨迹重算总伤害，不再运行tick循环。
+换装可能改变战斗流程时（特效不同、暴击触发的效果、反应/持续伤害依赖的属性变化等）
+自动退回完整模拟。
+"""
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from core.calculator import DamageEngine, DamageKernel
+from core.enums import CritMode, Element, MoveType
+from core.stats import StatKey
+from entities.characters.base_actor import BaseActor, finalize_panel
+from simulation.batch import (
+    RunResult, RunSpec, SimulationContext, build_simulation, load_context, run_spec,
+)
+from simulation.engine import SimEngine
+from simulation.loadout import (
+    apply_custom_attrs, apply_equipments, apply_weapon, resolve_equipments,
+)
+
+# 影响反应倍率与反应Buff强度的属性
+REACTION_STAT_KEYS = (StatKey.TECH_POWER, StatKey.TECH_PCT, StatKey.LEVEL)
+# 影响最终攻击力（进而影响持续伤害等按攻击力快照的固定伤害）的属性
+ATK_STAT_KEYS = (StatKey.BASE_ATK, StatKey.WEAPON_ATK, StatKey.FLAT_ATK, StatKey.ATK_PCT, '_attr_multiplier')
+
+
+@dataclass
+class TraceHit:
+    """一次经 deal_damage 结算的命中"""
+    tick: int
+    attacker: str
+    skill_name: str
+    skill_mv: float               # 含反应附加倍率
+    element: Element
+    move_type: MoveType
+    attacker_stats: dict          # 命中时的攻击方面板（只读快照）
+    target_stats: dict            # 命中时的目标防御快照（只读）
+    damage: float
+    crit_roll: Optional[float]    # 随机模式下的暴击随机数，期望模式为 None
+    crit_observed: bool = False   # 命中时是否有暴击事件监听者（暴击结果会影响流程）
+
+
+@dataclass
+class FixedDamage:
+    """不随换装重算的伤害（持续伤害、真实伤害、QTE机制伤害等）"""
+    source: str
+    damage: float
+    uses_panel: bool = False      # 按来源的完整面板结算（暴击、增伤、抗性等），来源换装后不能沿用
+
+
+class HitTrace:
+    """
+    命中轨迹
+    按发生顺序保存命中与固定伤害，重算时以相同顺序累加，保证未换装时结果与原模拟逐位一致
+    """
+
+    def __init__(self, crit_mode: CritMode):
+        self.crit_mode = crit_mode
+        self.entries: List = []                       # TraceHit / FixedDamage
+        self.base_panels: Dict[str, dict] = {}        # 角色名 -> 基础面板（Hook/Buff 之前）
+        self.has_reactions = False
+        self.invalid_reason: Optional[str] = None     # 非 None 时轨迹不可用于重算
+        self.duration = 0.0
+
+    def record_hit(self, tick, attacker, skill_name, skill_mv, element, move_type,
+                   attacker_stats, target_stats, damage, crit_roll=None,
+                   crit_observed=False, modified=False):
+        if modified:
+            self.invalidate(f"{skill_name} 的伤害被事件修改")
+        self.entries.append(TraceHit(
+            tick, attacker, skill_name, skill_mv, element, move_type,
+            attacker_stats, target_stats, damage, crit_roll, crit_observed,
+        ))
+
+    def record_fixed(self, source: str, damage: float, uses_panel: bool = False):
+        self.entries.append(FixedDamage(source, damage, uses_panel))
+
+    def invalidate(self, reason: str):
+        if self.invalid_reason is None:
+            self.invalid_reason = reason
+
+    @property
+    def hits(self) -> List[TraceHit]:
+        return [e for e in self.entries if isinstance(e, TraceHit)]
+
+    @property
+    def has_fixed_damage(self) -> bool:
+        return any(isinstance(e, FixedDamage) for e in self.entries)
+
+    def check_repriceable(self, base_panels: Dict[str, dict]) -> Optional[str]:
+        """
+        判断换装后能否沿用本轨迹
+        Returns:
+            不能沿用的原因；可以沿用时返回 None
+        """
+        if self.invalid_reason:
+            return self.invalid_reason
+        for name, new_base in base_panels.items():
+            old_base = self.base_panels.get(name)
+            if old_base is None:
+                return f"轨迹中没有角色 {name}"
+            changed = {k for k in set(old_base) | set(new_base) if old_base.get(k) != new_base.get(k)}
+            if changed and any(isinstance(e, FixedDamage) and e.uses_panel and e.source == name
+                               for e in self.entries):
+                return f"{name} 有按完整面板结算的固定伤害，换装后需完整模拟"
+            if self.has_reactions and changed.intersection(REACTION_STAT_KEYS):
+                return f"{name} 的源石技艺/等级变化会影响元素反应"
+            if self.has_fixed_damage and changed.intersection(ATK_STAT_KEYS):
+                return f"{name} 的攻击力变化会影响持续伤害等固定伤害"
+        return None
+
+    def reprice(self, base_panels: Dict[str, dict]) -> Tuple[Optional[RunResult], Optional[str]]:
+        """
+        按新的基础面板重算轨迹
+        Args:
+            base_panels: 角色名 -> 换装后的基础面板（未换装的角色可省略）
+        Returns:
+            (结果, None) 或 (None, 需要完整模拟的原因)
+        """
+        reason = self.check_repriceable(base_panels)
+        if reason:
+            return None, reason
+
+        expected = self.crit_mode == CritMode.EXPECTED
+        kernel = DamageKernel()
+        rebased: Dict[int, dict] = {}   # id(原面板) -> 换装后面板（轨迹持有原面板，id 不会复用）
+
+        total = 0.0
+        variance = 0.0
+        by_character: Dict[str, float] = {}
+        for entry in self.entries:
+            if isinstance(entry, FixedDamage):
+                damage = entry.damage
+                source = entry.source
+            else:
+                stats = entry.attacker_stats
+                new_base = base_panels.get(entry.attacker)
+                if new_base is not None:
+                    new_stats = rebased.get(id(stats))
+                    if new_stats is None:
+                        new_stats = rebase_panel(stats, self.base_panels[entry.attacker], new_base)
+                        rebased[id(stats)] = new_stats
+                    stats = new_stats
+
+                is_crit = False
+                if not expected:
+                    is_crit = entry.crit_roll < DamageEngine.effective_crit_rate(stats)
+                    if entry.crit_observed and is_crit != (entry.crit_roll < DamageEngine.effective_crit_rate(entry.attacker_stats)):
+                        return None, f"{entry.skill_name} 的暴击结果改变，且有暴击触发的效果"
+
+                damage = kernel.calculate(stats, entry.target_stats, entry.skill_mv, entry.element,
+                                          entry.move_type, is_crit=is_crit, expected_crit=expected)
+                if expected:
+                    # 与 deal_damage 记录的统计一致：取随机模式下暴击/非暴击两种取整结果之差
+                    crit_rate = DamageEngine.effective_crit_rate(stats)
+                    spread = (
+                        kernel.calculate(stats, entry.target_stats, entry.skill_mv, entry.element,
+                                         entry.move_type, is_crit=True)
+                        - kernel.calculate(stats, entry.target_stats, entry.skill_mv, entry.element,
+                                           entry.move_type)
+                    )
+                    variance += crit_rate * (1.0 - crit_rate) * spread * spread
+                source = entry.attacker
+
+            total += damage
+            by_character[source] = by_character.get(source, 0.0) + damage
+
+        return RunResult(
+            run_id=None,
+            seed=None,
+            total_damage=total,
+            dps=total / self.duration if self.duration > 0 else 0.0,
+            damage_std=variance ** 0.5,
+            damage_by_character=by_character,
+        ), None
+
+
+def rebase_panel(panel: dict, old_base: dict, new_base: dict) -> dict:
+    """
+    将面板中的基础部分替换为新的基础面板，保留 Hook 与 Buff 带来的增量
+    未变化的属性沿用原值，保证结果逐位一致
+    """
+    rebased = dict(panel)
+    for key, value in new_base.items():
+        old = old_base.get(key)
+        if value != old:
+            rebased[key] = value + (panel.get(key, 0.0) - (old or 0.0))
+    return finalize_panel(rebased)
+
+
+@dataclass
+class RepriceOutcome:
+    """换装重算结果"""
+    result: RunResult
+    repriced: bool                       # True: 轨迹重算；False: 完整模拟
+    fallback_reason: Optional[str] = None
+
+
+def record_trace(spec: RunSpec, context: Optional[SimulationContext] = None) -> Tuple[HitTrace, RunResult]:
+    """运行一次模拟并记录命中轨迹"""
+    context = context or load_context()
+    engine = SimEngine(seed=spec.seed, crit_mode=spec.crit_mode)
+    trace = HitTrace(engine.crit_mode)
+    engine.hit_trace = trace
+    engine, target = build_simulation(spec, context, engine)
+    try:
+        for entity in engine.entities:
+            if isinstance(entity, BaseActor):
+                trace.base_panels[entity.name] = entity.build_base_panel()
+
+        engine.run(spec.duration, fast_forward=True)
+
+        trace.duration = spec.duration
+        trace.has_reactions = bool(engine.statistics.reaction_records)
+        if sum(e.damage for e in trace.entries) != target.total_damage_taken:
+            trace.invalidate("存在未记录在轨迹中的伤害")
+
+        total = target.total_damage_taken
+        result = RunResult(
+            run_id=spec.run_id,
+            seed=engine.seed,
+            total_damage=total,
+            dps=total / spec.duration if spec.duration > 0 else 0.0,
+            damage_std=engine.statistics.get_damage_std(),
+            damage_by_character={
+                name: cs.total_damage for name, cs in engine.statistics.character_stats.items()
+            },
+        )
+    finally:
+        engine.dispose()
+    return trace, result
+
+
+def effect_signature(char_spec, context: SimulationContext) -> tuple:
+    """配装中会注册事件监听的特效（武器特效、装备特效、套装特效），特效不同则战斗流程可能不同"""
+    weapon = context.weapon_manager.get(char_spec.weapon_id) if char_spec.weapon_id else None
+    equipments = resolve_equipments(char_spec.equipment_ids, context.equipment_manager)
+    set_effects = []
+    for set_id, bonuses in context.set_manager.check_set_bonuses(equipments).items():
+        set_effects.extend((set_id, bonus.pieces_required) for bonus in bonuses if bonus.effects)
+    return (
+        weapon.id if weapon is not None and weapon.effects else None,
+        tuple(sorted(e.id for e in equipments if e.effects)),
+        tuple(sorted(set_effects)),
+    )
+
+
+def build_base_panels(spec: RunSpec, context: SimulationContext, names=None) -> Dict[str, dict]:
+    """不运行模拟，按配装计算各角色的基础面板（只应用数值部分，不注册特效）"""
+    engine = SimEngine(seed=spec.seed, crit_mode=spec.crit_mode)
+    panels = {}
+    try:
+        for char_spec in spec.characters:
+            char_class = context.char_map.get(char_spec.name)
+            if char_class is None:
+                raise ValueError(f"未知角色: {char_spec.name}")
+            if names is not None and char_spec.name not in names:
+                continue
+            obj = char_class(engine, None)
+            engine.entities.append(obj)
+            apply_custom_attrs(obj, char_spec.custom_attrs)
+            if char_spec.weapon_id:
+                weapon = context.weapon_manager.get(char_spec.weapon_id)
+                if weapon:
+                    apply_weapon(obj, weapon, engine, with_effects=False)
+            if char_spec.equipment_ids:
+                equipments = resolve_equipments(char_spec.equipment_ids, context.equipment_manager)
+                apply_equipments(obj, equipments, context.set_manager, engine, with_effects=False)
+            panels[obj.name] = obj.build_base_panel()
+    finally:
+        engine.dispose()
+    return panels
+
+
+def _gear_changes(base: RunSpec, variant: RunSpec, context: SimulationContext):
+    """
+    比较两份配置
+    Returns:
+        (换装的角色名列表, 不能沿用轨迹的原因)
+    """
+    if (replace(base, characters=[], run_id=None) != replace(variant, characters=[], run_id=None)
+            or len(base.characters) != len(variant.characters)):
+        return None, "敌人/时长/随机种子/暴击模式不同"
+
+    changed = []
+    for old, new in zip(base.characters, variant.characters):
+        if (old.name, old.script, old.timeline, old.molten_stacks) != (new.name, new.script, new.timeline, new.molten_stacks):
+            return None, f"{new.name} 的角色或脚本不同"
+        if (old.weapon_id, old.equipment_ids, old.custom_attrs) == (new.weapon_id, new.equipment_ids, new.custom_attrs):
+            continue
+        if effect_signature(old, context) != effect_signature(new, context):
+            return None, f"{new.name} 的武器/装备特效不同"
+        changed.append(new.name)
+    return changed, None
+
+
+def reprice_spec(trace: HitTrace, base_spec: RunSpec, variant: RunSpec,
+                 context: Optional[SimulationContext] = None) -> RepriceOutcome:
+    """
+    用 base_spec 的命中轨迹重算 variant 的伤害，无法沿用时完整模拟 variant
+
+    Args:
+        trace: record_trace(base_spec) 得到的轨迹
+        base_spec: 记录轨迹时的配置
+        variant: 只改动了配装（武器/装备/自定义属性）的配置
+    """
+    context = context or load_context()
+    changed, reason = _gear_changes(base_spec, variant, context)
+    if reason is None:
+        panels = build_base_panels(variant, context, names=set(changed)) if changed else {}
+        result, reason = trace.reprice(panels)
+        if result is not None:
+            result.run_id = variant.run_id
+            result.seed = variant.seed
+            return RepriceOutcome(result, repriced=True)
+
+    return RepriceOutcome(run_spec(variant, context), repriced=False, fallback_reason=reason)
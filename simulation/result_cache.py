@@ -0,0 +1,170 @@
+"""
+模拟结果缓存
+按请求内容寻址：键为规范化 JSON（请求、引用的武器/装备/套装内容、全局配置、源码指纹、种子）的哈希，
+任何影响结果的输入变化都会得到新键，旧条目自然失效。
+内存层为 LRU；可选磁盘层按总大小淘汰最久未访问的条目，进程重启后仍可命中。
+条目登记所依赖的武器/装备，通过 invalidate 主动清除（武器/装备被修改或删除时）。
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+# 依赖标记，如 ("weapon", 武器ID)、("equipment", 装备ID)
+Dep = Tuple[str, str]
+
+# 参与源码指纹的包
+_SOURCE_PACKAGES = ("core", "entities", "mechanics", "simulation")
+
+
+@lru_cache(maxsize=None)
+def source_fingerprint() -> bytes:
+    """项目源码指纹（16字节），源码或常量表变化时改变"""
+    root = Path(__file__).resolve().parent.parent
+    digest = hashlib.blake2b(digest_size=16)
+    for package in _SOURCE_PACKAGES:
+        for path in sorted((root / package).rglob("*.py")):
+            digest.update(path.relative_to(root).as_posix().encode())
+            digest.update(path.read_bytes())
+    return digest.digest()
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """
+    规范化请求内容的哈希
+    payload 需可 JSON 序列化；键顺序无关，源码指纹自动加入
+    """
+    canonical = json.dumps(
+        {"payload": payload, "source": source_fingerprint().hex()},
+        sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """两级结果缓存（线程安全），缓存的结果视为只读"""
+
+    def __init__(self, max_entries: int = 64, disk_dir: Optional[str] = None,
+                 disk_max_bytes: int = 256 * 1024 * 1024):
+        """
+        Args:
+            max_entries: 内存层条目上限
+            disk_dir: 磁盘层目录，为 None 时只用内存层
+            disk_max_bytes: 磁盘层总大小上限（字节）
+        """
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._deps: Dict[str, Tuple[Dep, ...]] = {}
+        self._disk: Dict[str, Tuple[int, float]] = {}   # 键 -> (文件大小, 最近访问时间)
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    self._disk[entry.name[:-5]] = (stat.st_size, stat.st_mtime)
+                    self._disk_bytes += stat.st_size
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[Any]:
+        """取出缓存结果，未命中返回 None；磁盘层命中时提升到内存层"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return self._memory[key]
+            if key not in self._disk:
+                self.misses += 1
+                return None
+            path = self._path(key)
+            try:
+                entry = json.loads(path.read_text(encoding="utf-8"))
+                os.utime(path)
+            except (OSError, ValueError):
+                self._drop_disk(key)
+                self.misses += 1
+                return None
+            self._disk[key] = (self._disk[key][0], os.path.getmtime(path))
+            self.hits += 1
+            self._remember(key, entry["result"], tuple(tuple(d) for d in entry["deps"]))
+            return entry["result"]
+
+    def put(self, key: str, result: Any, deps: Iterable[Dep] = ()):
+        """写入结果（需可 JSON 序列化），deps 为结果依赖的武器/装备"""
+        deps = tuple(deps)
+        with self._lock:
+            self._remember(key, result, deps)
+            if self.disk_dir is None:
+                return
+            data = json.dumps({"deps": deps, "result": result}, ensure_ascii=False).encode("utf-8")
+            path = self._path(key)
+            tmp = path.with_name(path.name + ".tmp")
+            try:
+                tmp.write_bytes(data)
+                os.replace(tmp, path)
+            except OSError:
+                return
+            self._drop_disk(key, unlink=False)
+            self._disk[key] = (len(data), os.path.getmtime(path))
+            self._disk_bytes += len(data)
+            self._evict_disk()
+
+    def invalidate(self, dep: Dep) -> int:
+        """清除依赖 dep 的全部条目，返回清除数量（仅限本进程写入或读取过的条目）"""
+        with self._lock:
+            keys = [key for key, deps in self._deps.items() if dep in deps]
+            for key in keys:
+                self._memory.pop(key, None)
+                del self._deps[key]
+                self._drop_disk(key)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._deps.clear()
+            for key in list(self._disk):
+                self._drop_disk(key)
+
+    def _remember(self, key: str, result: Any, deps: Tuple[Dep, ...]):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        self._deps[key] = deps
+        while len(self._memory) > self.max_entries:
+            old, _ = self._memory.popitem(last=False)
+            # 仍在磁盘层的条目保留依赖信息，以便失效时一并删除文件
+            if old not in self._disk:
+                self._deps.pop(old, None)
+
+    def _drop_disk(self, key: str, unlink: bool = True):
+        info = self._disk.pop(key, None)
+        if info is None:
+            return
+        self._disk_bytes -= info[0]
+        if unlink:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.disk_max_bytes:
+            return
+        for key, _ in sorted(self._disk.items(), key=lambda item: item[1][1]):
+            if self._disk_bytes <= self.disk_max_bytes:
+                break
+            self._drop_disk(key)
+            if key not in self._memory:
+                self._deps.pop(key, None)
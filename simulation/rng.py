@@ -0,0 +1,47 @@
+"""
+可复现的随机数
+每个引擎持有一个运行级种子，按名称派生互相独立的子随机流（如每个攻击者的暴击流、触发类效果流），
+新增随机消耗点不会扰动其他流的序列
+"""
+import random
+from typing import Dict, Optional
+
+
+class RandomStreams:
+    """按名称派生的子随机流集合"""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+        self._streams: Dict[str, random.Random] = {}
+
+    def stream(self, name: str) -> random.Random:
+        """
+        获取命名子流（首次访问时创建）
+        子流种子由 "运行种子:名称" 字符串派生，跨进程、跨运行稳定
+        """
+        rng = self._streams.get(name)
+        if rng is None:
+            rng = random.Random(f"{self.seed}:{name}")
+            self._streams[name] = rng
+        return rng
+
+    def getstate(self) -> Dict[str, tuple]:
+        """各子流的内部状态（按创建顺序），供检查点保存"""
+        return {name: rng.getstate() for name, rng in self._streams.items()}
+
+    def setstate(self, seed: int, states: Dict[str, tuple]):
+        """恢复运行种子与 getstate 保存的子流状态"""
+        self.seed = seed
+        self._streams = {}
+        for name, state in states.items():
+            rng = random.Random()
+            rng.setstate(state)
+            self._streams[name] = rng
+
+    def crit(self, attacker_name: str) -> random.Random:
+        """攻击者的暴击判定流"""
+        return self.stream(f"crit:{attacker_name}")
+
+    def proc(self, name: str) -> random.Random:
+        """概率触发效果流"""
+        return self.stream(f"proc:{name}")
@@ -0,0 +1,207 @@
+"""
+循环搜索
+把每个角色 parse_command 的指令（a1..aN、skill、ult、qte、wait N）作为动作集合，
+用束搜索为队伍寻找在给定时长内总伤害最高的循环。
+
+每当某个角色空闲且脚本为空时产生一次决策：为它追加一条指令并继续推进。
+候选之间共享前缀：子节点从父节点的引擎状态复制（SimEngine.fork）后只模拟新增部分，
+不从第0 tick重放。
+
+约束：
+- 战技需要队伍技力 >= 100（不足时不生成该候选）
+- QTE 仅在连携窗口内可选
+- 本项目未实现终结技能量，终结技次数由 ActionGrammar.max_ults 限制
+- 普攻按连段顺序 a1 -> a2 -> ...，其他指令会打断连段
+"""
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from entities.characters.base_actor import BaseActor
+from simulation.batch import RunSpec, SimulationContext, build_simulation, load_context
+from simulation.event_system import EventType
+
+
+@dataclass
+class ActionGrammar:
+    """单个角色的动作集合"""
+    max_normal: int = 5                       # 普攻连段数
+    max_ults: int = 1                         # 终结技次数上限
+    wait_options: Tuple[float, ...] = (1.0,)  # 可选的等待时长（秒）
+    allow_qte: bool = True
+
+
+@dataclass
+class RotationResult:
+    """一条完整循环"""
+    scripts: Dict[str, List[str]]
+    total_damage: float
+    dps: float
+
+
+@dataclass
+class SearchStats:
+    expanded: int = 0   # 展开的节点数
+    forks: int = 0      # 复制引擎次数
+    finished: int = 0   # 完整评估的循环数
+
+
+@dataclass
+class _Node:
+    engine: object
+    target: object
+    scripts: Dict[str, List[str]]
+    chain: Dict[str, int]     # 下一段普攻序号（0 起）
+    ults: Dict[str, int]
+    depth: int = 0
+    actor: Optional[BaseActor] = None  # 等待决策的角色
+
+
+class RotationSearch:
+    """队伍循环的束搜索"""
+
+    def __init__(self, spec: RunSpec, characters: Optional[List[str]] = None, beam_width: int = 8,
+                 max_depth: int = 12, grammars: Optional[Dict[str, ActionGrammar]] = None,
+                 context: Optional[SimulationContext] = None, top_n: int = 5):
+        """
+        Args:
+            spec: 队伍、配装、敌人与时长；角色脚本作为固定的开场前缀
+            characters: 参与搜索的角色，默认全部；其余角色只执行 spec 中的脚本
+            beam_width: 每层保留的候选数
+            max_depth: 搜索的指令总数（全队合计），超出后各角色不再追加指令
+            grammars: 角色名 -> 动作集合，默认 ActionGrammar()
+            top_n: 返回的循环数
+        """
+        self.spec = spec
+        self.context = context or load_context()
+        self.characters = set(characters or [c.name for c in spec.characters])
+        self.beam_width = beam_width
+        self.max_depth = max_depth
+        self.grammars = grammars or {}
+        self.top_n = top_n
+        self.stats = SearchStats()
+        self.end_tick = int(spec.duration * 10)
+
+    def _grammar(self, name: str) -> ActionGrammar:
+        return self.grammars.get(name) or ActionGrammar()
+
+    def _actors(self, engine) -> List[BaseActor]:
+        return [e for e in engine.entities if isinstance(e, BaseActor) and e.name in self.characters]
+
+    def _deciding_actor(self, engine) -> Optional[BaseActor]:
+        for actor in self._actors(engine):
+            if not actor.is_busy and not actor.action_queue:
+                return actor
+        return None
+
+    def _advance(self, node: _Node):
+        """推进到下一个决策点；到达时长或指令数上限时跑完全程"""
+        engine = node.engine
+        if node.depth < self.max_depth:
+            node.actor = self._deciding_actor(engine)
+            if node.actor is None:
+                engine.run_until(self.end_tick, stop=lambda: self._deciding_actor(engine) is not None,
+                                 fast_forward=True)
+                node.actor = self._deciding_actor(engine) if engine.tick < self.end_tick else None
+        if node.actor is None or node.depth >= self.max_depth:
+            node.actor = None
+            engine.run_until(self.end_tick, fast_forward=True)
+            engine.event_bus.emit_simple(EventType.COMBAT_END, tick=engine.tick)
+
+    def _moves(self, node: _Node) -> List[str]:
+        actor = node.actor
+        grammar = self._grammar(actor.name)
+        moves = [f"a{node.chain[actor.name] + 1}"]
+        if node.engine.party_manager.sp >= 100:
+            moves.append("skill")
+        if node.ults[actor.name] < grammar.max_ults:
+            moves.append("ult")
+        # 窗口需在下一tick开始行动时仍然有效
+        if grammar.allow_qte and actor.qte_ready_timer > 1:
+            moves.append("qte")
+        moves.extend(f"wait {w}" for w in grammar.wait_options)
+        return moves
+
+    def _child(self, node: _Node, move: str, reuse: bool) -> _Node:
+        if reuse:
+            engine = node.engine
+        else:
+            engine = node.engine.fork()
+            self.stats.forks += 1
+        target = next(e for e in engine.entities if e.name == node.target.name)
+        actor = next(a for a in self._actors(engine) if a.name == node.actor.name)
+        actor.queue_command(move)
+
+        name = actor.name
+        chain = dict(node.chain)
+        if move.startswith("a") and move[1:].isdigit():
+            chain[name] = (chain[name] + 1) % self._grammar(name).max_normal
+        else:
+            chain[name] = 0
+        ults = dict(node.ults)
+        if move == "ult":
+            ults[name] += 1
+        scripts = {k: (v + [move] if k == name else v) for k, v in node.scripts.items()}
+        child = _Node(engine, target, scripts, chain, ults, node.depth + 1)
+        self._advance(child)
+        return child
+
+    @staticmethod
+    def _score(node: _Node) -> float:
+        """未完成的候选按当前秒伤排序"""
+        return node.target.total_damage_taken / max(1, node.engine.tick)
+
+    def _result(self, node: _Node) -> RotationResult:
+        total = node.target.total_damage_taken
+        return RotationResult(node.scripts, total, total / self.spec.duration if self.spec.duration > 0 else 0.0)
+
+    def run(self) -> List[RotationResult]:
+        """
+        Returns:
+            按总伤害从高到低的循环（脚本包含开场前缀，可直接用于 RunSpec）
+        """
+        engine, target = build_simulation(self.spec, self.context)
+        engine.event_bus.emit_simple(EventType.COMBAT_START, tick=engine.tick)
+        names = [c.name for c in self.spec.characters]
+        root = _Node(
+            engine, target,
+            scripts={c.name: list(c.script) for c in self.spec.characters},
+            chain={name: 0 for name in names},
+            ults={name: 0 for name in names},
+        )
+        self._advance(root)
+
+        finished: List[RotationResult] = []
+        frontier = [root]
+        while frontier:
+            children = []
+            for node in frontier:
+                if node.actor is None:
+                    finished.append(self._result(node))
+                    node.engine.dispose()
+                    continue
+                self.stats.expanded += 1
+                moves = self._moves(node)
+                for i, move in enumerate(moves):
+                    children.append(self._child(node, move, reuse=i == len(moves) - 1))
+
+            done = [c for c in children if c.actor is None]
+            pending = sorted((c for c in children if c.actor is not None), key=self._score, reverse=True)
+            for child in pending[self.beam_width:]:
+                child.engine.dispose()
+            frontier = done + pending[:self.beam_width]
+
+        self.stats.finished = len(finished)
+        finished.sort(key=lambda r: r.total_damage, reverse=True)
+        return finished[:self.top_n]
+
+
+def search_rotation(spec: RunSpec, **kwargs) -> List[RotationResult]:
+    """束搜索队伍循环，参数见 RotationSearch"""
+    return RotationSearch(spec, **kwargs).run()
+
+
+def apply_rotation(spec: RunSpec, result: RotationResult) -> RunSpec:
+    """把搜索得到的脚本写回配置"""
+    return replace(spec, characters=[
+        replace(c, script=list(result.scripts.get(c.name, c.script)), timeline=None) for c in spec.characters
+    ])
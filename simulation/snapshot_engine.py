@@ -3,6 +3,7 @@ Snapshot Engine - 用于捕获战斗快照的引擎扩展
 """
 from collections import defaultdict
 from simulation.engine import SimEngine
+from simulation.snapshot_history import ENTITY_FIELDS, SNAPSHOT_FIELDS, DeltaHistory
 from core.enums import ReactionType, BuffEffect
 
 
@@ -50,95 +51,204 @@ def categorize_buff(buff):
 class SnapshotEngine(SimEngine):
     """扩展SimEngine,添加快照捕获功能"""
 
-    def __init__(self):
-        super().__init__()
-        self.history = []
+    # 快照帧与日志写入后不再修改，复制时只复制列表（logs_by_tick 的列表仍会追加，需深复制）
+    _fork_shallow = ('history', 'logs', 'damage_by_tick')
+
+    HISTORY_FORMATS = ("full", "delta", "keyframes")
+
+    def __init__(self, seed=None, crit_mode=None, history_format="full", keyframe_every=100,
+                 snapshot_every=1, snapshot_on_change=False, snapshot_fields=None):
+        """
+        Args:
+            history_format: full 逐帧完整快照（列表）；delta 增量编码（DeltaHistory，见 snapshot_history）；
+                            keyframes 只保留每 keyframe_every 帧的完整快照
+            keyframe_every: 关键帧间隔（帧数）
+            snapshot_every: 每隔多少tick捕获一帧（首帧与最后一帧总会捕获），帧内伤害为距上一帧的累计伤害
+            snapshot_on_change: 只在所选字段的状态变化（Buff增减或层数、动作切换、技力、额外信息、QTE、造成伤害）时捕获
+            snapshot_fields: 捕获的字段（SNAPSHOT_FIELDS 的子集），None 表示全部；未选字段不计算也不输出
+        """
+        super().__init__(seed, crit_mode)
+        if history_format not in self.HISTORY_FORMATS:
+            raise ValueError(f"未知的快照格式: {history_format}")
+        unknown = set(snapshot_fields or ()) - set(SNAPSHOT_FIELDS)
+        if unknown:
+            raise ValueError(f"未知的快照字段: {sorted(unknown)}")
+        self.history_format = history_format
+        self.keyframe_every = max(1, keyframe_every)
+        self.snapshot_every = max(1, snapshot_every)
+        self.snapshot_on_change = snapshot_on_change
+        self.snapshot_fields = SNAPSHOT_FIELDS if snapshot_fields is None else tuple(
+            f for f in SNAPSHOT_FIELDS if f in snapshot_fields)
+        self._frame_count = 0
+        self._last_frame_tick = None
+        self._last_state = None
+        if history_format == "delta":
+            self.history = DeltaHistory(keyframe_every, categorize_buff, self.snapshot_every, self.snapshot_fields)
+        else:
+            self.history = []
         self.logs_by_tick = defaultdict(list)
         self.damage_by_tick = defaultdict(int)
+        self._damage_pos = 0  # 已累计的统计伤害记录数
         self.logs = []
 
-    def log(self, message, level="INFO"):
-        """重写日志方法,捕获伤害和关键事件"""
-        # 1. 处理统计数据(始终捕获伤害用于统计)
-        if "Hit造成伤害" in message or "造成伤害" in message:
-            try:
-                parts = message.split()
-                dmg_val = 0
-                for part in reversed(parts):
-                    clean_part = part.strip("|")
-                    if clean_part.isdigit():
-                        dmg_val = int(clean_part)
-                        break
-                if dmg_val > 0:
-                    self.damage_by_tick[self.tick] += dmg_val
-            except:
-                pass
-
-        # 2. 过滤显示日志
-        is_action = "执行:" in message
-        is_direct_hit = "Hit造成伤害" in message
-
-        if not (is_action or is_direct_hit):
-            return
+    # 前端展示的日志类别
+    LOG_KINDS = ("action", "damage")
 
-        timestamp = f"[{int(self.tick/10 // 60):02}:{self.tick/10 % 60:04.1f}]"
-        log_type = "info"
-        if is_direct_hit:
-            log_type = "damage"
-        elif is_action:
-            log_type = "action"
+    def wants_log(self, level="INFO", kind=None):
+        return kind in self.LOG_KINDS
 
-        self.logs.append({"time": timestamp, "message": message, "type": log_type})
+    def log(self, message, level="INFO", kind=None):
+        """只记录行动与直接伤害日志（前端展示），其余日志不格式化也不输出"""
+        if kind not in self.LOG_KINDS:
+            return
+        timestamp = f"[{int(self.tick/10 // 60):02}:{self.tick/10 % 60:04.1f}]"
+        self.logs.append({"time": timestamp, "message": message, "type": kind})
         self.logs_by_tick[self.tick].append(f"{timestamp} {message}")
 
-    def capture_snapshot(self):
-        """捕获当前战斗状态快照"""
+    def _collect_damage(self):
+        """把统计中新增的伤害记录（直接、持续、真实与连携伤害）累计到 damage_by_tick"""
+        timeline = self.statistics.damage_timeline
+        if self._damage_pos > len(timeline):  # 统计已重置
+            self._damage_pos = 0
+        for i in range(self._damage_pos, len(timeline)):
+            tick, _, damage = timeline[i]
+            self.damage_by_tick[tick] += int(damage)
+        self._damage_pos = len(timeline)
+
+    def capture_snapshot(self, final=False):
+        """捕获当前战斗状态快照（按采样设置跳过）；final 表示最后一帧，总会捕获"""
+        first = self._last_frame_tick is None
+        if not (first or final) and self.tick % self.snapshot_every:
+            return
+        fields = self.snapshot_fields
+        damage = self._frame_damage() if "damage" in fields else 0
+        if self.snapshot_on_change:
+            state = self._state_key()
+            if not (first or final or damage) and state == self._last_state:
+                return
+            self._last_state = state
+        self._last_frame_tick = self.tick
+
+        frame_index = self._frame_count
+        self._frame_count += 1
+        if self.history_format == "delta":
+            self._capture_delta(damage)
+            return
+        if self.history_format == "keyframes" and frame_index % self.keyframe_every:
+            return
+
         frame_data = {
             "time_str": f"{self.tick / 10.0:.1f}s",
             "tick": self.tick,
-            "damage_tick": self.damage_by_tick[self.tick],
-            "sp": self.party_manager.get_sp(),
-            "entities": {}
         }
+        if "damage" in fields:
+            frame_data["damage_tick"] = damage
+        if "sp" in fields:
+            frame_data["sp"] = self.party_manager.get_sp()
+        if not any(f in fields for f in ENTITY_FIELDS):
+            self.history.append(frame_data)
+            return
+
+        frame_data["entities"] = {}
         for ent in self.entities:
-            buff_list = []
-            if hasattr(ent, "buffs"):
-                for b in ent.buffs.buffs:
-                    buff_list.append({
-                        "name": b.name,
-                        "stacks": b.stacks,
-                        "duration": b.duration_ticks / 10.0,
-                        "category": categorize_buff(b),
-                        "desc": getattr(b, "value", "N/A")
-                    })
-            action_info = None
-            if hasattr(ent, "current_action") and ent.current_action:
-                act = ent.current_action
-                progress = ent.action_timer / act.duration if act.duration > 0 else 0
-                action_info = {"name": act.name, "progress": min(1.0, progress)}
-            extra_info = ""
-            if hasattr(ent, "molten_stacks"):
-                extra_info = f"熔火: {ent.molten_stacks}"
-
-            # 捕获QTE就绪状态
-            qte_ready = False
-            if hasattr(ent, "qte_ready_timer"):
-                qte_ready = ent.qte_ready_timer > 0
-
-            frame_data["entities"][ent.name] = {
-                "buffs": buff_list,
-                "action": action_info,
-                "extra": extra_info,
-                "qte_ready": qte_ready
-            }
+            data = {}
+            if "buffs" in fields:
+                buff_list = []
+                if hasattr(ent, "buffs"):
+                    for b in ent.buffs.buffs:
+                        buff_list.append({
+                            "name": b.name,
+                            "stacks": b.stacks,
+                            "duration": b.duration_ticks / 10.0,
+                            "category": categorize_buff(b),
+                            "desc": getattr(b, "value", "N/A")
+                        })
+                data["buffs"] = buff_list
+            if "actions" in fields:
+                action_info = None
+                if hasattr(ent, "current_action") and ent.current_action:
+                    act = ent.current_action
+                    progress = ent.action_timer / act.duration if act.duration > 0 else 0
+                    action_info = {"name": act.name, "progress": min(1.0, progress)}
+                data["action"] = action_info
+            if "extra" in fields:
+                extra_info = ""
+                if hasattr(ent, "molten_stacks"):
+                    extra_info = f"熔火: {ent.molten_stacks}"
+                data["extra"] = extra_info
+            if "qte" in fields:
+                # 捕获QTE就绪状态
+                qte_ready = False
+                if hasattr(ent, "qte_ready_timer"):
+                    qte_ready = ent.qte_ready_timer > 0
+                data["qte_ready"] = qte_ready
+            frame_data["entities"][ent.name] = data
         self.history.append(frame_data)
 
+    def _frame_damage(self):
+        """距上一帧的累计伤害（逐tick采样时即当帧伤害）"""
+        self._collect_damage()
+        start = self.tick if self._last_frame_tick is None else min(self._last_frame_tick + 1, self.tick)
+        if start == self.tick:
+            return self.damage_by_tick[self.tick]
+        return sum(self.damage_by_tick.get(t, 0) for t in range(start, self.tick + 1))
+
+    def _state_key(self):
+        """所选字段的离散状态，用于判断是否变化（Buff剩余时间与动作进度的自然推进不算变化）"""
+        fields = self.snapshot_fields
+        key = [self.party_manager.get_sp() if "sp" in fields else None]
+        for ent in self.entities:
+            key.append((
+                tuple((b.name, b.stacks) for b in ent.buffs.buffs)
+                if "buffs" in fields and hasattr(ent, "buffs") else None,
+                getattr(ent, "current_action", None) if "actions" in fields else None,
+                getattr(ent, "molten_stacks", None) if "extra" in fields else None,
+                getattr(ent, "qte_ready_timer", 0) > 0 if "qte" in fields else None,
+            ))
+        return key
+
+    def _capture_delta(self, damage):
+        fields = self.snapshot_fields
+        entities = []
+        for ent in self.entities:
+            action = None
+            if "actions" in fields and hasattr(ent, "current_action") and ent.current_action:
+                action = (ent.current_action.name, ent.action_timer, ent.current_action.duration)
+            entities.append((
+                ent.name,
+                ent.buffs.buffs if "buffs" in fields and hasattr(ent, "buffs") else (),
+                action,
+                f"熔火: {ent.molten_stacks}" if "extra" in fields and hasattr(ent, "molten_stacks") else "",
+                ent.qte_ready_timer > 0 if "qte" in fields and hasattr(ent, "qte_ready_timer") else False,
+            ))
+        sp = self.party_manager.get_sp() if "sp" in fields else None
+        self.history.append(self.tick, damage, sp, entities)
+
+    def history_data(self):
+        """可序列化的快照历史（delta 格式为编码后的字典）"""
+        if isinstance(self.history, DeltaHistory):
+            return self.history.to_dict()
+        return self.history
+
     def run_with_snapshots(self, max_seconds):
         """运行模拟并捕获快照"""
+        for _ in self.iter_snapshots(max_seconds):
+            pass
+
+    def iter_snapshots(self, max_seconds, chunk_ticks=None):
+        """
+        分段运行模拟并捕获快照，逐段产出当前tick（供流式输出）
+        首帧捕获后产出一次，之后每推进 chunk_ticks 个tick产出一次，结束时保证再产出一次
+        """
         max_ticks = int(max_seconds * 10)
         self.capture_snapshot()
-        for _ in range(max_ticks):
+        yield self.tick
+        for i in range(max_ticks):
             self.tick += 1
             for entity in self.entities:
                 entity.on_tick(self)
-            self.capture_snapshot()
+            self.capture_snapshot(final=i == max_ticks - 1)
+            if chunk_ticks and (i + 1) % chunk_ticks == 0:
+                yield self.tick
+        if max_ticks and not (chunk_ticks and max_ticks % chunk_ticks == 0):
+            yield self.tick
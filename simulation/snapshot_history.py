@@ -0,0 +1,249 @@
+"""
+增量编码的快照历史
+每 keyframe_every 帧记录一个完整关键帧，其余帧只记录与预测值不同的字段：
+预测为 tick+step、Buff 剩余时间 -step、动作计时 +step、当帧伤害为 0、其余字段不变（step 为采样间隔），
+因此持续中的Buff与动作不产生记录，大部分帧为空。解码结果与同样采样设置下的完整快照一致。
+
+编码格式（可 JSON 序列化）：
+    {"format": "delta", "keyframe_every": N, "step": 采样间隔, "fields": [输出字段], "records": [记录, ...]}
+    关键帧: {"k": 1, "t": tick, "d": 当帧伤害, "s": 技力, "n": [实体名], "e": {实体名: 实体状态}}
+    增量帧: 只含变化的键 —— "t" / "d" / "s" / "n"（实体增减时，新实体状态完整写入 "e"）/
+            "e": {实体名: {"b": Buff列表, "a": 动作, "x": 额外信息, "q": QTE就绪}}
+    实体状态: {"b": [[名称, 层数, 剩余tick, 分类, 描述], ...], "a": [动作名, 计时, 总时长] 或 None,
+              "x": 额外信息, "q": QTE就绪}
+"""
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+FORMAT = "delta"
+
+# 快照可选字段（SnapshotEngine 的 snapshot_fields），后四项属于实体
+SNAPSHOT_FIELDS = ("damage", "sp", "buffs", "actions", "extra", "qte")
+ENTITY_FIELDS = ("buffs", "actions", "extra", "qte")
+
+# 编码器内部的实体状态：(Buff列表, 动作, 额外信息, QTE就绪)
+# Buff 项为 (Buff对象, 名称, 层数, 剩余tick, 分类, 描述)，按对象身份判断是否为同一个Buff
+_EntityState = Tuple[List[tuple], Optional[tuple], str, bool]
+
+
+class DeltaHistory:
+    """快照历史的增量编码器（SnapshotEngine 逐帧调用 append）"""
+
+    def __init__(self, keyframe_every: int = 100, categorize: Callable[[Any], str] = None,
+                 step: int = 1, fields: Tuple[str, ...] = SNAPSHOT_FIELDS):
+        """
+        Args:
+            keyframe_every: 关键帧间隔（帧数）
+            categorize: Buff 分类函数，只对新出现的 Buff 调用
+            step: 采样间隔（tick），用于预测下一帧
+            fields: 解码时输出的字段（未选字段由调用方传入空值）
+        """
+        self.keyframe_every = max(1, keyframe_every)
+        self.categorize = categorize
+        self.step = max(1, step)
+        self.fields = tuple(fields)
+        self.records: List[Dict[str, Any]] = []
+        self._tick = None
+        self._sp = None
+        self._entities: Dict[str, _EntityState] = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __copy__(self):
+        # 复制引擎时：记录列表单独复制，已写入的记录与上一帧状态（只替换不修改）共享
+        clone = DeltaHistory.__new__(DeltaHistory)
+        clone.__dict__.update(self.__dict__)
+        clone.records = list(self.records)
+        return clone
+
+    def _buffs(self, buffs, prev: Optional[List[tuple]]) -> List[tuple]:
+        known = {id(item[0]): item[4] for item in prev or ()}
+        return [
+            (b, b.name, b.stacks, b.duration_ticks,
+             known[id(b)] if id(b) in known else self.categorize(b), getattr(b, "value", "N/A"))
+            for b in buffs
+        ]
+
+    def append(self, tick: int, damage: Any, sp: Any, entities: List[tuple]):
+        """
+        记录一帧
+        Args:
+            entities: [(实体名, Buff对象列表, 动作 (名称, 计时, 总时长) 或 None, 额外信息, QTE就绪), ...]
+        """
+        keyframe = len(self.records) % self.keyframe_every == 0
+        step = self.step
+        prev_entities = self._entities
+        states: Dict[str, _EntityState] = {}
+        record: Dict[str, Any] = {"k": 1, "t": tick, "d": damage, "s": sp} if keyframe else {}
+        changes: Dict[str, Dict[str, Any]] = {}
+
+        for name, buffs, action, extra, qte in entities:
+            prev = prev_entities.get(name)
+            if prev is None or keyframe:
+                state = (self._buffs(buffs, prev and prev[0]), action, extra, qte)
+                changes[name] = _entity_record(state)
+                states[name] = state
+                continue
+
+            prev_buffs, prev_action, prev_extra, prev_qte = prev
+            diff = {}
+            if _buffs_as_predicted(buffs, prev_buffs, step):
+                new_buffs = [item[:3] + (item[3] - step,) + item[4:] for item in prev_buffs]
+            else:
+                new_buffs = self._buffs(buffs, prev_buffs)
+                diff["b"] = [list(item[1:]) for item in new_buffs]
+            predicted = None if prev_action is None else (prev_action[0], prev_action[1] + step, prev_action[2])
+            if action != predicted:
+                diff["a"] = None if action is None else list(action)
+            if extra != prev_extra:
+                diff["x"] = extra
+            if qte != prev_qte:
+                diff["q"] = qte
+            if diff:
+                changes[name] = diff
+            states[name] = (new_buffs, action, extra, qte)
+
+        if keyframe:
+            record["n"] = list(states)
+        else:
+            if tick != self._tick + step:
+                record["t"] = tick
+            if damage:
+                record["d"] = damage
+            if sp != self._sp:
+                record["s"] = sp
+            if list(states) != list(prev_entities):
+                record["n"] = list(states)
+        if changes:
+            record["e"] = changes
+
+        self.records.append(record)
+        self._tick, self._sp, self._entities = tick, sp, states
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"format": FORMAT, "keyframe_every": self.keyframe_every, "step": self.step,
+                "fields": list(self.fields), "records": self.records}
+
+
+def _entity_record(state: _EntityState) -> Dict[str, Any]:
+    buffs, action, extra, qte = state
+    return {
+        "b": [list(item[1:]) for item in buffs],
+        "a": None if action is None else list(action),
+        "x": extra,
+        "q": qte,
+    }
+
+
+def _buffs_as_predicted(buffs, prev: List[tuple], step: int) -> bool:
+    """Buff 列表与上一帧相同（同一批对象、层数与描述不变、剩余时间各减 step）"""
+    if len(buffs) != len(prev):
+        return False
+    for b, item in zip(buffs, prev):
+        if (b is not item[0] or b.duration_ticks != item[3] - step or b.stacks != item[2]
+                or b.name != item[1] or getattr(b, "value", "N/A") != item[5]):
+            return False
+    return True
+
+
+def is_delta(history: Any) -> bool:
+    return isinstance(history, dict) and history.get("format") == FORMAT
+
+
+def _render(tick, damage, sp, names, entities, fields) -> Dict[str, Any]:
+    """按 SnapshotEngine.capture_snapshot 的格式生成完整帧"""
+    frame = {
+        "time_str": f"{tick / 10.0:.1f}s",
+        "tick": tick,
+    }
+    if "damage" in fields:
+        frame["damage_tick"] = damage
+    if "sp" in fields:
+        frame["sp"] = sp
+    if not any(f in fields for f in ENTITY_FIELDS):
+        return frame
+
+    frame["entities"] = {}
+    for name in names:
+        state = entities[name]
+        data = {}
+        if "buffs" in fields:
+            data["buffs"] = [
+                {"name": b[0], "stacks": b[1], "duration": b[2] / 10.0, "category": b[3], "desc": b[4]}
+                for b in state["b"]
+            ]
+        if "actions" in fields:
+            action = state["a"]
+            action_info = None
+            if action is not None:
+                act_name, timer, duration = action
+                progress = timer / duration if duration > 0 else 0
+                action_info = {"name": act_name, "progress": min(1.0, progress)}
+            data["action"] = action_info
+        if "extra" in fields:
+            data["extra"] = state["x"]
+        if "qte" in fields:
+            data["qte_ready"] = state["q"]
+        frame["entities"][name] = data
+    return frame
+
+
+def iter_frames(history: Dict[str, Any], keyframes_only: bool = False) -> Iterator[Dict[str, Any]]:
+    """逐帧解码增量历史；keyframes_only 时只解码关键帧"""
+    step = history.get("step", 1)
+    fields = history.get("fields", SNAPSHOT_FIELDS)
+    tick = damage = sp = None
+    names: List[str] = []
+    entities: Dict[str, Dict[str, Any]] = {}
+    for record in history["records"]:
+        if record.get("k"):
+            tick, damage, sp, names = record["t"], record["d"], record["s"], record["n"]
+            entities = {name: dict(state) for name, state in record["e"].items()}
+        else:
+            if keyframes_only:
+                continue
+            tick = record.get("t", tick + step)
+            damage = record.get("d", 0)
+            sp = record.get("s", sp)
+            names = record.get("n", names)
+            changes = record.get("e", {})
+            next_entities = {}
+            for name in names:
+                prev = entities.get(name)
+                diff = changes.get(name, {})
+                if prev is None:
+                    next_entities[name] = dict(diff)
+                    continue
+                state = {
+                    "b": diff["b"] if "b" in diff else [b[:2] + [b[2] - step] + b[3:] for b in prev["b"]],
+                    "a": diff["a"] if "a" in diff else (
+                        None if prev["a"] is None else [prev["a"][0], prev["a"][1] + step, prev["a"][2]]),
+                    "x": diff.get("x", prev["x"]),
+                    "q": diff.get("q", prev["q"]),
+                }
+                next_entities[name] = state
+            entities = next_entities
+        yield _render(tick, damage, sp, names, entities, fields)
+
+
+def record_ticks(history: Dict[str, Any]) -> Iterator[int]:
+    """各条记录对应的tick（不解码实体状态）"""
+    step = history.get("step", 1)
+    tick = None
+    for record in history["records"]:
+        tick = record["t"] if "t" in record else tick + step
+        yield tick
+
+
+def decode_history(history: Any) -> List[Dict[str, Any]]:
+    """把增量历史解码为逐帧完整快照；已是帧列表时原样返回"""
+    if not is_delta(history):
+        return history
+    return list(iter_frames(history))
+
+
+def keyframes(history: Any) -> List[Dict[str, Any]]:
+    """只取关键帧（每 keyframe_every 帧一个完整快照）"""
+    if not is_delta(history):
+        return history
+    return list(iter_frames(history, keyframes_only=True))
@@ -0,0 +1,214 @@
+"""
+Web 接口的快照模拟
+在工作进程中运行 /simulate 请求：请求以普通字典传入，武器/装备/套装由主进程解析后随任务传入，
+工作进程不读取武器库与装备库，主进程中的增删改立即对后续请求生效
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from core.config_manager import get_config
+from simulation.loadout import (
+    apply_custom_attrs, apply_equipments, apply_weapon, create_enemy,
+    discover_characters, parse_script_input,
+)
+from simulation.snapshot_engine import SnapshotEngine
+from simulation.snapshot_history import DeltaHistory, is_delta, record_ticks
+
+# 每个工作进程在初始化时构建一次
+_CHAR_MAP: Optional[Dict[str, type]] = None
+
+# (武器或 None, 装备列表)，与请求中的角色一一对应
+Loadout = Tuple[Any, List[Any]]
+
+
+def init_worker(log_level: str = "WARNING"):
+    """工作进程预热：导入模块、发现角色"""
+    global _CHAR_MAP
+    get_config().log_level = log_level
+    _CHAR_MAP, _ = discover_characters()
+
+
+def _timeline_commands(timeline: List[Dict[str, Any]]) -> List[Tuple[float, str]]:
+    """前端时间轴转为 (开始时间, 指令)，等待指令由时间戳表达，直接跳过"""
+    timeline_data = []
+    for t in timeline:
+        cmd = t["name"].lower().strip()
+        if "wait" in cmd:
+            continue
+        if cmd == "attack":
+            cmd = "a1"
+        timeline_data.append((t["startTime"], cmd))
+    return timeline_data
+
+
+def _build_simulation(request: Dict[str, Any], loadouts: List[Loadout], set_manager):
+    """按请求搭建快照引擎、敌人与角色"""
+    if _CHAR_MAP is None:
+        init_worker(get_config().log_level)
+
+    sim = SnapshotEngine(seed=request.get("seed"), crit_mode=request.get("crit_mode"),
+                         history_format=request.get("history_format") or "full",
+                         snapshot_every=request.get("snapshot_every") or 1,
+                         snapshot_on_change=bool(request.get("snapshot_on_change")),
+                         snapshot_fields=request.get("snapshot_fields"))
+    enemy = request["enemy"]
+    target = create_enemy(sim, enemy["defense"], {
+        element: enemy[f"dmg_taken_mult_{element}"]
+        for element in ("physical", "heat", "electric", "nature", "frost")
+    })
+    sim.entities.append(target)
+
+    char_names = []
+    for c, (weapon, equipments) in zip(request["characters"], loadouts):
+        # 空位（"无"）与未知角色跳过
+        if c["name"] == "无" or c["name"] not in _CHAR_MAP:
+            continue
+
+        obj = _CHAR_MAP[c["name"]](sim, target)
+        apply_custom_attrs(obj, c.get("custom_attrs"))
+        if weapon is not None:
+            apply_weapon(obj, weapon, sim)
+        if equipments:
+            apply_equipments(obj, equipments, set_manager, sim)
+        if hasattr(obj, "molten_stacks"):
+            obj.molten_stacks = c.get("molten_stacks")
+
+        if c.get("timeline") and hasattr(obj, "set_timeline"):
+            obj.set_timeline(_timeline_commands(c["timeline"]))
+        else:
+            obj.set_script(parse_script_input(c["script"]))
+
+        sim.entities.append(obj)
+        char_names.append(obj.name)
+    return sim, target, char_names
+
+
+def _safe_logs(logs: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    return [
+        {
+            "time": str(log.get("time", "")),
+            "message": str(log.get("message", "")),
+            "type": str(log.get("type", "info")),
+        }
+        for log in logs
+    ]
+
+
+def _statistics(sim) -> Dict[str, Any]:
+    return {
+        name: {
+            "name": cs.name,
+            "total_damage": cs.total_damage,
+            "damage_std": cs.damage_variance ** 0.5,
+            "skill_counts": dict(cs.skill_count),
+        }
+        for name, cs in sim.statistics.character_stats.items()
+    }
+
+
+def run_snapshot_simulation(request: Dict[str, Any], loadouts: List[Loadout], set_manager) -> Dict[str, Any]:
+    """
+    运行一次带快照的模拟
+    Args:
+        request: SimulationRequest 的字典形式
+        loadouts: 各角色解析后的武器与装备
+        set_manager: 套装库（判定套装效果）
+    Returns:
+        /simulate 的响应内容
+    """
+    sim, target, char_names = _build_simulation(request, loadouts, set_manager)
+    try:
+        sim.run_with_snapshots(request["duration"])
+        return {
+            "history": sim.history_data(),
+            "logs": _safe_logs(sim.logs),
+            "total_dmg": target.total_damage_taken,
+            "char_names": char_names,
+            "statistics": _statistics(sim),
+            "seed": sim.seed,
+        }
+    finally:
+        sim.dispose()
+
+
+def stream_snapshot_simulation(request: Dict[str, Any], loadouts: List[Loadout], set_manager,
+                               chunk_ticks: int = 50) -> Iterator[Dict[str, Any]]:
+    """
+    分段运行带快照的模拟，依次产出：
+        {"type": "start", "char_names", "seed", "history"}  history 为空的历史（delta 格式时含编码参数）
+        {"type": "chunk", "tick", "frames", "logs", "total_dmg"}  每 chunk_ticks 个tick一段（frames/logs 为新增部分，
+                                                                 delta 格式时 frames 为增量记录）
+        {"type": "done", "total_dmg", "statistics", "seed"}
+    按顺序拼接 frames/logs 即得到与 run_snapshot_simulation 相同的结果（见 merge_stream_event）
+    """
+    sim, target, char_names = _build_simulation(request, loadouts, set_manager)
+    try:
+        yield {"type": "start", "char_names": char_names, "seed": sim.seed,
+               "history": _empty_history(sim.history_data())}
+        frames_list = sim.history.records if isinstance(sim.history, DeltaHistory) else sim.history
+        frame_pos = log_pos = 0
+        for tick in sim.iter_snapshots(request["duration"], chunk_ticks):
+            frames, logs = frames_list[frame_pos:], sim.logs[log_pos:]
+            frame_pos, log_pos = len(frames_list), len(sim.logs)
+            yield {
+                "type": "chunk",
+                "tick": tick,
+                "frames": frames,
+                "logs": _safe_logs(logs),
+                "total_dmg": target.total_damage_taken,
+            }
+        yield {
+            "type": "done",
+            "total_dmg": target.total_damage_taken,
+            "statistics": _statistics(sim),
+            "seed": sim.seed,
+        }
+    finally:
+        sim.dispose()
+
+
+def replay_stream(result: Dict[str, Any], chunk_ticks: int = 50) -> Iterator[Dict[str, Any]]:
+    """把完整结果（如缓存命中）拆成与 stream_snapshot_simulation 相同的事件序列（分段累计伤害为 None）"""
+    yield {"type": "start", "char_names": result["char_names"], "seed": result["seed"],
+           "history": _empty_history(result["history"])}
+    if is_delta(result["history"]):
+        history, ticks = result["history"]["records"], list(record_ticks(result["history"]))
+    else:
+        history = result["history"]
+        ticks = [frame["tick"] for frame in history]
+    # 首帧单独一段，与分段运行一致；日志随第一段一并发送
+    bounds = [0, 1] + list(range(1 + chunk_ticks, len(history), chunk_ticks)) + [len(history)]
+    logs = result["logs"]
+    for i, (a, b) in enumerate(zip(bounds, bounds[1:])):
+        if a >= b:
+            continue
+        yield {
+            "type": "chunk",
+            "tick": ticks[b - 1],
+            "frames": history[a:b],
+            "logs": logs if i == 0 else [],
+            "total_dmg": None,
+        }
+    yield {"type": "done", "total_dmg": result["total_dmg"], "statistics": result["statistics"],
+           "seed": result["seed"]}
+
+
+def _empty_history(history):
+    if is_delta(history):
+        return dict(history, records=[])
+    return []
+
+
+def merge_stream_event(result: Dict[str, Any], event: Dict[str, Any]) -> Dict[str, Any]:
+    """把一个流式事件并入完整结果（初始传入 {}），done 之后即为 /simulate 的响应内容"""
+    kind = event["type"]
+    if kind == "start":
+        history = event.get("history", [])
+        result.update(history=dict(history, records=[]) if is_delta(history) else [], logs=[], total_dmg=0,
+                      char_names=event["char_names"], statistics=None, seed=event["seed"])
+    elif kind == "chunk":
+        frames = result["history"]["records"] if is_delta(result["history"]) else result["history"]
+        frames.extend(event["frames"])
+        result["logs"].extend(event["logs"])
+    elif kind == "done":
+        result.update(total_dmg=event["total_dmg"], statistics=event["statistics"], seed=event["seed"])
+    return result
@@ -0,0 +1,368 @@
+"""
+有界工作进程池
+每个工作进程通过管道逐个接收任务；任务超时时终止该进程并补充新进程，
+正在运行的计算随之取消（ProcessPoolExecutor 无法中止已开始的任务）。
+并发数与排队上限固定，超出时立即拒绝，不无限堆积。
+
+流式任务（生成器函数）按信用额度逐项回传：工作进程最多领先消费方 window 项，
+消费方每取走一项归还一个额度；消费方提前结束时发送取消，工作进程关闭生成器后回到空闲状态。
+"""
+import asyncio
+import multiprocessing
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+
+class PoolBusyError(RuntimeError):
+    """运行中与排队中的任务已达上限"""
+
+
+class PoolTimeoutError(TimeoutError):
+    """排队等待或任务执行超时"""
+
+    def __init__(self, message: str, queued: bool):
+        super().__init__(message)
+        self.queued = queued  # True: 排队未等到空闲进程; False: 执行超时，任务已取消
+
+
+class TaskError(RuntimeError):
+    """任务在工作进程中抛出异常"""
+
+    def __init__(self, message: str, remote_traceback: str = ""):
+        super().__init__(message)
+        self.remote_traceback = remote_traceback
+
+
+_CANCEL = "cancel"
+_END = object()
+
+
+def _run_stream(conn, fn, args, window):
+    """逐项发送生成器的产出，额度用尽时等待消费方归还额度或取消"""
+    credits = window
+    gen = fn(*args)
+    try:
+        for item in gen:
+            conn.send(("item", item))
+            credits -= 1
+            while credits <= 0 or conn.poll():
+                message = conn.recv()
+                if message == _CANCEL:
+                    conn.send(("cancelled",))
+                    return
+                credits += message
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}", traceback.format_exc()))
+        return
+    finally:
+        gen.close()
+    conn.send(("done",))
+
+
+def _worker_main(conn, initializer, initargs):
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        if not isinstance(job, tuple):  # 流式任务结束后迟到的额度或取消
+            continue
+        fn, args, window = job
+        if window is not None:
+            _run_stream(conn, fn, args, window)
+            continue
+        try:
+            reply = (True, fn(*args), "")
+        except Exception as e:
+            reply = (False, f"{type(e).__name__}: {e}", traceback.format_exc())
+        try:
+            conn.send(reply)
+        except Exception as e:  # 结果无法序列化
+            conn.send((False, f"{type(e).__name__}: {e}", traceback.format_exc()))
+
+
+class _Worker:
+    def __init__(self, ctx, initializer, initargs):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child_conn, initializer, initargs), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, kill: bool = False):
+        if kill:
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class _Stream:
+    """一个进行中的流式任务（在线程中调用）"""
+
+    def __init__(self, pool: "WorkerPool", worker: _Worker, deadline: Optional[float]):
+        self.pool = pool
+        self.worker = worker
+        self.deadline = deadline
+        self.finished = False
+        self._owed = False
+
+    def next(self):
+        """取下一项；结束时返回 _END"""
+        conn = self.worker.conn
+        try:
+            if self._owed:
+                conn.send(1)
+                self._owed = False
+            remaining = None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+            if not conn.poll(remaining):
+                self._kill()
+                raise PoolTimeoutError("流式任务运行超时，已取消", queued=False)
+            message = conn.recv()
+        except (EOFError, OSError) as e:
+            self._kill()
+            raise TaskError(f"工作进程意外退出: {e}") from e
+
+        kind = message[0]
+        if kind == "item":
+            self._owed = True
+            return message[1]
+        self.finished = True
+        if kind == "error":
+            raise TaskError(message[1], message[2])
+        return _END
+
+    def close(self):
+        """归还进程；未结束时先取消，工作进程无响应则终止"""
+        if self.worker is None:
+            return
+        if not self.finished:
+            conn = self.worker.conn
+            try:
+                conn.send(_CANCEL)
+                while True:
+                    if not conn.poll(5):
+                        self._kill()
+                        return
+                    if conn.recv()[0] != "item":
+                        break
+            except (EOFError, OSError):
+                self._kill()
+                return
+        self.pool._release(self.worker)
+        self.worker = None
+
+    def _kill(self):
+        self.worker.stop(kill=True)
+        self.worker = None
+        self.finished = True
+        self.pool._release(None)
+
+
+class _LocalStream:
+    """workers <= 0 时在线程中直接迭代生成器"""
+
+    def __init__(self, gen):
+        self.gen = gen
+
+    def next(self):
+        return next(self.gen, _END)
+
+    def close(self):
+        self.gen.close()
+
+
+class WorkerPool:
+    """
+    有界进程池
+    workers <= 0 时不启动进程，任务在后台线程中运行（无法按超时取消，适合不能创建子进程的部署环境）
+    """
+
+    def __init__(self, workers: int, max_queue: int = 0, timeout: Optional[float] = None,
+                 initializer: Optional[Callable] = None, initargs: Tuple = (), start_method: str = "spawn"):
+        """
+        Args:
+            workers: 并发运行的任务数（进程数），进程在首次需要时启动
+            max_queue: 等待空闲进程的任务数上限，超出时 submit 抛出 PoolBusyError
+            timeout: 默认超时（秒），排队与执行分别计时；None 表示不限
+            initializer: 工作进程启动时调用一次
+            start_method: 进程启动方式，默认 spawn（不继承主进程的线程与事件循环）
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._ctx = multiprocessing.get_context(start_method)
+        self._initializer = initializer
+        self._initargs = initargs
+        self._idle: "queue.LifoQueue[_Worker]" = queue.LifoQueue()
+        self._started = 0
+        self._pending = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._threads = ThreadPoolExecutor(max_workers=max(1, workers) + max_queue,
+                                           thread_name_prefix="worker-pool")
+
+    @property
+    def pending(self) -> int:
+        """运行中与排队中的任务数"""
+        return self._pending
+
+    async def submit(self, fn: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """
+        在工作进程中运行 fn(*args)（fn 与参数需可序列化），不阻塞事件循环
+        Raises:
+            PoolBusyError: 已达并发与排队上限
+            PoolTimeoutError: 排队或执行超时
+            TaskError: 任务抛出异常或工作进程意外退出
+        """
+        self._enter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._threads, self.run, fn, args,
+                                              self.timeout if timeout is None else timeout)
+        finally:
+            self._leave()
+
+    async def stream(self, fn: Callable, *args, timeout: Optional[float] = None, window: int = 4):
+        """
+        在工作进程中运行生成器函数 fn(*args)，异步逐项产出
+        工作进程最多领先 window 项（背压）；迭代提前结束（客户端断开或取消）时通知工作进程停止。
+        timeout 为排队与整个流式任务各自的时限；异常同 submit
+        """
+        timeout = self.timeout if timeout is None else timeout
+        self._enter()
+        loop = asyncio.get_running_loop()
+        handle = None
+        try:
+            handle = await loop.run_in_executor(self._threads, self._open_stream, fn, args, window, timeout)
+            while True:
+                item = await loop.run_in_executor(self._threads, handle.next)
+                if item is _END:
+                    break
+                yield item
+        finally:
+            if handle is not None:
+                # 不在此处等待：取消时事件循环可能正在关闭本生成器
+                self._threads.submit(handle.close)
+            self._leave()
+
+    def _open_stream(self, fn, args, window, timeout):
+        if self.workers <= 0:
+            return _LocalStream(fn(*args))
+        worker = self._acquire(timeout)
+        try:
+            worker.conn.send((fn, args, window))
+        except (OSError, ValueError) as e:
+            worker.stop(kill=True)
+            self._release(None)
+            raise TaskError(f"工作进程意外退出: {e}") from e
+        return _Stream(self, worker, None if timeout is None else time.monotonic() + timeout)
+
+    def _enter(self):
+        with self._lock:
+            if self._closed:
+                raise PoolBusyError("进程池已关闭")
+            if self._pending >= max(1, self.workers) + self.max_queue:
+                raise PoolBusyError("模拟任务已满，请稍后重试")
+            self._pending += 1
+
+    def _leave(self):
+        with self._lock:
+            self._pending -= 1
+
+    def run(self, fn: Callable, args: Tuple = (), timeout: Optional[float] = None) -> Any:
+        """阻塞运行一个任务（不检查排队上限，供 submit 与同步调用方使用）"""
+        if self.workers <= 0:
+            return fn(*args)
+
+        worker = self._acquire(timeout)
+        try:
+            worker.conn.send((fn, args, None))
+            reply = worker.conn.recv() if worker.conn.poll(timeout) else None
+        except (EOFError, OSError) as e:
+            worker.stop(kill=True)
+            self._release(None)
+            raise TaskError(f"工作进程意外退出: {e}") from e
+        if reply is None:
+            worker.stop(kill=True)
+            self._release(None)
+            raise PoolTimeoutError(f"任务运行超过 {timeout}s，已取消", queued=False)
+        self._release(worker)
+
+        ok, value, remote_tb = reply
+        if not ok:
+            raise TaskError(value, remote_tb)
+        return value
+
+    def _acquire(self, timeout: Optional[float]) -> _Worker:
+        """取一个空闲进程；没有空闲进程且未达上限时启动新进程"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                worker = None
+            if worker is not None:
+                return worker
+
+            with self._lock:
+                spawn = self._started < self.workers
+                if spawn:
+                    self._started += 1
+            if spawn:
+                try:
+                    return _Worker(self._ctx, self._initializer, self._initargs)
+                except Exception:
+                    with self._lock:
+                        self._started -= 1
+                    raise
+
+            remaining = None if deadline is None else deadline - time.monotonic()
+            try:
+                if remaining is not None and remaining <= 0:
+                    raise queue.Empty
+                worker = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                raise PoolTimeoutError(f"等待空闲工作进程超过 {timeout}s", queued=True) from None
+            if worker is not None:
+                return worker
+            # 取到的是进程终止后的唤醒标记，回到开头补充进程
+
+    def _release(self, worker: Optional[_Worker]):
+        """归还进程；worker 为 None 表示进程已终止，放入唤醒标记让等待中的任务补充新进程"""
+        if worker is None:
+            with self._lock:
+                self._started -= 1
+            self._idle.put(None)
+            return
+        if self._closed:
+            worker.stop()
+            return
+        self._idle.put(worker)
+
+    def close(self):
+        """关闭进程池：停止空闲进程，运行中的任务结束后其进程随之停止"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if worker is not None:
+                worker.stop()
+        self._threads.shutdown(wait=False)
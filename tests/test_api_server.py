@@ -0,0 +1,125 @@
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+from core.config_manager import get_config
+
+
+def simulation_request(**overrides):
+    request = {
+        "duration": 10,
+        "seed": 7,
+        "enemy": {"defense": 100},
+        "characters": [{"name": "陈千语", "script": "a1\na2\na3\nskill"}],
+    }
+    request.update(overrides)
+    return request
+
+
+class TestApiServer(unittest.TestCase):
+    """在临时目录中的武器/装备库上运行接口，不读写仓库内的数据文件"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        os.environ.setdefault("SIM_JOB_DB", os.path.join(cls.tmp.name, "jobs.db"))
+        import api_server
+        from core.equipment_system import EquipmentManager
+        from core.weapon_system import WeaponManager
+        from simulation.result_cache import ResultCache
+        from simulation.worker_pool import WorkerPool
+
+        cls.config = get_config()
+        cls._log_level = cls.config.log_level
+        cls.config.log_level = "ERROR"
+
+        cls.api = api_server
+        cls._saved = {name: getattr(api_server, name)
+                      for name in ("weapon_manager", "equipment_manager", "result_cache", "simulation_pool")}
+        api_server.weapon_manager = WeaponManager(os.path.join(cls.tmp.name, "weapons.json"))
+        api_server.equipment_manager = EquipmentManager(os.path.join(cls.tmp.name, "equipment"))
+        api_server.result_cache = ResultCache()
+        api_server.simulation_pool = WorkerPool(workers=0)
+        cls.client = TestClient(api_server.app)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.api.simulation_pool.close()
+        for name, value in cls._saved.items():
+            setattr(cls.api, name, value)
+        cls.config.log_level = cls._log_level
+        cls.tmp.cleanup()
+
+    def test_rejects_unknown_crit_mode(self):
+        response = self.client.post("/simulate", json=simulation_request(crit_mode="average"))
+        self.assertEqual(response.status_code, 422)
+
+        response = self.client.post("/simulate", json=simulation_request(crit_mode="expected"))
+        self.assertEqual(response.status_code, 200)
+
+    def simulate(self, request):
+        """返回 (总伤害, 是否命中缓存)"""
+        cache = self.api.result_cache
+        hits = cache.hits
+        response = self.client.post("/simulate", json=request)
+        self.assertEqual(response.status_code, 200)
+        return response.json()["total_dmg"], cache.hits > hits
+
+    def assertEvicted(self, key):
+        """修改后的武器/装备内容不同，键本身也会变；这里确认旧结果已从缓存中清除"""
+        self.assertIsNone(self.api.result_cache.get(key))
+
+    def cache_key(self, request):
+        return self.api.simulation_cache_entry(self.api.SimulationRequest(**request))[0]
+
+    def test_gear_edits_invalidate_cached_results(self):
+        weapon = self.client.post("/weapons", json={
+            "name": "测试长刃", "description": "", "weapon_atk": 500, "stat_bonuses": {"atk_pct": 0.1},
+        }).json()
+        equipment = self.client.post("/equipments", json={
+            "name": "测试手套", "description": "", "slot": "gloves", "stat_bonuses": {"atk_pct": 0.1},
+        }).json()
+        request = simulation_request(characters=[{
+            "name": "陈千语", "script": "a1\na2\na3\nskill",
+            "weapon_id": weapon["id"], "equipment_ids": {"gloves": equipment["id"]},
+        }])
+
+        total, cached = self.simulate(request)
+        self.assertFalse(cached)
+        self.assertEqual(self.simulate(request), (total, True))
+
+        key = self.cache_key(request)
+        response = self.client.put(f"/weapons/{weapon['id']}", json={"weapon_atk": 800})
+        self.assertEqual(response.status_code, 200)
+        self.assertEvicted(key)
+        stronger, cached = self.simulate(request)
+        self.assertFalse(cached)
+        self.assertGreater(stronger, total)
+
+        key = self.cache_key(request)
+        response = self.client.put(f"/equipments/{equipment['id']}", json={"stat_bonuses": {"atk_pct": 0.5}})
+        self.assertEqual(response.status_code, 200)
+        self.assertEvicted(key)
+        strongest, cached = self.simulate(request)
+        self.assertFalse(cached)
+        self.assertGreater(strongest, stronger)
+        self.assertEqual(self.simulate(request), (strongest, True))
+
+        key = self.cache_key(request)
+        self.assertEqual(self.client.delete(f"/equipments/{equipment['id']}").status_code, 200)
+        self.assertEvicted(key)
+        without_gloves, cached = self.simulate(request)
+        self.assertFalse(cached)
+        self.assertLess(without_gloves, strongest)
+
+        key = self.cache_key(request)
+        self.assertEqual(self.client.delete(f"/weapons/{weapon['id']}").status_code, 200)
+        self.assertEvicted(key)
+        _, cached = self.simulate(request)
+        self.assertFalse(cached)
+
+
+if __name__ == '__main__':
+    unittest.main()
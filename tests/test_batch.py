@@ -0,0 +1,47 @@
+import unittest
+
+from simulation.batch import CharacterSpec, EnemySpec, RunSpec, run_batch
+
+
+def make_spec(seed, run_id=None, crit_mode=None):
+    return RunSpec(
+        characters=[
+            CharacterSpec("陈千语", script=["a1", "a2", "a3", "a4", "a5", "wait 3.0", "ult", "skill"]),
+            CharacterSpec("艾尔黛拉", script=["qte", "skill"]),
+        ],
+        enemy=EnemySpec(defense=100),
+        duration=15.0,
+        seed=seed,
+        crit_mode=crit_mode,
+        run_id=run_id,
+    )
+
+
+class TestBatch(unittest.TestCase):
+    def test_serial_and_parallel_agree(self):
+        specs = [make_spec(seed) for seed in range(6)]
+        serial = run_batch(specs, max_workers=1)
+        parallel = run_batch(specs, max_workers=2)
+
+        self.assertEqual([r.run_id for r in serial], [str(i) for i in range(6)])
+        for a, b in zip(serial, parallel):
+            self.assertIsNone(a.error)
+            self.assertEqual(a.seed, b.seed)
+            self.assertEqual(a.total_damage, b.total_damage)
+            self.assertGreater(a.total_damage, 0)
+            self.assertAlmostEqual(sum(a.damage_by_character.values()), a.total_damage)
+
+    def test_expected_crit_mode_is_seed_independent(self):
+        results = run_batch([make_spec(seed, crit_mode="expected") for seed in (1, 2)], max_workers=1)
+        self.assertEqual(results[0].total_damage, results[1].total_damage)
+        self.assertGreater(results[0].damage_std, 0)
+
+    def test_unknown_character_is_reported(self):
+        spec = RunSpec(characters=[CharacterSpec("不存在")], run_id="bad")
+        result = run_batch([spec], max_workers=1)[0]
+        self.assertEqual(result.run_id, "bad")
+        self.assertIsNotNone(result.error)
+
+
+if __name__ == '__main__':
+    unittest.main()
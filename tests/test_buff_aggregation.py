@@ -0,0 +1,99 @@
+import unittest
+
+from core.stats import StatKey
+from mechanics.buff_system import (
+    Buff, BuffManager, CorrosionBuff, ShatterArmorBuff, StatModifierBuff, VulnerabilityBuff,
+)
+
+
+class Owner:
+    name = "木桩"
+
+
+class DoubleAtkBuff(Buff):
+    """动态Buff：攻击加成翻倍，结果依赖前面已叠加的固定增量"""
+    def __init__(self):
+        super().__init__("翻倍", 5.0)
+
+    def modify_stats(self, stats):
+        stats["atk_pct"] = stats.get("atk_pct", 0.0) * 2
+
+
+def naive_stats(manager, base):
+    stats = dict(base)
+    for b in manager.buffs:
+        b.modify_stats(stats)
+    return stats
+
+
+class TestBuffAggregation(unittest.TestCase):
+    BASE = {"atk_pct": 0.1, StatKey.PHYS_VULN: 0.0, "heat_res": 0.2, "physical_res": 0.1}
+
+    def assertMatchesNaive(self, manager):
+        stats = dict(self.BASE)
+        manager.apply_stats(stats)
+        expected = naive_stats(manager, self.BASE)
+        self.assertEqual(stats.keys(), expected.keys())
+        for key in expected:
+            self.assertAlmostEqual(stats[key], expected[key], places=12, msg=key)
+
+    def test_add_stack_and_remove(self):
+        manager = BuffManager(Owner())
+        manager.add_buff(StatModifierBuff("攻击", 5.0, {"atk_pct": 0.2, "new_key": 0.5}, max_stacks=3))
+        manager.add_buff(ShatterArmorBuff())
+        manager.add_buff(CorrosionBuff())
+        self.assertMatchesNaive(manager)
+
+        manager.add_buff(StatModifierBuff("攻击", 5.0, {"atk_pct": 0.2, "new_key": 0.5}, max_stacks=3))
+        self.assertMatchesNaive(manager)
+
+        manager.remove_buff("碎甲")
+        self.assertMatchesNaive(manager)
+
+        manager.remove_buff("攻击")
+        stats = {}
+        manager.apply_stats(stats)
+        self.assertNotIn("new_key", stats)
+
+    def test_expiry_clears_contributions(self):
+        manager = BuffManager(Owner())
+        manager.add_buff(VulnerabilityBuff("短易伤", 0.2, 0.1, "physical"))
+        manager.add_buff(VulnerabilityBuff("长易伤", 5.0, 0.3, "physical"))
+
+        class Engine:
+            tick = 0
+            def wants_log(self, *args, **kwargs):
+                return False
+            def log(self, *args, **kwargs):
+                pass
+
+        for _ in range(3):
+            manager.tick_all(Engine())
+
+        self.assertEqual([b.name for b in manager.buffs], ["长易伤"])
+        self.assertMatchesNaive(manager)
+        stats = {StatKey.PHYS_VULN: 0.0}
+        manager.apply_stats(stats)
+        self.assertAlmostEqual(stats[StatKey.PHYS_VULN], 0.3, places=12)
+
+    def test_dynamic_buffs_keep_application_order(self):
+        manager = BuffManager(Owner())
+        manager.add_buff(StatModifierBuff("攻击", 5.0, {"atk_pct": 0.2}))
+        manager.add_buff(DoubleAtkBuff())
+        manager.add_buff(StatModifierBuff("攻击2", 5.0, {"atk_pct": 0.3}))
+        manager.add_buff(CorrosionBuff())
+        # 腐蚀之后才出现的抗性键不受腐蚀影响
+        manager.add_buff(StatModifierBuff("灼热抗性", 5.0, {"extra_res": 0.1}))
+        self.assertMatchesNaive(manager)
+
+        stats = {}
+        manager.apply_stats(stats)
+        self.assertAlmostEqual(stats["atk_pct"], 0.7, places=12)
+        self.assertAlmostEqual(stats["extra_res"], 0.1, places=12)
+
+        manager.remove_buff("翻倍")
+        self.assertMatchesNaive(manager)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import struct
+import tempfile
+import unittest
+import zlib
+
+from core.config_manager import get_config
+from simulation import checkpoint
+from simulation.batch import CharacterSpec, EnemySpec, RunSpec, build_simulation, load_context, run_spec
+from simulation.checkpoint import CheckpointError
+from simulation.event_system import EventType
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+        self.context = load_context()
+        self.spec = RunSpec(
+            characters=[
+                CharacterSpec("莱瓦汀", script=["skill", "wait 2.0", "a1", "a2", "a3", "ult", "qte"]),
+                CharacterSpec("狼卫", script=["wait 1", "skill", "wait 4", "ult", "qte"]),
+                CharacterSpec("安塔尔", script=["skill", "a1", "a2", "ult"]),
+            ],
+            enemy=EnemySpec(defense=100),
+            duration=20.0,
+            seed=4,
+        )
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def build(self):
+        return build_simulation(self.spec, self.context)[0]
+
+    def start(self):
+        engine, target = build_simulation(self.spec, self.context)
+        engine.event_bus.emit_simple(EventType.COMBAT_START, tick=engine.tick)
+        return engine, target
+
+    def test_resume_mid_action_matches_full_run(self):
+        expected = run_spec(self.spec, self.context)
+
+        engine, target = self.start()
+        engine.run_until(47, fast_forward=True)
+        data = checkpoint.dumps(engine)
+        engine.dispose()
+
+        self.assertEqual(checkpoint.read_meta(data)["tick"], 47)
+        resumed = checkpoint.loads(data, self.build)
+        resumed.run_until(200, fast_forward=True)
+        resumed_target = resumed.entities[0]
+        self.assertEqual(resumed_target.total_damage_taken, expected.total_damage)
+        self.assertEqual(resumed.statistics.get_damage_std(), expected.damage_std)
+
+    def test_run_with_checkpoints_resumes_from_file(self):
+        expected = run_spec(self.spec, self.context).total_damage
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "opening.ckpt")
+            engine, _ = self.start()
+            checkpoint.run_with_checkpoints(engine, 120, path, interval=50)
+            engine.dispose()
+
+            # 同一份开场可被多次加载，彼此独立
+            first = checkpoint.load_checkpoint(path, self.build)
+            second = checkpoint.load_checkpoint(path, self.build)
+            self.assertEqual(first.tick, 120)
+            checkpoint.run_with_checkpoints(first, 200, path, interval=50)
+            self.assertEqual(first.entities[0].total_damage_taken, expected)
+            self.assertEqual(second.tick, 120)
+            self.assertLess(second.entities[0].total_damage_taken, expected)
+
+    def test_rejects_other_versions_and_teams(self):
+        engine, _ = self.start()
+        engine.run_until(10)
+        data = checkpoint.dumps(engine)
+        magic, version = struct.unpack_from("<4sH", data)
+
+        with self.assertRaises(CheckpointError):
+            checkpoint.loads(struct.pack("<4sH", magic, version + 1) + data[6:], self.build)
+        with self.assertRaises(CheckpointError):
+            checkpoint.loads(b"not a checkpoint", self.build)
+        self.spec.characters.pop()
+        with self.assertRaises(CheckpointError):
+            checkpoint.loads(data, self.build)
+
+    def test_only_loads_registered_types(self):
+        engine, _ = self.start()
+        engine.run_until(30)
+        state = json.loads(zlib.decompress(checkpoint.dumps(engine)[6:]))
+        buffs = state["engine"]["entities"][0]["buffs"]["buffs"]
+        self.assertTrue(buffs)
+        buffs[0]["type"] = "os:system"
+        forged = struct.pack("<4sH", checkpoint.MAGIC, checkpoint.CHECKPOINT_VERSION) + zlib.compress(
+            json.dumps(state).encode("utf-8"))
+        with self.assertRaises(CheckpointError):
+            checkpoint.loads(forged, self.build)
+
+
+if __name__ == '__main__':
+    unittest.main()
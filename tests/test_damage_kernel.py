@@ -0,0 +1,109 @@
+import random
+import unittest
+
+from core.calculator import (
+    DamageEngine, DamageKernel, element_codes, move_type_codes, stats_array,
+)
+from core.enums import Element, MoveType
+from core.stats import StatKey
+
+
+ATTACKER_KEYS = [
+    StatKey.CRIT_RATE, StatKey.CRIT_DMG, StatKey.DMG_BONUS, StatKey.PHYSICAL_DMG_BONUS,
+    StatKey.MAGIC_DMG_BONUS, StatKey.NORMAL_DMG_BONUS, StatKey.SKILL_DMG_BONUS,
+    StatKey.ULT_DMG_BONUS, StatKey.QTE_DMG_BONUS, 'heavy_dmg_bonus', 'plunge_dmg_bonus',
+    'execution_dmg_bonus', 'stagger_dmg_bonus', StatKey.AMPLIFICATION,
+    'physical_amplification', 'magic_amplification', StatKey.RES_PEN, StatKey.SPECIAL_BONUS,
+] + [f"{e.value}_dmg_bonus" for e in Element] + [f"{e.value}_amplification" for e in Element]
+
+TARGET_KEYS = [
+    'dmg_reduction', StatKey.VULNERABILITY, StatKey.MAGIC_VULN, StatKey.PHYS_VULN,
+    'sanctuary', StatKey.FRAGILITY, 'dmg_reduction_extra',
+] + [f"{e.value}_vulnerability" for e in Element] + [f"{e.value}_fragility" for e in Element] \
+  + [f"{e.value}_res" for e in Element]
+
+
+def random_stats(rng, keys):
+    # 随机缺省部分键，覆盖 .get 默认值分支
+    return {key: rng.uniform(-0.3, 1.2) for key in keys if rng.random() < 0.7}
+
+
+class TestDamageKernel(unittest.TestCase):
+    def test_matches_reference_formula(self):
+        rng = random.Random(20240601)
+        kernel = DamageKernel(max_entries=64)
+
+        for _ in range(3000):
+            attacker = random_stats(rng, ATTACKER_KEYS)
+            attacker[StatKey.FINAL_ATK] = rng.uniform(100, 5000)
+            if rng.random() < 0.3:
+                attacker['non_main_penalty'] = rng.uniform(0.5, 1.0)
+            target = random_stats(rng, TARGET_KEYS)
+            target[StatKey.DEFENSE] = rng.choice([0, 100, rng.uniform(-50, 2000)])
+            target['is_staggered'] = rng.random() < 0.5
+
+            element = rng.choice(list(Element))
+            move_type = rng.choice(list(MoveType))
+            # 同一组快照重复命中，覆盖缓存命中路径
+            for _ in range(3):
+                mv = rng.uniform(10, 800)
+                for is_crit, expected in ((False, False), (True, False), (False, True)):
+                    reference = DamageEngine.calculate(attacker, target, mv, element, move_type,
+                                                       is_crit=is_crit, expected_crit=expected)
+                    result = kernel.calculate(attacker, target, mv, element, move_type,
+                                              is_crit=is_crit, expected_crit=expected)
+                    self.assertEqual(result, reference)
+                    self.assertIs(type(result), type(reference))
+
+
+class TestCalculateBatch(unittest.TestCase):
+    def test_matches_scalar_formula(self):
+        import numpy as np
+
+        rng = random.Random(7)
+        attackers, targets, mvs, elements, move_types, crits = [], [], [], [], [], []
+        for _ in range(2000):
+            attacker = random_stats(rng, ATTACKER_KEYS)
+            attacker[StatKey.FINAL_ATK] = rng.uniform(100, 5000)
+            if rng.random() < 0.3:
+                attacker['non_main_penalty'] = rng.uniform(0.5, 1.0)
+            target = random_stats(rng, TARGET_KEYS)
+            target[StatKey.DEFENSE] = rng.uniform(-50, 2000)
+            target['is_staggered'] = rng.random() < 0.5
+            attackers.append(attacker)
+            targets.append(target)
+            mvs.append(rng.uniform(10, 800))
+            elements.append(rng.choice(list(Element)))
+            move_types.append(rng.choice(list(MoveType)))
+            crits.append(rng.random() < 0.5)
+
+        attacker_arr = stats_array(attackers, ATTACKER_KEYS + [StatKey.FINAL_ATK, 'non_main_penalty'])
+        target_arr = stats_array(targets)
+        args = (attacker_arr, target_arr, np.array(mvs), element_codes(elements), move_type_codes(move_types))
+
+        for expected in (False, True):
+            batch = DamageEngine.calculate_batch(*args, is_crit=np.array(crits), expected_crit=expected)
+            reference = [
+                DamageEngine.calculate(a, t, mv, e, m, is_crit=c, expected_crit=expected)
+                for a, t, mv, e, m, c in zip(attackers, targets, mvs, elements, move_types, crits)
+            ]
+            self.assertEqual(batch.tolist(), reference)
+
+    def test_broadcasts_variants_over_rotation(self):
+        import numpy as np
+
+        base = {StatKey.FINAL_ATK: 1000.0, StatKey.CRIT_RATE: 0.2, StatKey.CRIT_DMG: 1.0}
+        variants = stats_array([dict(base, crit_rate=0.2 + 0.01 * i) for i in range(5)])
+        target = stats_array([{StatKey.DEFENSE: 100.0, "heat_res": 0.1}])
+        rotation_mv = np.array([120.0, 250.0, 400.0])
+        elements = element_codes([Element.HEAT, Element.PHYSICAL, Element.HEAT])
+        moves = move_type_codes([MoveType.NORMAL, MoveType.SKILL, MoveType.ULTIMATE])
+
+        damage = DamageEngine.calculate_batch(variants[:, None], target, rotation_mv, elements, moves,
+                                              expected_crit=True)
+        self.assertEqual(damage.shape, (5, 3))
+        self.assertTrue(np.all(np.diff(damage.sum(axis=1)) > 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+from core.config_manager import get_config
+from core.stats import StatKey
+from entities.characters.dapan_sim import DaPanSim
+from entities.characters.dapan_constants import MECHANICS
+from entities.dummy import DummyEnemy
+from simulation.engine import SimEngine
+
+
+def base_panel(actor):
+    """基类缓存的面板（不含天赋二加成）"""
+    return super(DaPanSim, actor).get_current_panel()
+
+
+class TestDapanTalentPanel(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+        self.engine = SimEngine(seed=1)
+        self.target = DummyEnemy(self.engine, "测试机甲", defense=100)
+        self.dapan = DaPanSim(self.engine, self.target)
+        self.engine.entities.extend([self.target, self.dapan])
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.config.log_level = self._log_level
+
+    def test_bonus_does_not_accumulate(self):
+        base = dict(base_panel(self.dapan))
+        self.target.reaction_mgr.phys_break_stacks = 2
+        bonus = 2 * MECHANICS["talent_2_bonus_per_stack"]
+
+        first = self.dapan.get_current_panel()
+        for _ in range(5):
+            panel = self.dapan.get_current_panel()
+        self.assertIs(panel, first)
+        self.assertAlmostEqual(panel[StatKey.PHYSICAL_DMG_BONUS], base[StatKey.PHYSICAL_DMG_BONUS] + bonus)
+        # 基类缓存的面板保持不变
+        self.assertEqual(base_panel(self.dapan), base)
+
+    def test_bonus_follows_break_stacks(self):
+        base = dict(base_panel(self.dapan))
+        per_stack = MECHANICS["talent_2_bonus_per_stack"]
+
+        self.target.reaction_mgr.phys_break_stacks = 1
+        self.assertAlmostEqual(self.dapan.get_current_panel()[StatKey.PHYSICAL_DMG_BONUS],
+                               base[StatKey.PHYSICAL_DMG_BONUS] + per_stack)
+        self.target.reaction_mgr.phys_break_stacks = 3
+        self.assertAlmostEqual(self.dapan.get_current_panel()[StatKey.PHYSICAL_DMG_BONUS],
+                               base[StatKey.PHYSICAL_DMG_BONUS] + 3 * per_stack)
+        self.target.reaction_mgr.phys_break_stacks = 0
+        self.assertEqual(self.dapan.get_current_panel(), base)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+from core.config_manager import get_config
+from core.enums import ReactionType
+from core.stats import StatKey
+from entities.dummy import DummyEnemy
+from mechanics.buff_system import CorrosionBuff, ShatterArmorBuff
+from simulation.engine import SimEngine
+
+
+class TestDefenseStatsCache(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+        self.engine = SimEngine(seed=1)
+        self.enemy = DummyEnemy(self.engine, "测试机甲", defense=100, resistances={})
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def test_cached_until_buffs_change(self):
+        first = self.enemy.get_defense_stats()
+        self.assertIs(self.enemy.get_defense_stats(), first)
+
+        self.enemy.add_buff(ShatterArmorBuff(), self.engine)
+        shattered = self.enemy.get_defense_stats()
+        self.assertIsNot(shattered, first)
+        self.assertGreater(shattered[StatKey.PHYS_VULN], 0)
+
+        self.enemy.buffs.remove_buff("碎甲")
+        self.assertNotIn(StatKey.PHYS_VULN, self.enemy.get_defense_stats())
+
+    def test_stagger_invalidates(self):
+        self.assertFalse(self.enemy.get_defense_stats()["is_staggered"])
+        self.enemy.apply_stagger(self.enemy.stagger_max, self.engine)
+        self.assertTrue(self.enemy.get_defense_stats()["is_staggered"])
+
+    def test_corrosion_deepening_invalidates(self):
+        self.enemy.add_buff(CorrosionBuff(), self.engine)
+        before = self.enemy.get_defense_stats()["heat_res"]
+        for _ in range(10):
+            self.enemy.on_tick(self.engine)
+        after = self.enemy.get_defense_stats()["heat_res"]
+        self.assertLess(after, before)
+
+        self.assertTrue(self.enemy.buffs.consume_tag(ReactionType.CORROSION))
+        self.assertEqual(self.enemy.get_defense_stats()["heat_res"], 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import gc
+import unittest
+import weakref
+
+from core.config_manager import get_config
+from entities.characters.wolfguard_sim import WolfguardSim
+from entities.dummy import DummyEnemy
+from simulation.engine import SimEngine
+from simulation.event_system import EventType
+
+
+class TestEngineDispose(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def test_scope_close_unsubscribes(self):
+        engine = SimEngine(seed=1)
+        scope = engine.event_bus.create_scope()
+        scope.subscribe(EventType.POST_DAMAGE, lambda e: None, source="甲")
+        scope.subscribe_all(lambda e: None)
+
+        scope.close()
+
+        self.assertEqual(len(scope), 0)
+        self.assertEqual(engine.event_bus.get_listener_count(), 0)
+
+    def test_dispose_releases_entities(self):
+        engine = SimEngine(seed=1)
+        target = DummyEnemy(engine, "测试机甲", defense=100)
+        char = WolfguardSim(engine, target)
+        char.set_script(["skill", "a1", "a2"])
+        engine.entities.extend([target, char])
+        self.assertGreater(engine.event_bus.get_listener_count(), 0)
+
+        engine.run(max_seconds=3)
+        engine.dispose()
+
+        self.assertEqual(engine.entities, [])
+        self.assertEqual(engine.event_bus.get_listener_count(), 0)
+
+        engine_ref = weakref.ref(engine)
+        del engine, target, char
+        gc.collect()
+        self.assertIsNone(engine_ref())
+
+
+if __name__ == '__main__':
+    unittest.main()
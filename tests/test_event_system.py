@@ -0,0 +1,66 @@
+import unittest
+
+from simulation.event_system import Event, EventBus, EventType
+
+
+class Named:
+    def __init__(self, name):
+        self.name = name
+
+
+class TestFilteredSubscriptions(unittest.TestCase):
+    def setUp(self):
+        self.bus = EventBus()
+        self.alice = Named("甲")
+        self.bob = Named("乙")
+        self.enemy = Named("木桩")
+
+    def test_source_filter_matches_object_and_data(self):
+        calls = []
+        self.bus.subscribe(EventType.POST_DAMAGE, lambda e: calls.append("obj"), source=self.alice)
+        self.bus.subscribe(EventType.CRIT_DEALT, lambda e: calls.append("data"), source="甲")
+
+        self.bus.emit(Event(EventType.POST_DAMAGE, {}, source=self.bob, target=self.enemy))
+        self.bus.emit(Event(EventType.POST_DAMAGE, {}, source=self.alice, target=self.enemy))
+        self.bus.emit_simple(EventType.CRIT_DEALT, attacker="乙", target="木桩")
+        self.bus.emit_simple(EventType.CRIT_DEALT, attacker="甲", target="木桩")
+
+        self.assertEqual(calls, ["obj", "data"])
+
+    def test_target_filter(self):
+        calls = []
+        self.bus.subscribe(EventType.REACTION_TRIGGERED, lambda e: calls.append(e.get("level")),
+                           target=self.enemy)
+
+        self.bus.emit_simple(EventType.REACTION_TRIGGERED, target="其他", level=1)
+        self.bus.emit_simple(EventType.REACTION_TRIGGERED, target="木桩", level=2)
+
+        self.assertEqual(calls, [2])
+
+    def test_priority_order_across_filtered_and_unfiltered(self):
+        calls = []
+        self.bus.subscribe(EventType.ACTION_START, lambda e: calls.append("low"), priority=0)
+        self.bus.subscribe(EventType.ACTION_START, lambda e: calls.append("mid"), priority=50,
+                           source=self.alice)
+        self.bus.subscribe(EventType.ACTION_START, lambda e: calls.append("high"), priority=100)
+
+        self.bus.emit(Event(EventType.ACTION_START, {}, source=self.alice))
+        self.bus.emit(Event(EventType.ACTION_START, {}, source=self.bob))
+
+        self.assertEqual(calls, ["high", "mid", "low", "high", "low"])
+
+    def test_unsubscribe_invalidates_routes(self):
+        calls = []
+        listener = self.bus.subscribe(EventType.POST_DAMAGE, lambda e: calls.append(1), source=self.alice)
+        event = Event(EventType.POST_DAMAGE, {}, source=self.alice)
+
+        self.bus.emit(event)
+        self.bus.unsubscribe(EventType.POST_DAMAGE, listener)
+        self.bus.emit(event)
+
+        self.assertEqual(calls, [1])
+        self.assertFalse(self.bus.has_listeners(EventType.POST_DAMAGE))
+
+
+if __name__ == '__main__':
+    unittest.main()
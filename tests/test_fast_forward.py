@@ -0,0 +1,98 @@
+import unittest
+
+from core.config_manager import get_config
+from entities.characters.admin_sim import AdminSim
+from entities.characters.antal_sim import AntalSim
+from entities.characters.chen_sim import ChenSim
+from entities.characters.erdila_sim import ErdilaSim
+from entities.characters.levatine_sim import LevatineSim
+from entities.characters.wolfguard_sim import WolfguardSim
+from entities.dummy import DummyEnemy
+from simulation.engine import SimEngine
+from simulation.presets import PRESETS
+
+
+HEAT_TEAM = [
+    {"class": LevatineSim, "script": ["skill", "wait 2.0", "a1", "a2", "a3", "ult", "a1", "a2", "a3", "wait 6.0", "qte"]},
+    {"class": WolfguardSim, "script": ["wait 1.0", "skill", "wait 4.0", "ult", "qte"]},
+    {"class": AntalSim, "script": ["skill", "wait 8.0", "ult", "a1", "a2"]},
+]
+
+# 四人轮流等待技力释放战技，大部分时间都在等技力
+SP_GATED_TEAM = [
+    {"class": cls, "script": ["a1", "wait 10.0", "skill", "wait 10.0"] * 4}
+    for cls in (ChenSim, AdminSim, ErdilaSim, AntalSim)
+]
+
+# 单人连续释放战技：第三次起每次都要等技力回复 100 点
+SKILL_SPAM_TEAM = [{"class": LevatineSim, "script": ["skill"] * 6}]
+
+
+def run_team(team, fast_forward, seconds=30, seed=1234):
+    sim = SimEngine(seed=seed)
+    target = DummyEnemy(sim, "测试机甲", defense=100)
+    sim.entities.append(target)
+    for member in team:
+        char = member["class"](sim, target)
+        char.set_script(list(member["script"]))
+        sim.entities.append(char)
+    steps = []
+    step = sim.step
+    sim.step = lambda: (steps.append(sim.tick), step())
+    sim.run(max_seconds=seconds, fast_forward=fast_forward)
+    sim.steps = len(steps)
+    return sim, target
+
+
+class TestFastForward(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def assertSameRun(self, team):
+        normal, normal_target = run_team(team, fast_forward=False)
+        fast, fast_target = run_team(team, fast_forward=True)
+
+        self.assertEqual(normal.tick, fast.tick)
+        self.assertEqual(normal_target.total_damage_taken, fast_target.total_damage_taken)
+        self.assertEqual(normal.party_manager.sp, fast.party_manager.sp)
+        self.assertEqual(
+            [(r.tick, r.source, r.skill_name, r.damage) for r in normal.statistics.damage_records],
+            [(r.tick, r.source, r.skill_name, r.damage) for r in fast.statistics.damage_records],
+        )
+        return normal, fast
+
+    def test_preset_team(self):
+        preset = next(iter(PRESETS.values()))
+        self.assertSameRun(preset["team"])
+
+    def test_heat_team_with_dots(self):
+        self.assertSameRun(HEAT_TEAM)
+
+    def test_waiting_for_sp_skips_ticks(self):
+        normal, fast = self.assertSameRun(SP_GATED_TEAM)
+        self.assertEqual(normal.steps, normal.tick)
+        self.assertLess(fast.steps * 3, fast.tick)
+
+    def test_matches_pre_fast_forward_results(self):
+        """固定种子的结果与引入快进前逐帧累加技力时一致"""
+        preset = next(iter(PRESETS.values()))
+        for fast_forward in (False, True):
+            with self.subTest(fast_forward=fast_forward):
+                _, target = run_team(preset["team"], fast_forward, seconds=60)
+                self.assertEqual(target.total_damage_taken, 30418)
+                _, target = run_team(HEAT_TEAM, fast_forward, seconds=60)
+                self.assertAlmostEqual(target.total_damage_taken, 130035.06, places=6)
+
+                sim, target = run_team(SKILL_SPAM_TEAM, fast_forward, seconds=60)
+                self.assertAlmostEqual(target.total_damage_taken, 6858.9404, places=6)
+                casts = [r.tick for r in sim.statistics.damage_records if r.skill_name == "焚灭(起手)"]
+                self.assertEqual(casts, [6, 22, 131, 256, 381, 506])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import itertools
+import random
+import tempfile
+import unittest
+from dataclasses import replace
+
+from core.config_manager import get_config
+from core.equipment_system import Equipment, EquipmentManager, EquipmentSetManager
+from simulation.batch import CharacterSpec, EnemySpec, RunSpec, load_context, run_spec
+from simulation.gear_optimizer import GearOptimizer, prune_dominated
+
+STAT_POOL = ["atk_pct", "crit_rate", "crit_dmg", "skill_dmg_bonus", "physical_dmg_bonus", "strength", "agility"]
+
+
+def make_item(rng, slot, index):
+    keys = rng.sample(STAT_POOL, 2)
+    bonuses = {key: (rng.randint(5, 40) if key in ("strength", "agility") else rng.uniform(0.02, 0.2))
+               for key in keys}
+    return Equipment(id=f"{slot}-{index}", name=f"{slot}{index}", description="", slot=slot,
+                     stat_bonuses=bonuses)
+
+
+class TestPruneDominated(unittest.TestCase):
+    def test_keeps_items_dominated_by_fewer_than_keep(self):
+        items = [
+            Equipment("a", "a", "", "gloves", {"atk_pct": 0.2, "crit_rate": 0.1}),
+            Equipment("b", "b", "", "gloves", {"atk_pct": 0.1, "crit_rate": 0.1}),
+            Equipment("c", "c", "", "gloves", {"atk_pct": 0.1}),
+            Equipment("d", "d", "", "gloves", {"crit_dmg": 0.3}),
+            Equipment("e", "e", "", "gloves", {"atk_pct": 0.2, "crit_rate": 0.1}),
+        ]
+        group = lambda item: (item.set_id,)
+        self.assertEqual([i.id for i in prune_dominated(items, 1, group)], ["a", "d"])
+        self.assertEqual([i.id for i in prune_dominated(items, 2, group)], ["a", "d", "e"])
+        self.assertEqual([i.id for i in prune_dominated(items, 3, group)], ["a", "b", "d", "e"])
+        # 不同套装不互相支配
+        items[2].set_id = "套装"
+        self.assertIn("c", [i.id for i in prune_dominated(items, 1, group)])
+
+
+class TestGearOptimizer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.config = get_config()
+        cls._log_level = cls.config.log_level
+        cls.config.log_level = "ERROR"
+
+        cls.tmp = tempfile.TemporaryDirectory()
+        context = load_context()
+        equipment_manager = EquipmentManager(cls.tmp.name)
+        rng = random.Random(11)
+        for slot, count in (("gloves", 5), ("armor", 4), ("accessory_1", 5)):
+            for i in range(count):
+                item = make_item(rng, slot, i)
+                equipment_manager.equipments[item.id] = item
+        cls.context = replace(context, equipment_manager=equipment_manager,
+                              set_manager=EquipmentSetManager(cls.tmp.name))
+        cls.weapon_id = context.weapon_manager.get_all()[0].id
+        cls.spec = RunSpec(
+            characters=[CharacterSpec("陈千语", script=["a1", "a2", "a3", "a4", "a5", "skill", "wait 2.0", "ult"],
+                                      weapon_id=cls.weapon_id)],
+            enemy=EnemySpec(defense=100),
+            duration=12.0,
+            seed=5,
+            crit_mode="expected",
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.config.log_level = cls._log_level
+        cls.tmp.cleanup()
+
+    def brute_force(self):
+        items = self.context.equipment_manager.get_all()
+        by_slot = {slot: [e.id for e in items if e.slot == slot] for slot in ("gloves", "armor", "accessory_1")}
+        totals = []
+        for gloves, armor, (acc1, acc2) in itertools.product(
+                by_slot["gloves"], by_slot["armor"], itertools.combinations(by_slot["accessory_1"], 2)):
+            ids = {"gloves": gloves, "armor": armor, "accessory_1": acc1, "accessory_2": acc2}
+            spec = replace(self.spec, characters=[replace(self.spec.characters[0], equipment_ids=ids)])
+            totals.append(run_spec(spec, self.context).total_damage)
+        return sorted(totals, reverse=True)
+
+    def test_top_k_matches_brute_force(self):
+        result = GearOptimizer(self.spec, "陈千语", top_k=3, weapon_ids=[self.weapon_id],
+                               context=self.context, max_workers=1).run()
+
+        expected = self.brute_force()[:3]
+        self.assertEqual(len(result.builds), 3)
+        for build, total in zip(result.builds, expected):
+            self.assertTrue(build.repriced)
+            self.assertAlmostEqual(build.total_damage, total, places=6)
+        self.assertEqual(result.stats.simulated, 0)
+        # 枚举空间为 5×4×10，分支定界应剪掉一部分分支
+        self.assertLess(result.stats.repriced, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
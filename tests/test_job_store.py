@@ -0,0 +1,104 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from simulation.job_store import CANCELLED, DONE, JobRunner, JobStore
+
+
+class Busy(Exception):
+    pass
+
+
+class TestJobStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.db")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_claim_finish_and_paged_results(self):
+        store = JobStore(self.path)
+        job_id = store.create([{"seed": i} for i in range(3)])
+        for _ in range(3):
+            idx, request = store.claim(job_id)
+            if idx == 1:
+                store.finish(job_id, idx, error="坏配置")
+            else:
+                store.finish(job_id, idx, result={"total_dmg": request["seed"] * 10, "history": [1, 2]})
+        self.assertIsNone(store.claim(job_id))
+
+        job = store.get(job_id)
+        self.assertEqual((job["status"], job["done"], job["failed"], job["progress"]), (DONE, 2, 1, 1.0))
+        page = store.results(job_id, offset=1, limit=5, summary=True)
+        self.assertEqual([item["index"] for item in page], [1, 2])
+        self.assertEqual(page[0]["error"], "坏配置")
+        self.assertEqual(page[1]["result"]["total_dmg"], 20)
+        self.assertNotIn("history", page[1]["result"])
+        self.assertEqual(store.results(job_id, limit=1)[0]["result"]["history"], [1, 2])
+
+    def test_restart_requeues_interrupted_items(self):
+        store = JobStore(self.path)
+        job_id = store.create([{"seed": 0}, {"seed": 1}])
+        store.claim(job_id)  # 运行中时服务中断
+        store.close()
+
+        store = JobStore(self.path)
+        self.assertEqual(store.recover(), [job_id])
+        self.assertEqual(store.claim(job_id)[0], 0)
+
+    def test_cancel_skips_pending_items(self):
+        store = JobStore(self.path)
+        job_id = store.create([{"seed": 0}, {"seed": 1}])
+        store.claim(job_id)
+        store.cancel(job_id)
+        self.assertIsNone(store.claim(job_id))
+        self.assertEqual(store.get(job_id)["status"], CANCELLED)
+
+
+class TestJobRunner(unittest.TestCase):
+    def test_runs_jobs_and_retries_when_busy(self):
+        attempts = []
+
+        async def run_item(request):
+            attempts.append(request["seed"])
+            if attempts.count(request["seed"]) == 1 and request["seed"] == 1:
+                raise Busy()
+            if request["seed"] == 2:
+                raise ValueError("坏配置")
+            return {"total_dmg": request["seed"]}
+
+        async def main():
+            store = JobStore(":memory:")
+            runner = JobRunner(store, run_item, concurrency=2, retry_on=(Busy,), retry_delay=0)
+            runner.start()
+            job_id = await runner.submit([{"seed": i} for i in range(4)])
+            for _ in range(100):
+                if store.get(job_id)["status"] == DONE:
+                    break
+                await asyncio.sleep(0.01)
+            await runner.stop()
+            return store.get(job_id), store.results(job_id, summary=True)
+
+        job, items = asyncio.run(main())
+        self.assertEqual((job["done"], job["failed"]), (3, 1))
+        self.assertEqual(attempts.count(1), 2)
+        self.assertEqual([item["result"] and item["result"]["total_dmg"] for item in items], [0, 1, None, 3])
+
+    def test_submit_requires_start(self):
+        async def run_item(request):
+            return {}
+
+        async def main():
+            store = JobStore(":memory:")
+            runner = JobRunner(store, run_item)
+            with self.assertRaises(RuntimeError):
+                await runner.submit([{"seed": 0}])
+            return store.list(10)
+
+        self.assertEqual(asyncio.run(main()), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
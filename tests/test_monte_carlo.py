@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.config_manager import get_config
+from core.enums import CritMode
+from simulation.batch import CharacterSpec, RunSpec, build_simulation, load_context
+from simulation.monte_carlo import crit_distribution, sample_crit_totals
+
+
+TEAM = [
+    CharacterSpec("陈千语", script=["a1", "a2", "a3", "a4", "a5", "ult", "skill"]),
+    CharacterSpec("艾尔黛拉", script=["qte", "skill"]),
+]
+
+
+class TestSampleCritTotals(unittest.TestCase):
+    NON_CRIT = np.array([100.0, 250.0, 40.0])
+    CRIT = np.array([180.0, 500.0, 90.0])
+
+    def sample(self, crit_rate, samples=1000, **kwargs):
+        return sample_crit_totals(self.NON_CRIT, self.CRIT, np.asarray(crit_rate, dtype=np.float64),
+                                  samples, np.random.default_rng(1), **kwargs)
+
+    def test_shape_across_blocks(self):
+        # max_block 小于命中数时每块一个样本
+        totals = self.sample([0.5, 0.5, 0.5], samples=17, max_block=2)
+        self.assertEqual(totals.shape, (17,))
+        self.assertTrue(np.all((totals >= self.NON_CRIT.sum()) & (totals <= self.CRIT.sum())))
+
+    def test_certain_outcomes(self):
+        np.testing.assert_array_equal(self.sample([0.0, 0.0, 0.0], fixed_damage=5.0), self.NON_CRIT.sum() + 5.0)
+        np.testing.assert_array_equal(self.sample([1.0, 1.0, 1.0], fixed_damage=5.0), self.CRIT.sum() + 5.0)
+        np.testing.assert_array_equal(self.sample([1.0, 0.0, 1.0]), 180.0 + 250.0 + 90.0)
+
+    def test_only_fixed_damage(self):
+        empty = np.array([], dtype=np.float64)
+        totals = sample_crit_totals(empty, empty, empty, 8, np.random.default_rng(1), fixed_damage=123.0)
+        np.testing.assert_array_equal(totals, np.full(8, 123.0))
+
+    def test_mean_matches_expectation(self):
+        rates = np.array([0.3, 0.6, 0.1])
+        totals = self.sample(rates, samples=200000)
+        expected = float((self.NON_CRIT + rates * (self.CRIT - self.NON_CRIT)).sum())
+        self.assertAlmostEqual(totals.mean() / expected, 1.0, places=2)
+
+
+class TestCritDistribution(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def run_records(self, crit_mode, context):
+        spec = RunSpec(characters=TEAM, duration=15, seed=5, crit_mode=crit_mode.value)
+        engine, _ = build_simulation(spec, context)
+        engine.run(spec.duration)
+        records = list(engine.statistics.damage_records)
+        engine.dispose()
+        return records
+
+    def test_records_kernel_outcomes(self):
+        """期望模式记录的非暴击/暴击伤害与随机模式下同一命中的实际伤害一致"""
+        context = load_context()
+        expected = self.run_records(CritMode.EXPECTED, context)
+        rolled = self.run_records(CritMode.RANDOM, context)
+
+        self.assertEqual([(r.tick, r.skill_name) for r in expected], [(r.tick, r.skill_name) for r in rolled])
+        self.assertTrue(any(r.is_crit for r in rolled))
+        for e, r in zip(expected, rolled):
+            if e.crit_rate is None:
+                self.assertEqual(e.damage, r.damage)
+                continue
+            self.assertEqual(r.damage, e.crit_damage if r.is_crit else e.non_crit_damage)
+
+    def test_vectorized_sampling(self):
+        spec = RunSpec(characters=TEAM, duration=15, seed=3)
+        dist = crit_distribution(spec, samples=2000, seed=1)
+        self.assertEqual(dist.method, "vectorized")
+        self.assertEqual(dist.samples, 2000)
+        self.assertLessEqual(dist.p5, dist.p50)
+        self.assertLessEqual(dist.p50, dist.p95)
+        self.assertAlmostEqual(dist.mean / dist.expected_total, 1.0, places=1)
+
+    def test_crit_listeners_fall_back_to_resimulation(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            context = load_context(os.path.join(tmp, "weapons.json"), os.path.join(tmp, "equipment"))
+            equipment = context.equipment_manager.create(
+                name="暴击饰品", description="", slot="accessory_1", stat_bonuses={},
+                effects=[{"effect_type": "on_crit", "trigger_condition": {}, "buff_stats": {"atk_pct": 0.1},
+                          "duration": 5.0, "description": "暴击后攻击力+10%"}],
+            )
+            characters = [CharacterSpec("陈千语", script=TEAM[0].script,
+                                        equipment_ids={"accessory_1": equipment.id})]
+            spec = RunSpec(characters=characters, duration=10, seed=3)
+            dist = crit_distribution(spec, samples=1000, context=context, max_resimulations=4, max_workers=1)
+
+        self.assertEqual(dist.method, "resimulation")
+        self.assertEqual(dist.samples, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+from dataclasses import replace
+
+from core.config_manager import get_config
+from simulation.batch import CharacterSpec, EnemySpec, RunSpec, load_context, run_spec
+from core.enums import CritMode
+from simulation.replay import HitTrace, record_trace, reprice_spec
+
+
+def make_spec(crit_mode, equipment_ids=None, custom_attrs=None):
+    return RunSpec(
+        characters=[
+            CharacterSpec("陈千语", script=["a1", "a2", "a3", "a4", "a5", "skill", "wait 2.0", "ult", "a1", "a2"],
+                          equipment_ids=equipment_ids or {}, custom_attrs=custom_attrs),
+            CharacterSpec("艾尔黛拉", script=["skill", "wait 3.0", "skill"]),
+        ],
+        enemy=EnemySpec(defense=100),
+        duration=15.0,
+        seed=3,
+        crit_mode=crit_mode,
+    )
+
+
+class TestReprice(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.config = get_config()
+        cls._log_level = cls.config.log_level
+        cls.config.log_level = "ERROR"
+        cls.context = load_context()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.config.log_level = cls._log_level
+
+    def test_unchanged_reprice_is_exact(self):
+        for crit_mode in ("random", "expected"):
+            spec = make_spec(crit_mode)
+            trace, recorded = record_trace(spec, self.context)
+            self.assertIsNone(trace.invalid_reason)
+
+            outcome = reprice_spec(trace, spec, spec, self.context)
+            self.assertTrue(outcome.repriced)
+            self.assertEqual(outcome.result.total_damage, recorded.total_damage)
+            self.assertEqual(outcome.result.total_damage, run_spec(spec, self.context).total_damage)
+
+    def test_gear_change_matches_full_simulation(self):
+        loose = {"accessory_1": "3d30ef17-312c-469b-a253-6931bc72da9a", "gloves": "5ba21b17-189a-472e-ab53-c9703f201682"}
+        full_set = {
+            "accessory_1": "tide-surge-accessory-001",
+            "gloves": "tide-surge-gloves-001",
+            "armor": "tide-surge-armor-001",
+        }
+        variants = [
+            {"equipment_ids": loose},
+            {"equipment_ids": full_set},  # 套装特效不同，应退回完整模拟
+            {"custom_attrs": {"base_stats": {"crit_rate": 0.4}}},
+        ]
+        for crit_mode in ("random", "expected"):
+            spec = make_spec(crit_mode)
+            trace, _ = record_trace(spec, self.context)
+            for change in variants:
+                variant = make_spec(crit_mode, **change)
+                outcome = reprice_spec(trace, spec, variant, self.context)
+                full = run_spec(variant, self.context)
+                if outcome.repriced:
+                    self.assertAlmostEqual(outcome.result.total_damage, full.total_damage, places=6)
+                    if crit_mode == "expected":
+                        self.assertAlmostEqual(outcome.result.damage_std, full.damage_std, places=6)
+                else:
+                    self.assertEqual(outcome.result.total_damage, full.total_damage)
+
+    def test_structural_change_falls_back(self):
+        spec = make_spec("expected")
+        trace, _ = record_trace(spec, self.context)
+        variant = replace(spec, duration=10.0)
+
+        outcome = reprice_spec(trace, spec, variant, self.context)
+        self.assertFalse(outcome.repriced)
+        self.assertIsNotNone(outcome.fallback_reason)
+        self.assertEqual(outcome.result.total_damage, run_spec(variant, self.context).total_damage)
+
+    def test_panel_dependent_fixed_damage_blocks_reprice(self):
+        trace = HitTrace(CritMode.EXPECTED)
+        trace.base_panels = {"莱瓦汀": {"crit_dmg": 0.5}, "狼卫": {"crit_dmg": 0.5}}
+        trace.record_fixed("莱瓦汀", 1000.0, uses_panel=True)
+
+        self.assertIsNone(trace.check_repriceable({"莱瓦汀": {"crit_dmg": 0.5}}))
+        self.assertIsNone(trace.check_repriceable({"狼卫": {"crit_dmg": 0.8}}))
+        self.assertIsNotNone(trace.check_repriceable({"莱瓦汀": {"crit_dmg": 0.8}}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import tempfile
+import unittest
+
+from simulation.result_cache import ResultCache, cache_key
+
+
+class TestCacheKey(unittest.TestCase):
+    def test_key_ignores_dict_order(self):
+        a = {"request": {"seed": 1, "duration": 20.0}, "weapons": {"w1": {"atk": 500}}}
+        b = {"weapons": {"w1": {"atk": 500}}, "request": {"duration": 20.0, "seed": 1}}
+        self.assertEqual(cache_key(a), cache_key(b))
+        b["weapons"]["w1"]["atk"] = 501
+        self.assertNotEqual(cache_key(a), cache_key(b))
+
+
+class TestResultCache(unittest.TestCase):
+    def test_memory_lru(self):
+        cache = ResultCache(max_entries=2)
+        cache.put("a", {"total": 1})
+        cache.put("b", {"total": 2})
+        cache.get("a")
+        cache.put("c", {"total": 3})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"total": 1})
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_invalidate_by_dependency(self):
+        cache = ResultCache()
+        cache.put("a", 1, deps=[("weapon", "w1"), ("equipment", "e1")])
+        cache.put("b", 2, deps=[("weapon", "w2")])
+        self.assertEqual(cache.invalidate(("equipment", "e1")), 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_disk_tier_survives_restart_and_evicts_by_size(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = ResultCache(max_entries=1, disk_dir=tmp, disk_max_bytes=400)
+            cache.put("a", {"logs": "x" * 100}, deps=[("weapon", "w1")])
+            cache.put("b", {"logs": "y" * 100})
+            # 内存层只保留 b，a 从磁盘层读回
+            self.assertEqual(cache.get("a"), {"logs": "x" * 100})
+
+            restarted = ResultCache(max_entries=4, disk_dir=tmp, disk_max_bytes=400)
+            self.assertEqual(restarted.get("b"), {"logs": "y" * 100})
+            restarted.put("c", {"logs": "z" * 300})
+            # 超出大小上限，淘汰最久未访问的条目
+            self.assertLessEqual(restarted._disk_bytes, 400)
+            self.assertEqual(sorted(restarted._disk), ["c"])
+
+            self.assertEqual(cache.invalidate(("weapon", "w1")), 1)
+            self.assertIsNone(ResultCache(disk_dir=tmp).get("a"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+
+from simulation.rng import RandomStreams
+
+
+class TestRandomStreams(unittest.TestCase):
+    def test_same_seed_same_sequence(self):
+        a = RandomStreams(42)
+        b = RandomStreams(42)
+        self.assertEqual([a.crit("陈千语").random() for _ in range(5)],
+                         [b.crit("陈千语").random() for _ in range(5)])
+
+    def test_streams_are_independent(self):
+        a = RandomStreams(42)
+        b = RandomStreams(42)
+        # 在 b 上额外消耗另一条流，不影响暴击流
+        b.proc("艾尔黛拉").random()
+        self.assertEqual(a.crit("陈千语").random(), b.crit("陈千语").random())
+        self.assertNotEqual(a.crit("陈千语").random(), a.crit("骏卫").random())
+
+    def test_generated_seed_is_exposed(self):
+        streams = RandomStreams()
+        replay = RandomStreams(streams.seed)
+        self.assertEqual(streams.stream("x").random(), replay.stream("x").random())
+
+
+if __name__ == '__main__':
+    unittest.main()
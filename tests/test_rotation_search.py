@@ -0,0 +1,108 @@
+import unittest
+
+from core.config_manager import get_config
+from simulation.batch import CharacterSpec, EnemySpec, RunSpec, build_simulation, load_context, run_spec
+from simulation.rotation_search import ActionGrammar, RotationSearch, apply_rotation
+
+
+class TestEngineFork(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+        self.context = load_context()
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def test_fork_mid_action_is_independent(self):
+        spec = RunSpec(
+            characters=[
+                CharacterSpec("莱瓦汀", script=["skill", "wait 2.0", "a1", "a2", "a3", "ult", "qte"]),
+                CharacterSpec("狼卫", script=["wait 1", "skill", "wait 4", "ult", "qte"]),
+            ],
+            enemy=EnemySpec(defense=100),
+            duration=20.0,
+            seed=4,
+        )
+        expected = run_spec(spec, self.context).total_damage
+
+        engine, target = build_simulation(spec, self.context)
+        engine.run_until(47, fast_forward=True)
+        damage_at_fork = target.total_damage_taken
+
+        fork = engine.fork()
+        fork_target = next(e for e in fork.entities if e.name == target.name)
+        self.assertIsNot(fork_target, target)
+        fork.run_until(200, fast_forward=True)
+
+        # 副本推进不影响原引擎
+        self.assertEqual(engine.tick, 47)
+        self.assertEqual(target.total_damage_taken, damage_at_fork)
+
+        engine.run_until(200, fast_forward=True)
+        self.assertEqual(fork_target.total_damage_taken, expected)
+        self.assertEqual(target.total_damage_taken, expected)
+
+    def test_fork_shares_immutable_state(self):
+        spec = RunSpec(
+            characters=[CharacterSpec("狼卫", script=["a1", "a2", "skill", "a3"])],
+            enemy=EnemySpec(defense=100),
+            duration=10.0,
+            seed=1,
+        )
+        engine, target = build_simulation(spec, self.context)
+        engine.run_until(30, fast_forward=True)
+        actor = next(e for e in engine.entities if e.name == "狼卫")
+        actor.get_current_panel()
+
+        fork = engine.fork()
+        fork_actor = next(e for e in fork.entities if e.name == "狼卫")
+        records = engine.statistics.damage_records
+        fork_records = fork.statistics.damage_records
+        self.assertTrue(records)
+        # 已写入的记录与缓存面板共享，容器与 Buff 状态各自独立
+        self.assertIsNot(fork_records, records)
+        self.assertIs(fork_records[0], records[0])
+        self.assertIs(fork_actor._panel_cache, actor._panel_cache)
+        self.assertIsNot(fork_actor.buffs, actor.buffs)
+
+        count = len(records)
+        fork.run_until(100, fast_forward=True)
+        self.assertEqual(len(records), count)
+        self.assertGreater(len(fork_records), count)
+
+
+class TestRotationSearch(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+        self.context = load_context()
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def test_results_replay_as_scripts(self):
+        spec = RunSpec(
+            characters=[CharacterSpec("陈千语"), CharacterSpec("艾尔黛拉", script=["qte"])],
+            enemy=EnemySpec(defense=100),
+            duration=12.0,
+            seed=2,
+            crit_mode="expected",
+        )
+        search = RotationSearch(spec, characters=["陈千语"], beam_width=4, max_depth=8, context=self.context,
+                                grammars={"陈千语": ActionGrammar(max_normal=5, wait_options=(0.5,))})
+        results = search.run()
+
+        self.assertTrue(results)
+        self.assertEqual([r.total_damage for r in results], sorted((r.total_damage for r in results), reverse=True))
+        self.assertEqual(results[0].scripts["艾尔黛拉"], ["qte"])
+        self.assertLessEqual(results[0].scripts["陈千语"].count("ult"), 1)
+        for result in results:
+            self.assertEqual(run_spec(apply_rotation(spec, result), self.context).total_damage, result.total_damage)
+        self.assertGreater(search.stats.forks, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import copy
+import json
+import unittest
+
+from core.config_manager import get_config
+from simulation import checkpoint
+from simulation.snapshot_history import decode_history, keyframes
+from simulation.web_runner import (
+    _build_simulation, merge_stream_event, replay_stream, run_snapshot_simulation, stream_snapshot_simulation,
+)
+
+
+def _request(history_format):
+    return {
+        "duration": 30.0,
+        "seed": 11,
+        "crit_mode": None,
+        "history_format": history_format,
+        "enemy": {"defense": 100, "dmg_taken_mult_physical": 1.0, "dmg_taken_mult_heat": 1.0,
+                  "dmg_taken_mult_electric": 1.0, "dmg_taken_mult_nature": 1.0, "dmg_taken_mult_frost": 1.0},
+        "characters": [
+            {"name": "管理员", "script": "skill\na1\na2\nult\nqte"},
+            {"name": "安塔尔", "script": "skill\nwait 1\nult"},
+            {"name": "陈千语", "script": "a1\na2\na3\nskill\nqte"},
+        ],
+    }
+
+
+LOADOUTS = [(None, [])] * 3
+
+
+class TestDeltaHistory(unittest.TestCase):
+    def setUp(self):
+        self.config = get_config()
+        self._log_level = self.config.log_level
+        self.config.log_level = "ERROR"
+
+    def tearDown(self):
+        self.config.log_level = self._log_level
+
+    def test_decodes_to_full_frames(self):
+        full = run_snapshot_simulation(_request("full"), LOADOUTS, None)
+        delta = run_snapshot_simulation(_request("delta"), LOADOUTS, None)
+        sparse = run_snapshot_simulation(_request("keyframes"), LOADOUTS, None)
+
+        encoded = json.loads(json.dumps(delta["history"], ensure_ascii=False))
+        self.assertEqual(decode_history(encoded), full["history"])
+        self.assertEqual(keyframes(encoded), full["history"][::100])
+        self.assertEqual(sparse["history"], full["history"][::100])
+        self.assertEqual(delta["total_dmg"], full["total_dmg"])
+        self.assertLess(len(json.dumps(encoded)) * 10, len(json.dumps(full["history"])))
+
+    def test_sampling_and_field_mask(self):
+        full = run_snapshot_simulation(_request("full"), LOADOUTS, None)["history"]
+        for options in ({"snapshot_every": 7}, {"snapshot_on_change": True},
+                        {"snapshot_every": 4, "snapshot_fields": ["damage", "qte"]}):
+            request = dict(_request("full"), **options)
+            frames = run_snapshot_simulation(request, LOADOUTS, None)["history"]
+            delta = run_snapshot_simulation(dict(request, history_format="delta"), LOADOUTS, None)["history"]
+            self.assertEqual(decode_history(json.loads(json.dumps(delta, ensure_ascii=False))), frames)
+            self.assertEqual(frames[-1]["tick"], full[-1]["tick"])
+            # 采样后帧内伤害为区间累计，总和不变
+            self.assertEqual(sum(f["damage_tick"] for f in frames), sum(f["damage_tick"] for f in full))
+
+        every = run_snapshot_simulation(dict(_request("full"), snapshot_every=7), LOADOUTS, None)["history"]
+        self.assertEqual([f["tick"] for f in every], list(range(0, 300, 7)) + [300])
+        self.assertEqual(every[1]["entities"], full[7]["entities"])
+
+        masked = run_snapshot_simulation(dict(_request("full"), snapshot_fields=["qte"]), LOADOUTS, None)["history"]
+        self.assertEqual(set(masked[0]), {"time_str", "tick", "entities"})
+        self.assertEqual(masked[0]["entities"]["管理员"], {"qte_ready": False})
+
+    def test_damage_comes_from_statistics(self):
+        sim, target, _ = _build_simulation(_request("full"), LOADOUTS, None)
+        try:
+            sim.run_with_snapshots(30.0)
+            per_tick = {}
+            for tick, _, damage in sim.statistics.damage_timeline:
+                per_tick[tick] = per_tick.get(tick, 0) + int(damage)
+            self.assertEqual({f["tick"]: f["damage_tick"] for f in sim.history if f["damage_tick"]}, per_tick)
+            self.assertAlmostEqual(sum(per_tick.values()), target.total_damage_taken, delta=len(per_tick))
+            self.assertEqual({log["type"] for log in sim.logs}, {"action", "damage"})
+        finally:
+            sim.dispose()
+
+    def test_stream_and_replay_reassemble_delta_history(self):
+        delta = run_snapshot_simulation(_request("delta"), LOADOUTS, None)
+        for events in (stream_snapshot_simulation(_request("delta"), LOADOUTS, None, chunk_ticks=40),
+                       replay_stream(delta, chunk_ticks=40)):
+            merged = {}
+            for event in events:
+                merge_stream_event(merged, event)
+            self.assertEqual(merged["history"], delta["history"])
+
+    def test_fork_and_checkpoint_keep_encoder_state(self):
+        full = run_snapshot_simulation(_request("full"), LOADOUTS, None)["history"]
+        # 继续运行时重新捕获第100帧（tick 不连续，编码中写出 tick）
+        expected = full[:101] + full[100:]
+
+        sim, _, _ = _build_simulation(_request("delta"), LOADOUTS, None)
+        steps = sim.iter_snapshots(30.0, chunk_ticks=100)
+        next(steps)
+        next(steps)
+        forked = sim.fork()
+        resumed = checkpoint.loads(checkpoint.dumps(sim), lambda: _build_simulation(_request("delta"), LOADOUTS, None)[0])
+        for engine in (sim, forked, resumed):
+            for _ in engine.iter_snapshots(20.0):
+                pass
+            self.assertEqual(decode_history(copy.deepcopy(engine.history_data())), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
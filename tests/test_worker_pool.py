@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+import unittest
+
+from simulation.worker_pool import PoolBusyError, PoolTimeoutError, TaskError, WorkerPool
+
+
+def _pid_after(seconds):
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def _fail():
+    raise ValueError("坏配置")
+
+
+def _count(n):
+    for i in range(n):
+        yield i
+
+
+class TestWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.pool = WorkerPool(workers=1, max_queue=1, timeout=30)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_runs_in_worker_process_and_reports_errors(self):
+        pid = self.pool.run(_pid_after, (0,))
+        self.assertNotEqual(pid, os.getpid())
+        # 进程复用
+        self.assertEqual(self.pool.run(_pid_after, (0,)), pid)
+        with self.assertRaises(TaskError) as ctx:
+            self.pool.run(_fail)
+        self.assertIn("坏配置", str(ctx.exception))
+
+    def test_timeout_kills_worker_and_pool_recovers(self):
+        pid = self.pool.run(_pid_after, (0,))
+        with self.assertRaises(PoolTimeoutError) as ctx:
+            self.pool.run(_pid_after, (30,), timeout=0.2)
+        self.assertFalse(ctx.exception.queued)
+        new_pid = self.pool.run(_pid_after, (0,))
+        self.assertNotEqual(new_pid, pid)
+
+    def test_submit_rejects_beyond_queue_limit(self):
+        self.pool.run(_pid_after, (0,))
+
+        async def burst():
+            tasks = [asyncio.ensure_future(self.pool.submit(_pid_after, 0.5)) for _ in range(3)]
+            return await asyncio.gather(*tasks, return_exceptions=True)
+
+        results = asyncio.run(burst())
+        # 1 个运行 + 1 个排队，第3个立即拒绝
+        self.assertEqual(sum(isinstance(r, int) for r in results), 2)
+        self.assertIsInstance(results[2], PoolBusyError)
+        self.assertEqual(self.pool.pending, 0)
+
+    def test_stream_in_order_and_cancel_frees_worker(self):
+        async def consume(limit):
+            items = []
+            async for item in self.pool.stream(_count, 20, window=2):
+                items.append(item)
+                if len(items) == limit:
+                    break
+            return items
+
+        self.assertEqual(asyncio.run(consume(None)), list(range(20)))
+        # 提前结束后进程回到空闲状态，可继续执行任务
+        self.assertEqual(asyncio.run(consume(3)), [0, 1, 2])
+        time.sleep(0.2)
+        self.assertEqual(self.pool.run(_pid_after, (0,)), self.pool.run(_pid_after, (0,)))
+        self.assertEqual(self.pool.pending, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@ import { TimelineView } from './components/TimelineView';
 import { SimulationResults } from './components/SimulationResults';
 import { useSimulationStore } from './store/useSimulationStore';
 import { apiClient } from './api/client';
+import { decodeHistory } from './utils/history';
 import { Play, Loader2, Settings, BarChart2, Clock } from 'lucide-react';
 import clsx from 'clsx';
 
@@ -23,6 +24,8 @@ function App() {
   } = useSimulationStore();
 
   const [currentView, setCurrentView] = useState<'config' | 'timeline' | 'results'>('config');
+  // 每个场景固定一个随机种子，输入不变时重复请求可命中服务端结果缓存
+  const seedRef = useRef<{ scenario: string; seed: number } | null>(null);
 
   useEffect(() => {
     fetchAvailableCharacters();
@@ -52,14 +55,25 @@ function App() {
          };
       }).filter(Boolean);
 
+      const scenario = JSON.stringify({ duration, enemy, characters: payloadCharacters });
+      let seeded = seedRef.current;
+      if (!seeded || seeded.scenario !== scenario) {
+        seeded = { scenario, seed: Math.floor(Math.random() * 2 ** 31) };
+        seedRef.current = seeded;
+      }
+
       const payload = {
         duration,
         enemy,
-        characters: payloadCharacters
+        characters: payloadCharacters,
+        seed: seeded.seed,
+        history_format: 'delta',
+        // 界面只用到技力与QTE状态
+        snapshot_fields: ['sp', 'qte']
       };
       
       const response = await apiClient.post('/simulate', payload);
-      setResult(response.data);
+      setResult({ ...response.data, history: decodeHistory(response.data.history) });
       // Do NOT switch view automatically on auto-run
     } catch (error: any) {
       console.error("Simulation failed:", error);
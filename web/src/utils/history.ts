@@ -0,0 +1,112 @@
+// Decoder for delta-encoded snapshot history (mirror of simulation/snapshot_history.py)
+// Each keyframe holds the full state; other records only hold fields that differ from the
+// prediction (tick + step, buff remaining ticks - step, action timer + step, zero damage, rest unchanged).
+
+type BuffState = [string, number, number, string, any]; // name, stacks, remaining ticks, category, desc
+type ActionState = [string, number, number] | null;     // name, timer, duration
+
+interface EntityState {
+    b: BuffState[];
+    a: ActionState;
+    x: string;
+    q: boolean;
+}
+
+interface DeltaRecord {
+    k?: number;
+    t?: number;
+    d?: number;
+    s?: number;
+    n?: string[];
+    e?: Record<string, Partial<EntityState>>;
+}
+
+export interface DeltaHistory {
+    format: 'delta';
+    keyframe_every: number;
+    step?: number;
+    fields?: string[];
+    records: DeltaRecord[];
+}
+
+export const isDeltaHistory = (history: any): history is DeltaHistory =>
+    !!history && !Array.isArray(history) && history.format === 'delta';
+
+const ALL_FIELDS = ['damage', 'sp', 'buffs', 'actions', 'extra', 'qte'];
+const ENTITY_FIELDS = ['buffs', 'actions', 'extra', 'qte'];
+
+const renderFrame = (tick: number, damage: number, sp: number, names: string[],
+                     entities: Record<string, EntityState>, fields: string[]) => {
+    const frame: any = {
+        time_str: `${(tick / 10).toFixed(1)}s`,
+        tick,
+    };
+    if (fields.includes('damage')) frame.damage_tick = damage;
+    if (fields.includes('sp')) frame.sp = sp;
+    if (!ENTITY_FIELDS.some(f => fields.includes(f))) return frame;
+
+    frame.entities = {};
+    names.forEach(name => {
+        const state = entities[name];
+        const data: any = {};
+        if (fields.includes('buffs')) {
+            data.buffs = state.b.map(([buffName, stacks, ticks, category, desc]) => ({
+                name: buffName, stacks, duration: ticks / 10, category, desc,
+            }));
+        }
+        if (fields.includes('actions')) {
+            const action = state.a;
+            data.action = action ? { name: action[0], progress: Math.min(1, action[2] > 0 ? action[1] / action[2] : 0) } : null;
+        }
+        if (fields.includes('extra')) data.extra = state.x;
+        if (fields.includes('qte')) data.qte_ready = state.q;
+        frame.entities[name] = data;
+    });
+    return frame;
+};
+
+// Expand a delta-encoded history into per-tick frames; plain frame arrays are returned as-is
+export function decodeHistory(history: any): any[] {
+    if (!isDeltaHistory(history)) return history ?? [];
+
+    const step = history.step ?? 1;
+    const fields = history.fields ?? ALL_FIELDS;
+    const frames: any[] = [];
+    let tick = 0, damage = 0, sp = 0;
+    let names: string[] = [];
+    let entities: Record<string, EntityState> = {};
+
+    history.records.forEach(record => {
+        if (record.k) {
+            tick = record.t!;
+            damage = record.d!;
+            sp = record.s!;
+            names = record.n!;
+            entities = { ...(record.e as Record<string, EntityState>) };
+        } else {
+            tick = record.t ?? tick + step;
+            damage = record.d ?? 0;
+            sp = record.s ?? sp;
+            names = record.n ?? names;
+            const changes = record.e ?? {};
+            const next: Record<string, EntityState> = {};
+            names.forEach(name => {
+                const prev = entities[name];
+                const diff = changes[name] ?? {};
+                if (!prev) {
+                    next[name] = diff as EntityState;
+                    return;
+                }
+                next[name] = {
+                    b: diff.b ?? prev.b.map(([n, s, t, c, d]) => [n, s, t - step, c, d] as BuffState),
+                    a: 'a' in diff ? diff.a! : (prev.a ? [prev.a[0], prev.a[1] + step, prev.a[2]] : null),
+                    x: diff.x ?? prev.x,
+                    q: diff.q ?? prev.q,
+                };
+            });
+            entities = next;
+        }
+        frames.push(renderFrame(tick, damage, sp, names, entities, fields));
+    });
+    return frames;
+}